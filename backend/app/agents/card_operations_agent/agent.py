@@ -1,4 +1,5 @@
 from google.adk.agents import LlmAgent
+from ..routing_tools import hand_back_to_coordinator, remember_active_specialist
 from .tools import block_card_tool, unblock_card_tool, get_card_info_tool, get_transactions_tool
 
 card_operations_agent = LlmAgent(
@@ -9,7 +10,7 @@ card_operations_agent = LlmAgent(
 
 1. Card blocking and unblocking
 2. Card information and balances
-3. Transaction history
+3. Transaction history and statements
 4. Card-related security issues
 
 Guidelines:
@@ -23,8 +24,10 @@ Available tools:
 - block_card_tool: Block a customer's card
 - unblock_card_tool: Unblock a customer's card  
 - get_card_info_tool: Get card information and balances
-- get_transactions_tool: Retrieve recent transactions
+- get_transactions_tool: Retrieve transactions, optionally between two dates; pass back its page_token to show more
+- hand_back_to_coordinator: Call this if the customer moves on to a topic other than cards
 
 Always ask for customer ID and card details when needed.""",
-    tools=[block_card_tool, unblock_card_tool, get_card_info_tool, get_transactions_tool]
+    tools=[block_card_tool, unblock_card_tool, get_card_info_tool, get_transactions_tool, hand_back_to_coordinator],
+    after_agent_callback=remember_active_specialist
 )
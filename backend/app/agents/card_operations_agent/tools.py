@@ -1,10 +1,11 @@
-import asyncio
+from datetime import datetime, timedelta
 
-from ...database.connection import get_db
+from ...config import settings
+from ...database.unit_of_work import tool_session
 from ...services.banking_service import banking_service
 
 
-def block_card_tool(customer_id: str, card_number: str) -> str:
+async def block_card_tool(customer_id: str, card_number: str) -> str:
     """Block a customer's card
 
     Args:
@@ -15,15 +16,8 @@ def block_card_tool(customer_id: str, card_number: str) -> str:
         Result of the card blocking operation
     """
 
-    async def _block_card():
-        db = next(get_db())
-        try:
-            result = await banking_service.block_card(customer_id, card_number, db)
-            return result
-        finally:
-            db.close()
-
-    result = asyncio.run(_block_card())
+    async with tool_session() as db:
+        result = await banking_service.block_card(customer_id, card_number, db)
 
     if result["success"]:
         return f"✅ {result['message']}. Your card is now blocked and cannot be used for transactions. You can unblock it anytime through this chat or mobile banking."
@@ -31,7 +25,7 @@ def block_card_tool(customer_id: str, card_number: str) -> str:
         return f"❌ Unable to block card: {result['message']}"
 
 
-def unblock_card_tool(customer_id: str, card_number: str) -> str:
+async def unblock_card_tool(customer_id: str, card_number: str) -> str:
     """Unblock a customer's card
 
     Args:
@@ -42,15 +36,8 @@ def unblock_card_tool(customer_id: str, card_number: str) -> str:
         Result of the card unblocking operation
     """
 
-    async def _unblock_card():
-        db = next(get_db())
-        try:
-            result = await banking_service.unblock_card(customer_id, card_number, db)
-            return result
-        finally:
-            db.close()
-
-    result = asyncio.run(_unblock_card())
+    async with tool_session() as db:
+        result = await banking_service.unblock_card(customer_id, card_number, db)
 
     if result["success"]:
         return f"✅ {result['message']}. Your card is now active and ready to use."
@@ -58,7 +45,7 @@ def unblock_card_tool(customer_id: str, card_number: str) -> str:
         return f"❌ Unable to unblock card: {result['message']}"
 
 
-def get_card_info_tool(customer_id: str) -> str:
+async def get_card_info_tool(customer_id: str) -> str:
     """Get customer's card information
 
     Args:
@@ -68,15 +55,8 @@ def get_card_info_tool(customer_id: str) -> str:
         Formatted card information
     """
 
-    async def _get_cards():
-        db = next(get_db())
-        try:
-            cards = await banking_service.get_customer_cards(customer_id, db)
-            return cards
-        finally:
-            db.close()
-
-    cards = asyncio.run(_get_cards())
+    async with tool_session() as db:
+        cards = await banking_service.get_customer_cards(customer_id, db)
 
     if not cards:
         return "❌ No cards found for this customer ID."
@@ -92,33 +72,42 @@ def get_card_info_tool(customer_id: str) -> str:
     return card_info
 
 
-def get_transactions_tool(customer_id: str, card_number: str, limit: int = 5) -> str:
-    """Get recent transactions for a card
+async def get_transactions_tool(customer_id: str, card_number: str, limit: int = 5,
+                                from_date: str = "", to_date: str = "", page_token: str = "") -> str:
+    """Get transactions for a card, newest first, optionally between two dates
 
     Args:
         customer_id: The customer's ID
         card_number: Last 4 digits of the card number
-        limit: Number of recent transactions to retrieve
+        limit: Number of transactions to retrieve (at most 50 per call)
+        from_date: Earliest date to include, as YYYY-MM-DD (optional)
+        to_date: Latest date to include, as YYYY-MM-DD (optional)
+        page_token: The page_token from a previous call, to continue where it stopped (optional)
 
     Returns:
         Formatted transaction history
     """
 
-    async def _get_transactions():
-        db = next(get_db())
-        try:
-            transactions = await banking_service.get_card_transactions(customer_id, card_number, limit, db)
-            return transactions
-        finally:
-            db.close()
-
-    transactions = asyncio.run(_get_transactions())
-
-    if not transactions:
+    try:
+        since = datetime.fromisoformat(from_date) if from_date else None
+        until = datetime.fromisoformat(to_date) + timedelta(days=1) if to_date else None
+    except ValueError:
+        return "❌ Dates must be in YYYY-MM-DD format."
+
+    limit = max(1, min(limit, settings.TRANSACTION_PAGE_MAX_SIZE))
+    try:
+        async with tool_session() as db:
+            page = await banking_service.get_card_transactions_page(
+                customer_id, card_number, db, limit=limit, cursor=page_token or None, since=since, until=until
+            )
+    except ValueError as e:
+        return f"❌ {e}"
+
+    if not page or not page["transactions"]:
         return f"❌ No transactions found for card ending in {card_number[-4:]}."
 
-    transaction_info = f"💳 Recent Transactions (Card ending in {card_number[-4:]}):\n\n"
-    for txn in transactions:
+    transaction_info = f"💳 Transactions (Card ending in {card_number[-4:]}):\n\n"
+    for txn in page["transactions"]:
         amount_str = f"₾{abs(txn['amount']):,.2f}"
         if txn['type'] == 'debit' or txn['amount'] < 0:
             amount_str = f"-{amount_str}"
@@ -130,4 +119,7 @@ def get_transactions_tool(customer_id: str, card_number: str, limit: int = 5) ->
         transaction_info += f"  Date: {txn['date'][:10]}\n"
         transaction_info += f"  Status: {txn['status']}\n\n"
 
+    if page["next_cursor"]:
+        transaction_info += f"More transactions available. To see them, call again with page_token: {page['next_cursor']}\n"
+
     return transaction_info
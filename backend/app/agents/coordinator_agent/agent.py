@@ -1,6 +1,23 @@
 from google.adk.agents import LlmAgent
+from ..card_operations_agent.agent import card_operations_agent
+from ..loan_agent.agent import loan_agent
+from ..support_agent.agent import support_agent
 from .tools import route_to_specialist
 
+
+def _as_sub_agent(agent: LlmAgent) -> LlmAgent:
+    """Clone a specialist for the coordinator's tree (the standalone runners keep the original).
+
+    Transfers stay one-way: the specialist answers in the same invocation, and a
+    later coordinator run starts at the coordinator instead of resuming the
+    specialist; topic changes go through hand_back_to_coordinator.
+    """
+    return agent.clone(update={
+        "disallow_transfer_to_parent": True,
+        "disallow_transfer_to_peers": True
+    })
+
+
 coordinator_agent = LlmAgent(
     model="gemini-2.0-flash",
     name="coordinator_agent",
@@ -19,6 +36,11 @@ Rules:
 4. If unsure, ask clarifying questions
 5. Always maintain a professional and helpful tone
 
-Use the route_to_specialist tool to transfer the conversation to the appropriate agent.""",
-    tools=[route_to_specialist]
+Use the route_to_specialist tool to transfer the conversation to the appropriate agent. The specialist takes over immediately and answers the customer in the same turn, so do not repeat or summarise their answer.""",
+    tools=[route_to_specialist],
+    sub_agents=[
+        _as_sub_agent(card_operations_agent),
+        _as_sub_agent(loan_agent),
+        _as_sub_agent(support_agent)
+    ]
 )
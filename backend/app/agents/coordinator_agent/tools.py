@@ -1,8 +1,10 @@
 from typing import Literal
 
+from google.adk.tools import ToolContext
+
 
 def route_to_specialist(agent_name: Literal["card_operations_agent", "loan_agent", "support_agent"],
-                        customer_query: str) -> str:
+                        customer_query: str, tool_context: ToolContext) -> str:
     """Route customer to appropriate specialist agent
 
     Args:
@@ -12,6 +14,9 @@ def route_to_specialist(agent_name: Literal["card_operations_agent", "loan_agent
     Returns:
         Confirmation message about the routing
     """
+    # Hand control to the specialist sub-agent within the same invocation
+    tool_context.actions.transfer_to_agent = agent_name
+
     routing_messages = {
         "card_operations_agent": "Routing you to our card operations specialist...",
         "loan_agent": "Connecting you with our loan specialist...",
@@ -1,4 +1,5 @@
 from google.adk.agents import LlmAgent
+from ..routing_tools import hand_back_to_coordinator, remember_active_specialist
 from .tools import get_loan_limits_tool, get_loan_info_tool
 
 loan_agent = LlmAgent(
@@ -25,6 +26,8 @@ Available loan products:
 - Mortgage Loans: Up to 30 years, starting from 8.5% interest  
 - Car Loans: Up to 7 years, starting from 10% interest
 
-Use tools to get accurate loan information for each customer.""",
-    tools=[get_loan_limits_tool, get_loan_info_tool]
+Use tools to get accurate loan information for each customer.
+If the customer moves on to a topic other than loans, call hand_back_to_coordinator.""",
+    tools=[get_loan_limits_tool, get_loan_info_tool, hand_back_to_coordinator],
+    after_agent_callback=remember_active_specialist
 )
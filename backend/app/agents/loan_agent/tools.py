@@ -1,10 +1,8 @@
-import asyncio
-
-from ...database.connection import get_db
+from ...database.unit_of_work import tool_session
 from ...services.banking_service import banking_service
 
 
-def get_loan_limits_tool(customer_id: str) -> str:
+async def get_loan_limits_tool(customer_id: str) -> str:
     """Calculate loan limits for a customer
 
     Args:
@@ -14,15 +12,8 @@ def get_loan_limits_tool(customer_id: str) -> str:
         Formatted loan limits information
     """
 
-    async def _get_loan_limits():
-        db = next(get_db())
-        try:
-            result = await banking_service.get_loan_limits(customer_id, db)
-            return result
-        finally:
-            db.close()
-
-    result = asyncio.run(_get_loan_limits())
+    async with tool_session() as db:
+        result = await banking_service.get_loan_limits(customer_id, db)
 
     if not result["success"]:
         return f"❌ Unable to calculate loan limits: {result['message']}"
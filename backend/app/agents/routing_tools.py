@@ -0,0 +1,37 @@
+import time
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import ToolContext
+
+from ..services.routing_service import ACTIVE_AGENT_KEY, ACTIVE_AGENT_UPDATED_AT_KEY, TOPIC_CHANGED_KEY
+
+
+def hand_back_to_coordinator(reason: str, tool_context: ToolContext) -> str:
+    """Hand the conversation back to the coordinator when the customer changes topic
+
+    Args:
+        reason: Short description of the new topic the customer asked about
+
+    Returns:
+        Confirmation that the coordinator will take over
+    """
+    tool_context.state[TOPIC_CHANGED_KEY] = True
+    tool_context.actions.skip_summarization = True
+    return f"Topic changed ({reason}); handing the conversation back to the coordinator."
+
+
+def remember_active_specialist(callback_context: CallbackContext):
+    """after_agent_callback: route follow-up turns straight back to this specialist"""
+    state = callback_context.state
+
+    if state.get(TOPIC_CHANGED_KEY):
+        state[ACTIVE_AGENT_KEY] = None
+        state[TOPIC_CHANGED_KEY] = False
+        return None
+
+    if state.get(ACTIVE_AGENT_KEY) != callback_context.agent_name:
+        state["agent_switches"] = state.get("agent_switches", 0) + 1
+
+    state[ACTIVE_AGENT_KEY] = callback_context.agent_name
+    state[ACTIVE_AGENT_UPDATED_AT_KEY] = time.time()
+    return None
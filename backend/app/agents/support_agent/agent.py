@@ -1,4 +1,6 @@
 from google.adk.agents import LlmAgent
+from ..routing_tools import hand_back_to_coordinator, remember_active_specialist
+from .callbacks import cache_answer, serve_cached_answer
 from .tools import search_knowledge_tool, general_inquiry_tool
 
 support_agent = LlmAgent(
@@ -21,6 +23,9 @@ Guidelines:
 - Always be courteous and professional
 - If you cannot find specific information, guide customers to appropriate channels
 
-Use search_knowledge_tool to find relevant information from TBC Bank's knowledge base before answering questions.""",
-    tools=[search_knowledge_tool, general_inquiry_tool]
+Use search_knowledge_tool to find relevant information from TBC Bank's knowledge base before answering questions.
+If the customer wants to perform a card operation or discuss loans, call hand_back_to_coordinator.""",
+    tools=[search_knowledge_tool, general_inquiry_tool, hand_back_to_coordinator],
+    before_agent_callback=serve_cached_answer,
+    after_agent_callback=[cache_answer, remember_active_specialist]
 )
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai.types import Content, Part
+
+from ...config import settings
+from ...services.answer_cache import answer_cache, is_cacheable_question, mentions_customer_data
+from ...services.embedding_cache import Embedding
+from ...services.rag_service import rag_service
+from ...services.routing_service import TOPIC_CHANGED_KEY
+from ..routing_tools import remember_active_specialist
+
+# invocation id -> (question embedding, knowledge version) of a cache miss, so the
+# after-callback stores the answer without embedding or fingerprinting again
+_missed_lookups: "OrderedDict[str, Tuple[Embedding, str]]" = OrderedDict()
+_MAX_MISSED_LOOKUPS = 1024
+
+
+def _question(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ""
+    return "".join(part.text for part in content.parts if part.text).strip()
+
+
+def _final_answer(callback_context: CallbackContext) -> str:
+    """Text of this agent's final reply in the current invocation"""
+    invocation_context = callback_context._invocation_context
+    for event in reversed(invocation_context.session.events):
+        if event.invocation_id != invocation_context.invocation_id:
+            break
+        if event.author == callback_context.agent_name and event.is_final_response() and event.content:
+            return "".join(part.text for part in event.content.parts or [] if part.text).strip()
+    return ""
+
+
+async def serve_cached_answer(callback_context: CallbackContext) -> Optional[Content]:
+    """before_agent_callback: answer from the semantic cache without running the model"""
+    if not settings.ENABLE_ANSWER_CACHE:
+        return None
+
+    question = _question(callback_context)
+    if not question or not is_cacheable_question(question, callback_context.state.get("customer_id")):
+        answer_cache.stats["skipped"] += 1
+        return None
+
+    embedding = await rag_service.embed_query_async(question)
+    knowledge_version = await rag_service.knowledge_version_async()
+    answer = await rag_service.executor.run(None, answer_cache.lookup, embedding, knowledge_version)
+    if answer is None:
+        _missed_lookups[callback_context.invocation_id] = (embedding, knowledge_version)
+        while len(_missed_lookups) > _MAX_MISSED_LOOKUPS:
+            _missed_lookups.popitem(last=False)
+        return None
+
+    # The agent run is skipped, so keep follow-ups sticky here
+    remember_active_specialist(callback_context)
+    return Content(role="model", parts=[Part(text=answer)])
+
+
+async def cache_answer(callback_context: CallbackContext):
+    """after_agent_callback: remember a standalone, non-personalized answer"""
+    missed = _missed_lookups.pop(callback_context.invocation_id, None)
+    if not settings.ENABLE_ANSWER_CACHE or callback_context.state.get(TOPIC_CHANGED_KEY):
+        return None
+
+    customer_id = callback_context.state.get("customer_id")
+    question = _question(callback_context)
+    if not question or not is_cacheable_question(question, customer_id):
+        return None
+
+    answer = _final_answer(callback_context)
+    if not answer or mentions_customer_data(answer, customer_id):
+        return None
+
+    if missed is None:
+        missed = (await rag_service.embed_query_async(question), await rag_service.knowledge_version_async())
+    embedding, knowledge_version = missed
+    await rag_service.executor.run(None, answer_cache.store, question, embedding, answer, knowledge_version)
+    return None
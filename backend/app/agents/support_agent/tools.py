@@ -1,49 +1,32 @@
-import asyncio
-from typing import Dict, Any, List
+import time
+from typing import Optional
+
+from google.adk.tools import ToolContext
+
 from ...services.rag_service import rag_service
 
 
-def search_knowledge_tool(query: str, category: str = None, session_context: Dict[str, Any] = None) -> str:
+async def search_knowledge_tool(query: str, tool_context: ToolContext, category: Optional[str] = None) -> str:
     """Search TBC Bank knowledge base with category filtering and session awareness
 
     Args:
         query: Customer's question or search query
         category: Optional category filter (cards, loans, support, etc.)
-        session_context: Current session context
 
     Returns:
         Relevant information from knowledge base
     """
 
-    async def _search():
-        # Search with category filter if provided
-        results = await rag_service.search_knowledge(query, limit=3, category_filter=category)
-
-        # Update session state with search activity
-        if session_context:
-            from ...services.session_memory_service import session_service
-
-            state_updates = {
-                "last_knowledge_search": {
-                    "query": query,
-                    "category": category,
-                    "results_count": len(results),
-                    "timestamp": asyncio.get_event_loop().time()
-                }
-            }
-
-            session_obj = await session_service.get_session(
-                app_name=session_context.get("app_name", "tbc_bank_chatbot"),
-                user_id=session_context.get("customer_id"),
-                session_id=session_context.get("session_id")
-            )
-
-            if session_obj:
-                await session_service.update_session_state(session_obj, state_updates)
+    # Search with category filter if provided
+    results = await rag_service.search_knowledge(query, limit=3, category_filter=category)
 
-        return results
-
-    results = asyncio.run(_search())
+    # Update session state with search activity
+    tool_context.state["last_knowledge_search"] = {
+        "query": query,
+        "category": category,
+        "results_count": len(results),
+        "timestamp": time.time()
+    }
 
     if not results:
         return "❌ No relevant information found in knowledge base. Let me help you contact our customer service team."
@@ -63,13 +46,10 @@ def search_knowledge_tool(query: str, category: str = None, session_context: Dic
     return response
 
 
-def get_categories_tool() -> str:
+async def get_categories_tool() -> str:
     """Get all available knowledge categories"""
 
-    async def _get_categories():
-        return await rag_service.get_categories()
-
-    categories = asyncio.run(_get_categories())
+    categories = await rag_service.get_categories()
 
     if not categories:
         return "❌ No categories available."
@@ -97,8 +77,16 @@ def get_categories_tool() -> str:
     return response
 
 
-def general_inquiry_tool(inquiry_type: str, details: str = "", session_context: Dict[str, Any] = None) -> str:
-    """Handle general banking inquiries with enhanced responses"""
+def general_inquiry_tool(inquiry_type: str, tool_context: ToolContext, details: str = "") -> str:
+    """Handle general banking inquiries with enhanced responses
+
+    Args:
+        inquiry_type: One of hours, contact, branches, atm, mobile_banking, fees
+        details: Optional extra context from the customer's question
+
+    Returns:
+        Information about the requested topic
+    """
 
     inquiries = {
         "hours": {
@@ -260,9 +248,12 @@ Use our mobile app or visit tbcbank.ge/branches
     if inquiry_type in inquiries:
         inquiry_data = inquiries[inquiry_type]
 
-        # Update session context if provided
-        if session_context:
-            asyncio.run(_update_inquiry_context(session_context, inquiry_type))
+        # Update session context
+        tool_context.state["last_general_inquiry"] = {
+            "type": inquiry_type,
+            "timestamp": time.time()
+        }
+        tool_context.state["inquiry_history"] = tool_context.state.get("inquiry_history", []) + [inquiry_type]
 
         response = f"{inquiry_data['title']}\n"
         response += inquiry_data['content']
@@ -290,28 +281,3 @@ Use our mobile app or visit tbcbank.ge/branches
 
         return response
 
-
-async def _update_inquiry_context(session_context: Dict[str, Any], inquiry_type: str):
-    """Update session context with inquiry information"""
-    try:
-        from ...services.session_memory_service import session_service
-
-        state_updates = {
-            "last_general_inquiry": {
-                "type": inquiry_type,
-                "timestamp": asyncio.get_event_loop().time()
-            },
-            "inquiry_history": session_context.get("inquiry_history", []) + [inquiry_type]
-        }
-
-        session_obj = await session_service.get_session(
-            app_name=session_context.get("app_name", "tbc_bank_chatbot"),
-            user_id=session_context.get("customer_id"),
-            session_id=session_context.get("session_id")
-        )
-
-        if session_obj:
-            await session_service.update_session_state(session_obj, state_updates)
-
-    except Exception as e:
-        print(f"❌ Error updating inquiry context: {e}")
@@ -1,12 +1,24 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
 from ..config import settings
 
 
+def to_async_url(database_url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (asyncpg / aiosqlite)"""
+    scheme, _, rest = database_url.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme in ("sqlite", "sqlite+pysqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return database_url
+
+
+# Sync engine: scripts and one-off maintenance only. The request path uses async_engine.
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
@@ -24,6 +36,25 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    echo=False,
+    **({} if settings.DATABASE_URL.startswith("sqlite") else {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_recycle": 3600,
+    })
+)
+
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -41,11 +72,28 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Database error: {e}")
+            raise
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created successfully")
 
 
+async def create_tables_async():
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    print("✅ Database tables created successfully")
+
+
 def drop_tables():
     Base.metadata.drop_all(bind=engine)
     print("✅ Database tables dropped successfully")
@@ -55,7 +103,7 @@ def drop_tables():
 def test_connection():
     try:
         with engine.connect() as connection:
-            result = connection.execute("SELECT 1")
+            result = connection.execute(text("SELECT 1"))
             print("✅ Database connection successful")
             return True
     except Exception as e:
@@ -67,7 +115,7 @@ def test_connection():
 def get_db_health() -> dict:
     try:
         with engine.connect() as connection:
-            result = connection.execute("SELECT 1")
+            result = connection.execute(text("SELECT 1"))
             pool = engine.pool
             return {
                 "status": "healthy",
@@ -81,3 +129,33 @@ def get_db_health() -> dict:
             "status": "unhealthy",
             "error": str(e)
         }
+
+
+async def test_async_connection():
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            print("✅ Database connection successful")
+            return True
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return False
+
+
+async def get_async_db_health() -> dict:
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            pool = async_engine.pool
+            return {
+                "status": "healthy",
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checked_in": pool.checkedin()
+            }
+    except Exception as e:
+        return {
+            "status": "unhealthy",
+            "error": str(e)
+        }
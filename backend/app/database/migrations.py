@@ -0,0 +1,97 @@
+"""Additive schema changes that create_all cannot apply to tables that already exist.
+
+Every step checks the live schema first, so running the upgrade again (or on a
+database created from the current models) does nothing.
+
+    cd backend && python -m app.database.migrations upgrade
+"""
+import argparse
+
+from sqlalchemy import Connection, inspect, text
+
+from .connection import async_engine, engine
+from .models import Card, ChatMessage, Loan, Transaction
+
+BACKFILL_BATCH_SIZE = 5000
+
+_BACKFILL_CARD_LAST4 = text("""
+    UPDATE cards
+    SET last4 = CASE WHEN length(card_number) > 4 THEN substr(card_number, length(card_number) - 3) ELSE card_number END
+    WHERE id IN (SELECT id FROM cards WHERE last4 IS NULL AND card_number IS NOT NULL LIMIT :batch_size)
+""")
+
+
+def create_index(connection: Connection, table, name: str):
+    """Create one of the model's indexes if the database does not have it yet"""
+    for index in table.indexes:
+        if index.name == name:
+            index.create(connection, checkfirst=True)
+    connection.commit()
+
+
+def add_card_last4(connection: Connection, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Add cards.last4, backfill it in committed batches and index it; returns rows backfilled"""
+    columns = {column["name"] for column in inspect(connection).get_columns("cards")}
+    if "last4" not in columns:
+        connection.execute(text("ALTER TABLE cards ADD COLUMN last4 VARCHAR(4)"))
+        connection.commit()
+
+    backfilled = 0
+    while True:
+        # Short transactions keep row locks brief on a live cards table
+        updated = connection.execute(_BACKFILL_CARD_LAST4, {"batch_size": batch_size}).rowcount
+        connection.commit()
+        if not updated:
+            break
+        backfilled += updated
+
+    create_index(connection, Card.__table__, "ix_cards_customer_id_last4")
+    return backfilled
+
+
+def add_chat_message_routing_source(connection: Connection):
+    """Add chat_messages.routing_source; older rows stay NULL and are left out of intent training"""
+    columns = {column["name"] for column in inspect(connection).get_columns(ChatMessage.__tablename__)}
+    if "routing_source" not in columns:
+        connection.execute(text("ALTER TABLE chat_messages ADD COLUMN routing_source VARCHAR"))
+        connection.commit()
+
+
+def add_loan_status_index(connection: Connection):
+    create_index(connection, Loan.__table__, "ix_loans_customer_id_status")
+
+
+def add_transaction_history_index(connection: Connection):
+    create_index(connection, Transaction.__table__, "ix_transactions_card_history")
+
+
+def upgrade(connection: Connection, batch_size: int = BACKFILL_BATCH_SIZE):
+    backfilled = add_card_last4(connection, batch_size)
+    add_loan_status_index(connection)
+    add_transaction_history_index(connection)
+    add_chat_message_routing_source(connection)
+    if backfilled:
+        print(f"✅ Backfilled last4 for {backfilled} cards")
+
+
+def upgrade_schema(batch_size: int = BACKFILL_BATCH_SIZE):
+    with engine.connect() as connection:
+        upgrade(connection, batch_size)
+    print("✅ Database schema is up to date")
+
+
+async def upgrade_schema_async(batch_size: int = BACKFILL_BATCH_SIZE):
+    async with async_engine.connect() as connection:
+        await connection.run_sync(upgrade, batch_size)
+    print("✅ Database schema is up to date")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database schema upgrades")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subcommands.add_parser("upgrade", help="Add missing columns and indexes, backfilling existing rows")
+    upgrade_parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        upgrade_schema(args.batch_size)
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from typing import Optional
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, Text, UniqueConstraint
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 
-Base = declarative_base()
+from .connection import Base
 
 
 class Customer(Base):
@@ -21,8 +22,18 @@ class Customer(Base):
     transactions = relationship("Transaction", back_populates="customer")
 
 
+def card_last4(card_number: Optional[str]) -> Optional[str]:
+    return card_number[-4:] if card_number else None
+
+
+def _default_last4(context) -> Optional[str]:
+    return card_last4(context.get_current_parameters().get("card_number"))
+
+
 class Card(Base):
     __tablename__ = "cards"
+    # Cards are looked up by the digits a customer quotes, always within one customer
+    __table_args__ = (Index("ix_cards_customer_id_last4", "customer_id", "last4"),)
 
     id = Column(Integer, primary_key=True, index=True)
     card_number = Column(String, unique=True, index=True)
@@ -31,15 +42,22 @@ class Card(Base):
     credit_limit = Column(Float, default=0.0)
     is_blocked = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
+    last4 = Column(String(4), default=_default_last4)
     customer_id = Column(Integer, ForeignKey("customers.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     customer = relationship("Customer", back_populates="cards")
     transactions = relationship("Transaction", back_populates="card")
 
+    @validates("card_number")
+    def _sync_last4(self, key, card_number):
+        self.last4 = card_last4(card_number)
+        return card_number
+
 
 class Loan(Base):
     __tablename__ = "loans"
+    __table_args__ = (Index("ix_loans_customer_id_status", "customer_id", "status"),)
 
     id = Column(Integer, primary_key=True, index=True)
     loan_id = Column(String, unique=True, index=True)
@@ -57,6 +75,14 @@ class Loan(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Keyset pagination and statement export walk a card's history in (created_at, id) order;
+    # on PostgreSQL the included columns let that be an index-only scan
+    __table_args__ = (
+        Index(
+            "ix_transactions_card_history", "card_id", "created_at", "id",
+            postgresql_include=["transaction_id", "amount", "transaction_type", "description", "status"]
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(String, unique=True, index=True)
@@ -72,6 +98,28 @@ class Transaction(Base):
     customer = relationship("Customer", back_populates="transactions")
 
 
+class IdempotencyKey(Base):
+    """Outcome of a completed transfer, replayed when a client retries with the same key"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("customer_id", "key", name="uq_idempotency_keys_customer_id_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CustomerChange(Base):
+    """One committed write to a customer's cards; other worker processes poll these to invalidate their caches"""
+    __tablename__ = "customer_changes"
+
+    id = Column(Integer, primary_key=True)
+    customer_id = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
 
@@ -90,4 +138,6 @@ class ChatMessage(Base):
     role = Column(String)  # user, assistant, system
     content = Column(Text)
     agent_name = Column(String, nullable=True)
+    # On assistant messages: preferred, sticky, intent, coordinator or hand_back (see AgentRouter.route)
+    routing_source = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,51 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .connection import AsyncSessionLocal
+
+
+class UnitOfWork:
+    """One AsyncSession (and identity map) shared by every tool call of an agent turn"""
+
+    def __init__(self):
+        self.session: AsyncSession = AsyncSessionLocal()
+        # ADK may run parallel function calls; an AsyncSession is not safe for concurrent use
+        self.lock = asyncio.Lock()
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("current_unit_of_work", default=None)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """Open the unit of work for an agent invocation; tools inside it share its session"""
+    uow = UnitOfWork()
+    token = _current_unit_of_work.set(uow)
+    try:
+        yield uow
+    finally:
+        _current_unit_of_work.reset(token)
+        await uow.session.close()
+
+
+@asynccontextmanager
+async def tool_session() -> AsyncIterator[AsyncSession]:
+    """Session for a tool call: the current unit of work's, or a fresh one outside an agent turn"""
+    uow = _current_unit_of_work.get()
+    if uow is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    async with uow.lock:
+        try:
+            yield uow.session
+        except Exception:
+            # Rollback expires every loaded row, so drop anything cached against the session too
+            await uow.session.rollback()
+            uow.session.info.clear()
+            raise
@@ -1,24 +1,48 @@
+import json
 import logging
+import os
 import uuid
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from contextlib import aclosing
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
 from google.adk.runners import Runner
+from google.adk.sessions.session import Session
 from google.genai.types import Content, Part
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .agents.card_operations_agent.agent import card_operations_agent
 from .agents.coordinator_agent.agent import coordinator_agent
 from .agents.loan_agent.agent import loan_agent
 from .agents.support_agent.agent import support_agent
 from .config import settings
-from .database.connection import get_db, test_connection, get_db_health, create_tables
+from .database.connection import (
+    AsyncSessionLocal,
+    create_tables_async,
+    get_async_db,
+    get_async_db_health,
+    test_async_connection,
+)
+from .database.migrations import upgrade_schema_async
 from .database.models import ChatMessage
+from .database.unit_of_work import unit_of_work
 from .services.rag_service import rag_service
+from .services.answer_cache import answer_cache
+from .services.banking_service import banking_service
+from .services.ingestion_service import ingestion_service
+from .services.intent_router import load_intent_router
+from .services.routing_service import AgentRouter
 from .services.session_memory_service import session_service
+from .services.statement_export import STATEMENT_MEDIA_TYPES, statement_chunks
+from .services.transcript_service import transcript_writer
 
 logging.basicConfig(
     level=getattr(logging, settings.LOG_LEVEL),
@@ -27,8 +51,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-create_tables()
-
 app = FastAPI(
     title="TBC Bank Multi-Agent Chatbot",
     version="1.0.0",
@@ -77,6 +99,12 @@ agents = {
     )
 }
 
+agent_router = AgentRouter(
+    agents.keys(),
+    settings.STICKY_AGENT_TIMEOUT_MINUTES,
+    intent_router=load_intent_router() if settings.ENABLE_INTENT_ROUTER else None
+)
+
 
 
 class ChatRequest(BaseModel):
@@ -105,6 +133,11 @@ class SessionInfo(BaseModel):
     operations_count: int
 
 
+class IngestionRequest(BaseModel):
+    path: Optional[str] = None
+    force: bool = False
+
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
@@ -117,83 +150,130 @@ async def get_current_customer(credentials: HTTPAuthorizationCredentials = Depen
     return "CUST001"
 
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(
-        request: ChatRequest,
-        current_customer: str = Depends(get_current_customer),
-        db=Depends(get_db)
-):
+# A coordinator that keeps routing to specialists who hand back gets this many retries
+MAX_HAND_BACKS_PER_TURN = 2
 
-    try:
-        logger.info(f"Chat request from {request.customer_id}: {request.message[:50]}...")
+FALLBACK_RESPONSE = "I apologize, but I'm having trouble processing your request right now. Please try again or contact our customer service at (995 32) 2272727."
+
+
+async def _get_or_create_session(request: ChatRequest) -> Session:
+    """Return the request's ADK session, creating it if needed"""
 
-        session_id = request.session_id or str(uuid.uuid4())
+    session_id = request.session_id or str(uuid.uuid4())
 
-        existing_session = await session_service.get_session(
+    existing_session = await session_service.get_session(
+        app_name="tbc_bank_chatbot",
+        user_id=request.customer_id,
+        session_id=session_id
+    )
+
+    if not existing_session:
+        initial_state = {
+            "customer_id": request.customer_id,
+            "conversation_start": datetime.now().isoformat(),
+            "context": request.context or {},
+            "preferred_language": "en",
+            "banking_context": True,
+            "user_preferences": {},
+            "active_operations": [],
+            "conversation_history": [],
+            "agent_switches": 0
+        }
+
+        return await session_service.create_session(
             app_name="tbc_bank_chatbot",
             user_id=request.customer_id,
-            session_id=session_id
+            session_id=session_id,
+            initial_state=initial_state
         )
 
-        if not existing_session:
-            initial_state = {
-                "customer_id": request.customer_id,
-                "conversation_start": datetime.now().isoformat(),
-                "context": request.context or {},
-                "preferred_language": "en",
-                "banking_context": True,
-                "user_preferences": {},
-                "active_operations": [],
-                "conversation_history": [],
-                "agent_switches": 0
-            }
+    return existing_session
+
+
+async def _run_turn(current_agent: str, request: ChatRequest, session_id: str,
+                    run_config: Optional[RunConfig] = None,
+                    routing: Optional[Dict[str, str]] = None) -> AsyncIterator[Event]:
+    """Run one chat turn on the chosen runner.
+
+    If a specialist hands the topic back, the same turn is replayed through the
+    coordinator; the user message is already in the session, so it is not sent again.
+    That includes a specialist the coordinator itself routed to in this turn,
+    whose hand-back the coordinator then sees in its history. At most
+    ``MAX_HAND_BACKS_PER_TURN`` replays happen. ``routing["source"]`` then
+    becomes ``hand_back``.
+    """
+    run_config = run_config or RunConfig()
+    new_message = Content(
+        role="user",
+        parts=[Part(text=request.message)]
+    )
 
-            session_obj = await session_service.create_session(
-                app_name="tbc_bank_chatbot",
-                user_id=request.customer_id,
-                session_id=session_id,
-                initial_state=initial_state
-            )
-        else:
-            session_obj = existing_session
+    async with unit_of_work():
+        runner = current_agent
+        for hand_backs in range(MAX_HAND_BACKS_PER_TURN + 1):
+            handed_back_by = None
+            async for event in agents[runner].run_async(
+                    user_id=request.customer_id,
+                    session_id=session_id,
+                    new_message=new_message,
+                    run_config=run_config
+            ):
+                if agent_router.is_hand_back(event):
+                    handed_back_by = event.author or runner
+                    continue
+                yield event
 
-        user_message = ChatMessage(
-            session_id=session_id,
-            role="user",
-            content=request.message
-        )
-        db.add(user_message)
-        db.commit()
+            if not handed_back_by or hand_backs == MAX_HAND_BACKS_PER_TURN:
+                return
+            if routing is not None:
+                routing["source"] = "hand_back"
+            logger.info(f"{handed_back_by} handed session {session_id} back to the coordinator")
+            runner, new_message = "coordinator", None
 
-        current_agent = request.preferred_agent or "coordinator"
-        if current_agent not in agents:
-            current_agent = "coordinator"
 
-        user_content = Content(
-            role="user",
-            parts=[Part(text=request.message)]
-        )
+def _event_text(event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text)
+
+
+def _sse(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat_endpoint(
+        request: ChatRequest,
+        current_customer: str = Depends(get_current_customer)
+):
+
+    try:
+        logger.info(f"Chat request from {request.customer_id}: {request.message[:50]}...")
+
+        session_obj = await _get_or_create_session(request)
+        session_id = session_obj.id
+
+        await transcript_writer.log_message(session_id, "user", request.message)
+
+        current_agent, routing_source = agent_router.route(request.preferred_agent, session_obj.state, request.message)
+        routing = {"source": routing_source}
 
         final_response = None
         agent_name = None
 
         try:
-            async for event in agents[current_agent].run_async(
-                    user_id=request.customer_id,
-                    session_id=session_id,
-                    new_message=user_content
-            ):
-                if event.is_final_response() and event.content and event.content.parts:
-                    final_response = event.content.parts[0].text
-                    agent_name = event.agent_name or current_agent
-                    break
+            async with aclosing(_run_turn(current_agent, request, session_id, routing=routing)) as events:
+                async for event in events:
+                    if event.is_final_response() and _event_text(event):
+                        final_response = _event_text(event)
+                        agent_name = event.author or current_agent
         except Exception as agent_error:
             logger.error(f"Agent error: {agent_error}")
-            final_response = "I apologize, but I'm having trouble processing your request right now. Please try again or contact our customer service at (995 32) 2272727."
+            final_response = FALLBACK_RESPONSE
             agent_name = current_agent
 
         if not final_response:
-            final_response = "I apologize, but I'm having trouble processing your request right now. Please try again or contact our customer service at (995 32) 2272727."
+            final_response = FALLBACK_RESPONSE
             agent_name = current_agent
 
         updated_session = await session_service.get_session(
@@ -202,14 +282,7 @@ async def chat_endpoint(
             session_id=session_id
         )
 
-        assistant_message = ChatMessage(
-            session_id=session_id,
-            role="assistant",
-            content=final_response,
-            agent_name=agent_name
-        )
-        db.add(assistant_message)
-        db.commit()
+        await transcript_writer.log_message(session_id, "assistant", final_response, agent_name, routing["source"])
 
         # Generate suggestions
         suggestions = _generate_suggestions(agent_name, updated_session.state if updated_session else {})
@@ -232,6 +305,103 @@ async def chat_endpoint(
         )
 
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(
+        request: ChatRequest,
+        current_customer: str = Depends(get_current_customer)
+):
+    """Stream a chat turn as Server-Sent Events while the agent run is in flight.
+
+    Emits ``session``, ``agent`` (handoffs), ``tool_call``/``tool_result``,
+    ``delta`` (partial text) and a closing ``done`` event carrying the same
+    payload as ``/api/chat``.
+    """
+
+    try:
+        logger.info(f"Streaming chat request from {request.customer_id}: {request.message[:50]}...")
+        session_obj = await _get_or_create_session(request)
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing chat request: {str(e)}"
+        )
+
+    session_id = session_obj.id
+    current_agent, routing_source = agent_router.route(request.preferred_agent, session_obj.state, request.message)
+    routing = {"source": routing_source}
+
+    async def event_stream():
+        try:
+            await transcript_writer.log_message(session_id, "user", request.message)
+            yield _sse("session", {"session_id": session_id, "agent_name": current_agent})
+
+            final_response = None
+            agent_name = current_agent
+            active_author = None
+
+            try:
+                run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+                async with aclosing(_run_turn(current_agent, request, session_id, run_config, routing)) as events:
+                    async for event in events:
+                        if event.author and event.author != "user" and event.author != active_author:
+                            active_author = event.author
+                            yield _sse("agent", {"agent_name": event.author})
+
+                        for call in event.get_function_calls():
+                            yield _sse("tool_call", {"agent_name": event.author, "tool": call.name})
+
+                        for function_response in event.get_function_responses():
+                            yield _sse("tool_result", {"agent_name": event.author, "tool": function_response.name})
+
+                        if event.partial:
+                            text = _event_text(event)
+                            if text:
+                                yield _sse("delta", {"agent_name": event.author, "text": text})
+                        elif event.is_final_response() and _event_text(event):
+                            final_response = _event_text(event)
+                            agent_name = event.author or current_agent
+            except Exception as agent_error:
+                logger.error(f"Agent error: {agent_error}")
+                final_response = FALLBACK_RESPONSE
+                agent_name = current_agent
+
+            if not final_response:
+                final_response = FALLBACK_RESPONSE
+                agent_name = current_agent
+
+            updated_session = await session_service.get_session(
+                app_name="tbc_bank_chatbot",
+                user_id=request.customer_id,
+                session_id=session_id
+            )
+
+            await transcript_writer.log_message(session_id, "assistant", final_response, agent_name, routing["source"])
+
+            session_state = updated_session.state if updated_session else {}
+            done = ChatResponse(
+                response=final_response,
+                session_id=session_id,
+                agent_name=agent_name,
+                session_state=session_state,
+                suggestions=_generate_suggestions(agent_name, session_state)
+            )
+
+            logger.info(f"Streamed chat response to {request.customer_id}: {len(final_response)} chars")
+
+            yield _sse("done", done.model_dump())
+
+        except Exception as e:
+            logger.error(f"Error in chat stream: {e}")
+            yield _sse("error", {"session_id": session_id, "detail": f"Error processing chat request: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 def _generate_suggestions(agent_name: str, session_state: Dict[str, Any]) -> List[str]:
     """Generate contextual suggestions based on agent and session state"""
 
@@ -278,7 +448,7 @@ def _generate_suggestions(agent_name: str, session_state: Dict[str, Any]) -> Lis
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
 
-    db_health = get_db_health()
+    db_health = await get_async_db_health()
 
     services_status = {}
 
@@ -311,11 +481,131 @@ async def health_check():
     )
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """Operational counters for the chat hot path"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "routing": agent_router.metrics(),
+        "sessions": session_service.memory_service.metrics(),
+        "transcripts": {**transcript_writer.stats, "queue_depth": transcript_writer.queue_depth},
+        "embedding_cache": rag_service.embedding_cache.metrics(),
+        "answer_cache": answer_cache.metrics(),
+        "customer_cache": banking_service.customer_cache.metrics(),
+        "customer_changes": banking_service.change_feed.metrics(),
+        "retrieval": dict(rag_service.retrieval_stats),
+        "retrieval_executor": rag_service.executor.metrics(),
+    }
+
+
+def _knowledge_path(relative_path: Optional[str]) -> str:
+    """Resolve a request path, confined to KNOWLEDGE_SOURCE_DIRECTORY"""
+    root = os.path.realpath(settings.KNOWLEDGE_SOURCE_DIRECTORY)
+    path = os.path.realpath(os.path.join(root, relative_path or ""))
+    if os.path.commonpath([root, path]) != root or not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Path not found in knowledge directory")
+    return path
+
+
+@app.post("/api/knowledge/ingest", status_code=status.HTTP_202_ACCEPTED)
+async def start_ingestion(
+        request: IngestionRequest,
+        current_customer: str = Depends(get_current_customer)
+):
+    """Start a background ingestion of files under KNOWLEDGE_SOURCE_DIRECTORY"""
+    path = _knowledge_path(request.path)
+    try:
+        job_id = ingestion_service.start_job(path, force=request.force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    return ingestion_service.jobs[job_id]
+
+
+@app.post("/api/knowledge/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def start_rebuild(
+        request: IngestionRequest,
+        current_customer: str = Depends(get_current_customer)
+):
+    """Build a new knowledge collection in the background and swap it in once it passes the smoke queries"""
+    path = _knowledge_path(request.path)
+    try:
+        job_id = ingestion_service.start_job(path, rebuild=True)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    return ingestion_service.jobs[job_id]
+
+
+@app.post("/api/knowledge/rollback")
+async def rollback_knowledge(current_customer: str = Depends(get_current_customer)):
+    """Serve the previous knowledge collection again"""
+    try:
+        rag_service.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return rag_service.knowledge_versions()
+
+
+@app.get("/api/knowledge/versions")
+async def get_knowledge_versions(current_customer: str = Depends(get_current_customer)):
+    """Active knowledge collection, the one this worker serves and the rollback history"""
+    return rag_service.knowledge_versions()
+
+
+@app.get("/api/knowledge/ingest/{job_id}")
+async def get_ingestion_job(
+        job_id: str,
+        current_customer: str = Depends(get_current_customer)
+):
+    """Progress and throughput of an ingestion job"""
+    job = ingestion_service.jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingestion job not found")
+    return job
+
+
+@app.get("/api/cards/{card_number}/statement")
+async def export_statement(
+        card_number: str,
+        format: str = "csv",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        current_customer: str = Depends(get_current_customer),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Stream a card's transactions between two dates (inclusive) as CSV or NDJSON"""
+    if format not in STATEMENT_MEDIA_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be csv or ndjson")
+
+    card = await banking_service.get_snapshot_card(current_customer, card_number, db)
+    if not card:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card not found")
+
+    since = datetime.combine(start_date, datetime.min.time()) if start_date else None
+    until = datetime.combine(end_date + timedelta(days=1), datetime.min.time()) if end_date else None
+
+    async def body() -> AsyncIterator[str]:
+        # The stream outlives the request's session, so it reads through its own
+        async with AsyncSessionLocal() as stream_db:
+            transactions = banking_service.stream_card_statement(
+                card["id"], stream_db, since, until, settings.STATEMENT_EXPORT_BATCH_SIZE
+            )
+            async for chunk in statement_chunks(transactions, format):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=STATEMENT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="statement-{card["last4"]}.{format}"'}
+    )
+
+
 @app.get("/api/sessions/{session_id}", response_model=SessionInfo)
 async def get_session_info(
         session_id: str,
         current_customer: str = Depends(get_current_customer),
-        db=Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get detailed session information"""
 
@@ -332,9 +622,15 @@ async def get_session_info(
                 detail="Session not found"
             )
 
-        messages = db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).order_by(ChatMessage.created_at).all()
+        # Messages are written behind the chat path; make this read see this session's
+        await transcript_writer.flush(session_id)
+
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at, ChatMessage.id)
+        )
+        messages = result.scalars().all()
 
         formatted_messages = [
             {
@@ -375,8 +671,13 @@ async def startup_event():
     """Initialize application with enhanced services"""
     logger.info("🚀 TBC Bank Multi-Agent Chatbot starting up...")
 
+    await create_tables_async()
+    await upgrade_schema_async()
+    await transcript_writer.start()
+    await banking_service.change_feed.start()
+
     # Test database connection
-    if not test_connection():
+    if not await test_async_connection():
         logger.error("❌ Database connection failed!")
 
     try:
@@ -407,6 +708,16 @@ async def startup_event():
         logger.warning("⚠️  Some services may not be fully functional")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush background writers before the process exits"""
+    await transcript_writer.stop()
+    await banking_service.change_feed.stop()
+    await session_service.close()
+    rag_service.close()
+    logger.info("👋 TBC Bank Multi-Agent Chatbot shut down")
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,177 @@
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import chromadb
+
+from ..config import settings
+from .embedding_cache import Embedding
+
+logger = logging.getLogger(__name__)
+
+# Questions about the asker's own accounts (English and Georgian). Plain first person
+# ("how do I open an account?", "what documents do I need?") is general and stays cacheable.
+_ACCOUNT_NOUNS = (
+    r"(?:card|cards|account|accounts|balance|balances|limit|limits|loan|loans|mortgage|transactions?|"
+    r"transfers?|payments?|statements?|salary|deposits?|debt|pin|application|eligibility|credit score)"
+)
+_PERSONAL_PATTERN = re.compile(
+    rf"\b(?:my|our|mine)\s+(?:\w+\s+)?{_ACCOUNT_NOUNS}\b"
+    r"|\b(?:is|was|are|were|has|have|did)\s+(?:my|our)\b"
+    r"|\b(?:am i|do i qualify|do i owe|i owe|how much (?:can|do|did|will) i|what can i afford)\b"
+    r"|ჩემ\w*\s+(?:ბარათ|ანგარიშ|ბალანს|სესხ|ლიმიტ|ტრანზაქც|გადარიცხვ)|მაქვს|მემართება",
+    re.IGNORECASE
+)
+# Referential follow-ups ("what about that one?") depend on the previous turn
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|that|this|those|these|them|they|one|ones|also|else|same|ეს|ის|იგი)\b",
+    re.IGNORECASE
+)
+# Card numbers (full, masked or "ending in"), IBANs and customer/transaction ids
+_CUSTOMER_DATA_PATTERN = re.compile(
+    r"\b(?:\d{4}[ -]?){3}\d{4}\b|\*{2,}\s?\d{4}|ending (?:in )?\d{4}|\bGE\d{2}[A-Z]{2}\d+|\b(?:CUST|TXN)\d+",
+    re.IGNORECASE
+)
+# Any longer number in a question (amount, card, phone) is specific to the asker
+_NUMBER_PATTERN = re.compile(r"\d{4,}|\d+[.,]\d+")
+
+
+def mentions_customer_data(text: str, customer_id: Optional[str] = None) -> bool:
+    """True when the text carries a customer's identifiers, cards or accounts"""
+    if customer_id and customer_id.lower() in text.lower():
+        return True
+    return bool(_CUSTOMER_DATA_PATTERN.search(text))
+
+
+def is_cacheable_question(question: str, customer_id: Optional[str] = None) -> bool:
+    """Only standalone questions that are not about the asker may share answers"""
+    return not (
+        mentions_customer_data(question, customer_id)
+        or _PERSONAL_PATTERN.search(question)
+        or _NUMBER_PATTERN.search(question)
+        or _FOLLOW_UP_PATTERN.search(question)
+    )
+
+
+class SemanticAnswerCache:
+    """Recent support answers, looked up by question embedding similarity.
+
+    Entries live in an in-process Chroma collection (cosine HNSW), expire after
+    a TTL and are bounded in number. Each entry is tied to the knowledge
+    collection version it was answered from; a version change drops them all.
+
+    ``lookup`` and ``store`` make blocking Chroma calls, so callers run them on
+    the retrieval executor; a lock keeps concurrent calls from interleaving.
+    """
+
+    def __init__(self, similarity_threshold: float, ttl_seconds: float, max_entries: int):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.client = chromadb.EphemeralClient()
+        self.collection = self._create_collection()
+        # entry id -> expiry time, in insertion order
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._knowledge_version: Optional[str] = None
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "skipped": 0, "expired": 0, "invalidations": 0}
+
+    def _create_collection(self):
+        return self.client.get_or_create_collection(
+            name="support_answer_cache",
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None
+        )
+
+    def lookup(self, embedding: Embedding, knowledge_version: str) -> Optional[str]:
+        with self._lock:
+            return self._lookup(embedding, knowledge_version)
+
+    def _lookup(self, embedding: Embedding, knowledge_version: str) -> Optional[str]:
+        self._check_version(knowledge_version)
+        self._expire()
+        if not self._entries:
+            self.stats["misses"] += 1
+            return None
+
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=1,
+            include=["metadatas", "distances"]
+        )
+        if results["ids"][0]:
+            similarity = 1 - results["distances"][0][0]
+            if similarity >= self.similarity_threshold:
+                self.stats["hits"] += 1
+                logger.info(f"🎯 Answer cache hit (similarity {similarity:.3f})")
+                return results["metadatas"][0][0]["answer"]
+
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, question: str, embedding: Embedding, answer: str, knowledge_version: str):
+        with self._lock:
+            self._store(question, embedding, answer, knowledge_version)
+
+    def _store(self, question: str, embedding: Embedding, answer: str, knowledge_version: str):
+        self._check_version(knowledge_version)
+        entry_id = str(uuid.uuid4())
+        self.collection.add(
+            ids=[entry_id],
+            embeddings=[embedding],
+            metadatas=[{"question": question, "answer": answer, "created_at": time.time()}]
+        )
+        self._entries[entry_id] = time.monotonic() + self.ttl_seconds
+        self.stats["stored"] += 1
+
+        if len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self.collection.delete(ids=[oldest])
+
+    def invalidate(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self.client.delete_collection("support_answer_cache")
+            self.collection = self._create_collection()
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+    def _check_version(self, knowledge_version: str):
+        if self._knowledge_version != knowledge_version:
+            if self._entries:
+                logger.info("🔄 Knowledge collection changed, clearing answer cache")
+                self.invalidate()
+            self._knowledge_version = knowledge_version
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = []
+        for entry_id, expires_at in self._entries.items():
+            if expires_at > now:
+                break
+            expired.append(entry_id)
+        if expired:
+            for entry_id in expired:
+                del self._entries[entry_id]
+            self.collection.delete(ids=expired)
+            self.stats["expired"] += len(expired)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES
+)
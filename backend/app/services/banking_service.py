@@ -1,54 +1,188 @@
+import asyncio
+import base64
+import hashlib
+import json
 import random
-from typing import List, Dict, Optional
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
 from faker import Faker
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, inspect, select, tuple_, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from ..database.models import Customer, Transaction
+from ..config import settings
+from ..database.models import Card, Customer, IdempotencyKey, Loan, Transaction, card_last4
+from .customer_cache import CustomerChangeFeed, CustomerSnapshotCache
 
 fake = Faker()
 
+_TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.transaction_id,
+    Transaction.amount,
+    Transaction.transaction_type,
+    Transaction.description,
+    Transaction.status,
+    Transaction.created_at,
+)
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque page token for the keyset (created_at, id)"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+
+def new_transaction_id() -> str:
+    """Random 128-bit transaction ID; unlike a six-digit counter it does not collide under volume"""
+    return f"TXN{uuid.uuid4().hex.upper()}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for a malformed token"""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid page token: {cursor}") from e
+
 
 class BankingService:
     def __init__(self):
         self.fake = fake
+        self.customer_cache = CustomerSnapshotCache(
+            ttl_seconds=settings.CUSTOMER_CACHE_TTL_SECONDS,
+            max_entries=settings.CUSTOMER_CACHE_MAX_ENTRIES
+        )
+        self.change_feed = CustomerChangeFeed(
+            self.customer_cache,
+            poll_interval=settings.CUSTOMER_CHANGES_POLL_SECONDS,
+            retained=settings.CUSTOMER_CHANGES_RETAINED
+        )
 
-    async def get_customer_by_id(self, customer_id: str, db: Session) -> Optional[Customer]:
-        """Get customer by ID"""
-        return db.query(Customer).filter(Customer.customer_id == customer_id).first()
+    async def get_customer_by_id(self, customer_id: str, db: AsyncSession,
+                                 with_loans: bool = False) -> Optional[Customer]:
+        """Get customer by ID with cards (and optionally loans) eagerly loaded
 
-    async def get_customer_cards(self, customer_id: str, db: Session) -> List[Dict]:
-        """Get all cards for a customer"""
+        Loaded customers are remembered in ``db.info``, so tool calls sharing one
+        unit of work reuse the rows already in the session's identity map.
+        """
+        loaded_customers = db.info.setdefault("customers", {})
+        customer = loaded_customers.get(customer_id)
+        if customer is not None and not (with_loans and "loans" in inspect(customer).unloaded):
+            return customer
+
+        options = [selectinload(Customer.cards)]
+        if with_loans:
+            options.append(selectinload(Customer.loans))
+
+        result = await db.execute(
+            select(Customer).options(*options).where(Customer.customer_id == customer_id)
+        )
+        customer = result.scalars().first()
+        if customer is not None:
+            loaded_customers[customer_id] = customer
+        return customer
+
+    async def get_customer_card(self, customer_id: str, card_number: str,
+                                db: AsyncSession) -> Tuple[Optional[int], Optional[Card]]:
+        """Find a customer's card by its last 4 digits
+
+        Returns the customer's primary key and the card from one indexed query,
+        so callers can tell an unknown customer ``(None, None)`` from an unknown
+        card ``(id, None)``. A customer already loaded in this unit of work is
+        matched against its cards in memory instead.
+        """
+        last4 = card_last4(card_number)
+        customer = db.info.get("customers", {}).get(customer_id)
+        if customer is not None:
+            return customer.id, next((card for card in customer.cards if card.last4 == last4), None)
+
+        result = await db.execute(
+            select(Customer.id, Card)
+            .outerjoin(Card, and_(Card.customer_id == Customer.id, Card.last4 == last4))
+            .where(Customer.customer_id == customer_id)
+            .order_by(Card.id)
+            .limit(1)
+        )
+        row = result.first()
+        if row is None:
+            return None, None
+        return row[0], row[1]
+
+    @staticmethod
+    def _snapshot(customer: Customer) -> Dict:
+        return {
+            "id": customer.id,
+            "customer_id": customer.customer_id,
+            "name": customer.name,
+            "email": customer.email,
+            "phone": customer.phone,
+            "cards": [
+                {
+                    "id": card.id,
+                    "card_number": card.card_number,
+                    "last4": card.last4,
+                    "card_type": card.card_type,
+                    "balance": card.balance,
+                    "credit_limit": card.credit_limit,
+                    "is_blocked": card.is_blocked,
+                    "is_active": card.is_active
+                }
+                for card in customer.cards
+            ]
+        }
+
+    async def get_customer_snapshot(self, customer_id: str, db: AsyncSession) -> Optional[Dict]:
+        """Profile, cards and balances as plain data, read through the customer cache
+
+        A customer already loaded in this unit of work is used as is; it is at
+        least as fresh as anything cached.
+        """
+        customer = db.info.get("customers", {}).get(customer_id)
+        if customer is not None:
+            return self._snapshot(customer)
+
+        snapshot = self.customer_cache.get(customer_id)
+        if snapshot is not None:
+            return snapshot
+
+        token = self.customer_cache.begin_load()
         customer = await self.get_customer_by_id(customer_id, db)
+        if customer is None:
+            return None
+        snapshot = self._snapshot(customer)
+        self.customer_cache.put(customer_id, snapshot, token)
+        return snapshot
+
+    async def get_customer_cards(self, customer_id: str, db: AsyncSession) -> List[Dict]:
+        """Get all cards for a customer"""
+        customer = await self.get_customer_snapshot(customer_id, db)
         if not customer:
             return []
 
         cards = []
-        for card in customer.cards:
+        for card in customer["cards"]:
             cards.append({
-                "id": card.id,
-                "card_number": f"****-****-****-{card.card_number[-4:]}",
-                "card_type": card.card_type,
-                "balance": card.balance,
-                "credit_limit": card.credit_limit,
-                "is_blocked": card.is_blocked,
-                "is_active": card.is_active
+                "id": card["id"],
+                "card_number": f"****-****-****-{card['card_number'][-4:]}",
+                "card_type": card["card_type"],
+                "balance": card["balance"],
+                "credit_limit": card["credit_limit"],
+                "is_blocked": card["is_blocked"],
+                "is_active": card["is_active"]
             })
         return cards
 
-    async def block_card(self, customer_id: str, card_number: str, db: Session) -> Dict:
+    async def block_card(self, customer_id: str, card_number: str, db: AsyncSession) -> Dict:
         """Block a customer's card"""
-        customer = await self.get_customer_by_id(customer_id, db)
-        if not customer:
+        customer_pk, card = await self.get_customer_card(customer_id, card_number, db)
+        if customer_pk is None:
             return {"success": False, "message": "Customer not found"}
 
-        # Find the card (match last 4 digits)
-        card = None
-        for c in customer.cards:
-            if c.card_number.endswith(card_number[-4:]):
-                card = c
-                break
-
         if not card:
             return {"success": False, "message": "Card not found"}
 
@@ -56,7 +190,9 @@ class BankingService:
             return {"success": False, "message": "Card is already blocked"}
 
         card.is_blocked = True
-        db.commit()
+        CustomerChangeFeed.record(db, customer_id)
+        await db.commit()
+        self.customer_cache.invalidate(customer_id)
 
         return {
             "success": True,
@@ -64,18 +200,12 @@ class BankingService:
             "card_number": f"****-****-****-{card.card_number[-4:]}",
         }
 
-    async def unblock_card(self, customer_id: str, card_number: str, db: Session) -> Dict:
+    async def unblock_card(self, customer_id: str, card_number: str, db: AsyncSession) -> Dict:
         """Unblock a customer's card"""
-        customer = await self.get_customer_by_id(customer_id, db)
-        if not customer:
+        customer_pk, card = await self.get_customer_card(customer_id, card_number, db)
+        if customer_pk is None:
             return {"success": False, "message": "Customer not found"}
 
-        card = None
-        for c in customer.cards:
-            if c.card_number.endswith(card_number[-4:]):
-                card = c
-                break
-
         if not card:
             return {"success": False, "message": "Card not found"}
 
@@ -83,7 +213,9 @@ class BankingService:
             return {"success": False, "message": "Card is not blocked"}
 
         card.is_blocked = False
-        db.commit()
+        CustomerChangeFeed.record(db, customer_id)
+        await db.commit()
+        self.customer_cache.invalidate(customer_id)
 
         return {
             "success": True,
@@ -91,48 +223,110 @@ class BankingService:
             "card_number": f"****-****-****-{card.card_number[-4:]}",
         }
 
-    async def get_card_transactions(self, customer_id: str, card_number: str, limit: int = 10, db: Session = None) -> \
-    List[Dict]:
-        """Get recent transactions for a card"""
-        customer = await self.get_customer_by_id(customer_id, db)
+    async def get_snapshot_card(self, customer_id: str, card_number: str, db: AsyncSession) -> Optional[Dict]:
+        """A customer's card, matched by its last 4 digits, from the customer snapshot"""
+        customer = await self.get_customer_snapshot(customer_id, db)
         if not customer:
-            return []
+            return None
 
-        card = None
-        for c in customer.cards:
-            if c.card_number.endswith(card_number[-4:]):
-                card = c
-                break
+        last4 = card_last4(card_number)
+        return next((card for card in customer["cards"] if card["last4"] == last4), None)
 
+    @staticmethod
+    def _transaction_dict(row) -> Dict:
+        return {
+            "id": row.transaction_id,
+            "amount": row.amount,
+            "type": row.transaction_type,
+            "description": row.description,
+            "status": row.status,
+            "date": row.created_at.isoformat()
+        }
+
+    @staticmethod
+    def _card_transactions(card_id: int, since: Optional[datetime], until: Optional[datetime]):
+        """Select only columns in ix_transactions_card_history, so the index alone can answer it"""
+        query = select(*_TRANSACTION_COLUMNS).where(Transaction.card_id == card_id)
+        if since is not None:
+            query = query.where(Transaction.created_at >= since)
+        if until is not None:
+            query = query.where(Transaction.created_at < until)
+        return query
+
+    async def get_card_transactions(self, customer_id: str, card_number: str, limit: int = 10, db: AsyncSession = None) -> \
+    List[Dict]:
+        """Get recent transactions for a card"""
+        page = await self.get_card_transactions_page(customer_id, card_number, db, limit=limit)
+        return page["transactions"] if page else []
+
+    async def get_card_transactions_page(self, customer_id: str, card_number: str, db: AsyncSession,
+                                         limit: int = 10, cursor: Optional[str] = None,
+                                         since: Optional[datetime] = None,
+                                         until: Optional[datetime] = None) -> Optional[Dict]:
+        """One page of a card's transactions, newest first, optionally within [since, until)
+
+        Pages are keyset paginated on (created_at, id): ``next_cursor`` encodes
+        the last row returned and the next page seeks past it in the index, so
+        page 1000 costs what page 1 does. Returns None if the card is not found.
+        """
+        card = await self.get_snapshot_card(customer_id, card_number, db)
         if not card:
-            return []
+            return None
+
+        query = self._card_transactions(card["id"], since, until)
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            query = query.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(created_at, row_id))
+        result = await db.execute(
+            query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit + 1)
+        )
+        rows = result.all()
 
-        transactions = db.query(Transaction).filter(
-            Transaction.card_id == card.id
-        ).order_by(Transaction.created_at.desc()).limit(limit).all()
-
-        return [
-            {
-                "id": t.transaction_id,
-                "amount": t.amount,
-                "type": t.transaction_type,
-                "description": t.description,
-                "status": t.status,
-                "date": t.created_at.isoformat()
-            }
-            for t in transactions
-        ]
-
-    async def get_loan_limits(self, customer_id: str, db: Session) -> Dict:
-        """Calculate loan limits for a customer"""
-        customer = await self.get_customer_by_id(customer_id, db)
-        if not customer:
-            return {"success": False, "message": "Customer not found"}
+        next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+        return {
+            "transactions": [self._transaction_dict(row) for row in rows[:limit]],
+            "next_cursor": next_cursor
+        }
 
-        # Calculate total income (mock calculation)
-        total_balance = sum(card.balance for card in customer.cards)
-        existing_loans = sum(loan.outstanding_balance for loan in customer.loans if loan.status == "active")
+    async def stream_card_statement(self, card_id: int, db: AsyncSession,
+                                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                                    batch_size: int = 1000) -> AsyncIterator[Dict]:
+        """Every transaction of a card in [since, until), oldest first, through a server-side cursor
+
+        Rows arrive ``batch_size`` at a time, so memory stays flat however long
+        the statement is.
+        """
+        result = await db.stream(
+            self._card_transactions(card_id, since, until)
+            .order_by(Transaction.created_at, Transaction.id)
+            .execution_options(yield_per=batch_size)
+        )
+        # Whole partitions per await: iterating row by row would cross into the driver for every row
+        async for partition in result.partitions():
+            for row in partition:
+                yield self._transaction_dict(row)
+
+    @staticmethod
+    def _loan_totals(customer_ids: List[str]):
+        """Card balance and active loan totals per customer, aggregated in the database"""
+        total_balance = (
+            select(func.coalesce(func.sum(Card.balance), 0.0))
+            .where(Card.customer_id == Customer.id)
+            .scalar_subquery()
+        )
+        # Seeks ix_loans_customer_id_status straight to the customer's active loans
+        existing_loans = (
+            select(func.coalesce(func.sum(Loan.outstanding_balance), 0.0))
+            .where(Loan.customer_id == Customer.id, Loan.status == "active")
+            .scalar_subquery()
+        )
+        return (
+            select(Customer.customer_id, total_balance, existing_loans)
+            .where(Customer.customer_id.in_(customer_ids))
+        )
 
+    @staticmethod
+    def _loan_limits(customer_id: str, total_balance: float, existing_loans: float) -> Dict:
         # Mock loan limit calculation
         personal_loan_limit = max(0, (total_balance * 10) - existing_loans)
         mortgage_limit = max(0, (total_balance * 20) - existing_loans)
@@ -161,52 +355,146 @@ class BankingService:
             "existing_loans_total": round(existing_loans, 2)
         }
 
+    async def get_loan_limits(self, customer_id: str, db: AsyncSession) -> Dict:
+        """Calculate loan limits for a customer"""
+        return (await self.get_loan_limits_batch([customer_id], db))[customer_id]
+
+    async def get_loan_limits_batch(self, customer_ids: List[str], db: AsyncSession) -> Dict[str, Dict]:
+        """Calculate loan limits for several customers with one aggregate query, keyed by customer ID"""
+        result = await db.execute(self._loan_totals(customer_ids))
+        limits = {
+            customer_id: self._loan_limits(customer_id, total_balance, existing_loans)
+            for customer_id, total_balance, existing_loans in result.all()
+        }
+        return {
+            customer_id: limits.get(customer_id, {"success": False, "message": "Customer not found"})
+            for customer_id in customer_ids
+        }
+
+    @staticmethod
+    def _transfer_hash(from_card: str, to_account: str, amount: float) -> str:
+        return hashlib.sha256(f"{card_last4(from_card)}|{to_account}|{amount!r}".encode()).hexdigest()
+
+    @staticmethod
+    async def _replay_transfer(customer_pk: int, idempotency_key: str, request_hash: str,
+                               db: AsyncSession) -> Optional[Dict]:
+        """The stored outcome of an earlier transfer with this key, if there was one"""
+        result = await db.execute(
+            select(IdempotencyKey.request_hash, IdempotencyKey.response)
+            .where(IdempotencyKey.customer_id == customer_pk, IdempotencyKey.key == idempotency_key)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        if row.request_hash != request_hash:
+            return {"success": False, "message": "Idempotency key was already used for a different transfer"}
+        return {**json.loads(row.response), "replayed": True}
+
     async def transfer_funds(self, customer_id: str, from_card: str, to_account: str, amount: float,
-                             db: Session) -> Dict:
-        """Transfer funds between accounts"""
-        customer = await self.get_customer_by_id(customer_id, db)
-        if not customer:
+                             db: AsyncSession, idempotency_key: Optional[str] = None) -> Dict:
+        """Transfer funds between accounts
+
+        The debit is one conditional UPDATE (not blocked, enough balance), so
+        concurrent transfers from a card serialize on its row and can never
+        overdraw it. With an ``idempotency_key`` the transfer is recorded with
+        its outcome in the same commit; a retry with the key gets that outcome
+        back instead of moving the money twice. A transfer that loses a lock
+        conflict has changed nothing and is retried a few times.
+        """
+        if amount <= 0:
+            return {"success": False, "message": "Transfer amount must be positive"}
+
+        for attempt in range(settings.TRANSFER_LOCK_RETRIES + 1):
+            try:
+                return await self._transfer(customer_id, from_card, to_account, amount, db, idempotency_key)
+            except OperationalError:
+                await db.rollback()
+                db.info.clear()
+                if attempt == settings.TRANSFER_LOCK_RETRIES:
+                    raise
+                await asyncio.sleep(random.uniform(0.005, 0.02) * (attempt + 1))
+
+    async def _transfer(self, customer_id: str, from_card: str, to_account: str, amount: float,
+                        db: AsyncSession, idempotency_key: Optional[str]) -> Dict:
+        customer_pk, source_card = await self.get_customer_card(customer_id, from_card, db)
+        if customer_pk is None:
             return {"success": False, "message": "Customer not found"}
 
-        # Find source card
-        source_card = None
-        for c in customer.cards:
-            if c.card_number.endswith(from_card[-4:]):
-                source_card = c
-                break
-
         if not source_card:
             return {"success": False, "message": "Source card not found"}
 
+        request_hash = self._transfer_hash(from_card, to_account, amount)
+        if idempotency_key:
+            replayed = await self._replay_transfer(customer_pk, idempotency_key, request_hash, db)
+            if replayed is not None:
+                return replayed
+
+        # Cheap refusals from the row already read; the conditional UPDATE below is what guarantees them
         if source_card.is_blocked:
             return {"success": False, "message": "Source card is blocked"}
 
         if source_card.balance < amount:
             return {"success": False, "message": "Insufficient funds"}
 
-        # Simulate transfer (deduct from source)
-        source_card.balance -= amount
+        result = await db.execute(
+            update(Card)
+            .where(Card.id == source_card.id, Card.is_blocked.is_(False), Card.balance >= amount)
+            .values(balance=Card.balance - amount)
+            .returning(Card.balance)
+            .execution_options(synchronize_session=False)
+        )
+        remaining_balance = result.scalar()
+        if remaining_balance is None:
+            await db.rollback()
+            db.info.clear()
+            await db.refresh(source_card)
+            if source_card.is_blocked:
+                return {"success": False, "message": "Source card is blocked"}
+            return {"success": False, "message": "Insufficient funds"}
+        set_committed_value(source_card, "balance", remaining_balance)
 
-        # Create transaction record
         transaction = Transaction(
-            transaction_id=f"TXN{random.randint(100000, 999999)}",
+            transaction_id=new_transaction_id(),
             amount=-amount,
             transaction_type="transfer_out",
             description=f"Transfer to {to_account}",
             status="completed",
             card_id=source_card.id,
-            customer_id=customer.id
+            customer_id=customer_pk
         )
-
         db.add(transaction)
-        db.commit()
 
-        return {
+        response = {
             "success": True,
             "message": f"Successfully transferred ₾{amount} to {to_account}",
             "transaction_id": transaction.transaction_id,
-            "remaining_balance": round(source_card.balance, 2)
+            "remaining_balance": round(remaining_balance, 2)
         }
+        if idempotency_key:
+            db.add(IdempotencyKey(
+                customer_id=customer_pk,
+                key=idempotency_key,
+                request_hash=request_hash,
+                response=json.dumps(response, ensure_ascii=False)
+            ))
+        CustomerChangeFeed.record(db, customer_id)
+
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent retry with the same key committed first; our debit rolls back with this
+            await db.rollback()
+            db.info.clear()
+            if not idempotency_key:
+                raise
+            replayed = await self._replay_transfer(customer_pk, idempotency_key, request_hash, db)
+            if replayed is None:
+                raise
+            return replayed
+        finally:
+            self.customer_cache.invalidate(customer_id)
+
+        return response
 
 
 banking_service = BankingService()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.connection import AsyncSessionLocal
+from ..database.models import CustomerChange
+
+logger = logging.getLogger(__name__)
+
+
+class CustomerSnapshotCache:
+    """Short-lived snapshots of a customer's profile and cards, shared across conversations.
+
+    Entries are plain dicts, expire after a TTL and are evicted least recently
+    used beyond ``max_entries``. A write invalidates its customer here, and a
+    snapshot loaded while that write was in flight is refused by ``put``, so a
+    read after a write in this process always goes to the database. Writes by
+    other worker processes arrive through CustomerChangeFeed.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # customer_id -> (expiry time, snapshot), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Invalidation sequence numbers of recently written customers; older ones fold into _floor
+        self._sequence = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0, "refused": 0}
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(customer_id)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[customer_id]
+            self.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(customer_id)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def begin_load(self) -> int:
+        """Token to pass to put() for a snapshot about to be read from the database"""
+        return self._sequence
+
+    def put(self, customer_id: str, snapshot: Dict[str, Any], token: int):
+        """Cache a snapshot unless its customer was written since the load began"""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        invalidated = self._invalidated.get(customer_id, self._floor)
+        if invalidated > token:
+            self.stats["refused"] += 1
+            return
+
+        self._entries[customer_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(customer_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, customer_id: str):
+        """Drop a customer's snapshot after a write to their cards"""
+        self._sequence += 1
+        self._entries.pop(customer_id, None)
+        self._invalidated[customer_id] = self._sequence
+        self._invalidated.move_to_end(customer_id)
+        while len(self._invalidated) > self.max_entries:
+            _, self._floor = self._invalidated.popitem(last=False)
+        self.stats["invalidations"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+class CustomerChangeFeed:
+    """Invalidates cached snapshots for writes committed by other worker processes.
+
+    Every write to a customer's cards adds a ``customer_changes`` row in the
+    same transaction. A background task reads the rows it has not seen every
+    ``poll_interval`` seconds and invalidates those customers, so cache hits
+    never touch the database and a snapshot here trails another process's
+    write by at most one poll. Each poll rereads the last ``lookback`` ids, as
+    a transaction can commit after one holding a higher id, and only the
+    newest ``retained`` rows are kept.
+    """
+
+    def __init__(self, cache: CustomerSnapshotCache, poll_interval: float, retained: int, lookback: int = 1000):
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.retained = retained
+        self.lookback = lookback
+        self._last_id: Optional[int] = None
+        self._seen: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"polls": 0, "changes": 0, "failed_polls": 0, "pruned": 0}
+
+    @staticmethod
+    def record(db: AsyncSession, customer_id: str):
+        """Add the change row to the caller's transaction, before its commit"""
+        db.add(CustomerChange(customer_id=customer_id))
+
+    async def start(self):
+        if self._task is not None:
+            return
+        await self.poll()
+        self._task = asyncio.create_task(self._run(), name="customer-change-feed")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def poll(self):
+        """Invalidate every customer changed since the last poll"""
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(CustomerChange.id, CustomerChange.customer_id)
+                .where(CustomerChange.id > (self._last_id or 0) - self.lookback)
+                .order_by(CustomerChange.id)
+            )).all()
+
+        # The first poll only learns where the feed stands; nothing older is cached yet
+        first_poll = self._last_id is None
+        for row_id, customer_id in rows:
+            if row_id in self._seen:
+                continue
+            self._seen.add(row_id)
+            if not first_poll:
+                self.cache.invalidate(customer_id)
+                self.stats["changes"] += 1
+        self._last_id = max(self._last_id or 0, rows[-1][0] if rows else 0)
+        self._seen = {row_id for row_id in self._seen if row_id > self._last_id - self.lookback}
+        self.stats["polls"] += 1
+
+    async def prune(self):
+        """Delete all but the newest ``retained`` rows"""
+        if self._last_id is None:
+            return
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(CustomerChange).where(CustomerChange.id <= self._last_id - self.retained))
+            await db.commit()
+        self.stats["pruned"] += result.rowcount
+
+    async def _run(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                polls += 1
+                if polls % 600 == 0:
+                    await self.prune()
+            except Exception as e:
+                self.stats["failed_polls"] += 1
+                logger.error(f"❌ Customer change poll failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "last_id": self._last_id}
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+Embedding = List[float]
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form used as the cache key: NFKC, case-folded, single-spaced"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class EmbeddingCache:
+    """Two-level cache of query embeddings: an in-memory LRU over a SQLite file.
+
+    Entries are keyed by embedding model and normalized query text, so a hit
+    never returns a vector from another model. The file records the model it
+    was built for and is cleared when EMBEDDING_MODEL changes. It holds at most
+    ``max_disk_entries`` rows: past that, the least recently used are pruned
+    in batches on insert. The row count is kept in memory for ``metrics``.
+    """
+
+    def __init__(self, path: str, model_name: str, max_memory_entries: int = 10000,
+                 max_disk_entries: int = 200000):
+        self.path = path
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        # Prune a little below the limit so not every insert pays for a DELETE
+        self._prune_batch = max(1, max_disk_entries // 100)
+
+        self._memory: "OrderedDict[str, Embedding]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_pruned": 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, query TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL, "
+            "last_used REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+        if "last_used" not in columns:
+            self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute("UPDATE embeddings SET last_used = created_at")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._check_model()
+        self._disk_entries = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._prune()
+
+    def _check_model(self):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+        if row and row[0] == self.model_name:
+            return
+        if row:
+            logger.info(f"🔄 Embedding model changed ({row[0]} → {self.model_name}), clearing query cache")
+        self._db.execute("DELETE FROM embeddings")
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)", (self.model_name,))
+
+    def _key(self, normalized: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[Embedding]:
+        key = self._key(normalize_query(text))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return vector
+
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+
+            vector = array("f", row[0]).tolist()
+            self._remember(key, vector)
+            self.stats["disk_hits"] += 1
+            return vector
+
+    def put(self, text: str, vector: Sequence[float]) -> Embedding:
+        normalized = normalize_query(text)
+        key = self._key(normalized)
+        vector = [float(value) for value in vector]
+        now = time.time()
+        with self._lock:
+            self._remember(key, vector)
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO embeddings (key, query, vector, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, normalized, array("f", vector).tobytes(), now, now)
+            ).rowcount
+            if inserted:
+                self._disk_entries += 1
+                self._prune()
+            else:
+                self._db.execute(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                    (array("f", vector).tobytes(), now, key)
+                )
+        return vector
+
+    def get_or_compute(self, texts: List[str], compute: Callable[[List[str]], Sequence[Sequence[float]]]) -> List[Embedding]:
+        """Return embeddings for texts, computing only the misses in one batch"""
+        vectors: List[Optional[Embedding]] = [self.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = compute([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = self.put(texts[i], vector)
+        return vectors
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM embeddings")
+            self._disk_entries = 0
+
+    def _prune(self):
+        """Drop the least recently used rows once the file is over max_disk_entries"""
+        if self._disk_entries <= self.max_disk_entries:
+            return
+        excess = self._disk_entries - self.max_disk_entries + self._prune_batch
+        deleted = self._db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        ).rowcount
+        self._disk_entries -= deleted
+        self.stats["disk_pruned"] += deleted
+
+    def _remember(self, key: str, vector: Embedding):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def metrics(self) -> Dict[str, float]:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+            "model": self.model_name,
+        }
@@ -0,0 +1,110 @@
+import re
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from ..config import settings
+from .lexical_index import tokenize
+
+EMBEDDING_PROVIDERS = ("gemini", "hashing", "onnx", "sentence_transformers")
+
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Offline baseline: signed feature hashing of words and character n-grams.
+
+    Needs no model files or network. Features are the tokenizer's terms plus
+    character 3- and 4-grams of each term (which catches Georgian inflection),
+    hashed with CRC32 into ``dimension`` buckets, sublinearly scaled and
+    L2-normalized. A batch becomes one sparse scatter into a dense matrix.
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        features = []
+        for term in tokenize(text):
+            features.append(term)
+            padded = f"<{term}>"
+            for n in (3, 4):
+                features.extend(f"{n}:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def __call__(self, input: Documents) -> Embeddings:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(input):
+            for feature in self._features(text):
+                hashed = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(hashed % self.dimension)
+                signs.append(1.0 if hashed & 0x80000000 else -1.0)
+
+        matrix = np.zeros((len(input), self.dimension), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)),
+                  np.asarray(signs, dtype=np.float32))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return list(matrix)
+
+    @staticmethod
+    def name() -> str:
+        return "tbc_hashing"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimension": self.dimension}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(dimension=config["dimension"])
+
+
+def create_embedding_function(provider: str) -> EmbeddingFunction:
+    """Embedding function for a provider name from EMBEDDING_PROVIDERS"""
+    if provider == "gemini":
+        from chromadb.utils.embedding_functions import GoogleGenerativeAiEmbeddingFunction
+        return GoogleGenerativeAiEmbeddingFunction(
+            model_name=settings.EMBEDDING_MODEL,
+            task_type="RETRIEVAL_DOCUMENT"
+        )
+    if provider == "hashing":
+        return HashingEmbeddingFunction(dimension=settings.HASHING_EMBEDDING_DIMENSION)
+    if provider == "onnx":
+        # all-MiniLM-L6-v2 on onnxruntime (CPU); the model is fetched once into ~/.cache/chroma
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+        return ONNXMiniLM_L6_V2()
+    if provider == "sentence_transformers":
+        # Requires the optional sentence-transformers package
+        from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+        return SentenceTransformerEmbeddingFunction(
+            model_name=settings.LOCAL_EMBEDDING_MODEL,
+            normalize_embeddings=True
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {provider!r}; expected one of {', '.join(EMBEDDING_PROVIDERS)}")
+
+
+# The model the original tbc_bank_knowledge collection was embedded with
+LEGACY_GEMINI_MODEL = "gemini-embedding-001"
+
+
+def embedding_model_id(provider: str) -> str:
+    """Identifies the vector space: cache entries and collections are per model"""
+    if provider == "gemini":
+        return settings.EMBEDDING_MODEL
+    if provider == "hashing":
+        return f"hashing-{settings.HASHING_EMBEDDING_DIMENSION}"
+    if provider == "onnx":
+        return "all-MiniLM-L6-v2"
+    return settings.LOCAL_EMBEDDING_MODEL.replace("/", "-")
+
+
+def knowledge_collection_name(provider: str) -> str:
+    """The original Gemini model keeps tbc_bank_knowledge; every other vector space gets its own"""
+    if provider == "gemini" and settings.EMBEDDING_MODEL == LEGACY_GEMINI_MODEL:
+        return "tbc_bank_knowledge"
+    # Chroma names allow letters, digits, '.', '_' and '-' ("models/text-embedding-004" has a slash)
+    model_id = re.sub(r"[^A-Za-z0-9._-]", "-", embedding_model_id(provider))
+    return f"tbc_bank_knowledge_{model_id}"
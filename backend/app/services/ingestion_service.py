@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import settings
+from .rag_service import rag_service
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".json", ".jsonl")
+DEFAULT_CATEGORY = "general"
+
+# (source id, text, category, title)
+Document = Tuple[str, str, str, str]
+# (chunk id, text, metadata)
+Chunk = Tuple[str, str, Dict[str, Any]]
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """Split text into ~chunk_size character windows, preferring paragraph and sentence breaks"""
+    text = "\n\n".join(" ".join(p.split()) for p in re.split(r"\n\s*\n", text) if p.strip())
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            for separator in ("\n\n", ". ", " "):
+                cut = text.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        # Step back by the overlap, then forward to the next word
+        start = max(end - overlap, start + 1)
+        space = text.find(" ", start, end)
+        if space != -1:
+            start = space + 1
+    return [chunk for chunk in chunks if chunk]
+
+
+def _record_text(record: Dict[str, Any]) -> str:
+    if record.get("content"):
+        return str(record["content"])
+    if record.get("question") and record.get("answer"):
+        return f"Q: {record['question']}\nA: {record['answer']}"
+    return str(record.get("text", ""))
+
+
+def iter_documents(path: str) -> Iterator[Document]:
+    """Documents from a file or directory tree.
+
+    Text and Markdown files are one document each, categorised by their top
+    level folder. JSON (a list, or ``{"items": [...]}``) and JSONL files hold
+    FAQ-style records with ``content`` or ``question``/``answer``, and optional
+    ``id``, ``category`` and ``title``.
+    """
+    root = path if os.path.isdir(path) else os.path.dirname(path)
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(path)
+            for name in names
+            if name.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+    else:
+        files = [path]
+
+    for file_path in files:
+        relative_path = os.path.relpath(file_path, root).replace(os.sep, "/")
+        folder = relative_path.split("/")[0] if "/" in relative_path else DEFAULT_CATEGORY
+        extension = os.path.splitext(file_path)[1].lower()
+
+        with open(file_path, encoding="utf-8") as f:
+            if extension in (".txt", ".md"):
+                title = os.path.splitext(os.path.basename(file_path))[0]
+                yield relative_path, f.read(), folder, title
+                continue
+
+            if extension == ".jsonl":
+                records = [json.loads(line) for line in f if line.strip()]
+            else:
+                records = json.load(f)
+                if isinstance(records, dict):
+                    records = records.get("items", [])
+
+        for index, record in enumerate(records):
+            text = _record_text(record)
+            if text.strip():
+                source_id = f"{relative_path}:{record.get('id', index)}"
+                yield source_id, text, record.get("category", folder), record.get("title", record.get("question", ""))
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class IngestionManifest:
+    """SQLite record of fully ingested sources, so a rerun skips them without reading the collection"""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "source_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, chunk_count INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+
+    def get(self, source_id: str) -> Optional[Tuple[str, int]]:
+        return self._db.execute(
+            "SELECT content_hash, chunk_count FROM sources WHERE source_id = ?", (source_id,)
+        ).fetchone()
+
+    def mark_done(self, entries: Sequence[Tuple[str, str, int]]):
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO sources (source_id, content_hash, chunk_count, updated_at) VALUES (?, ?, ?, ?)",
+            [(source_id, content_hash, chunk_count, now) for source_id, content_hash, chunk_count in entries]
+        )
+
+    def clear(self):
+        self._db.execute("DELETE FROM sources")
+
+
+class KnowledgeIngestionService:
+    """Incremental, resumable bulk loader for the knowledge collection.
+
+    Sources are chunked and every chunk is keyed by ``<source>#<n>`` with a
+    content hash in its metadata; chunks whose hash is already stored are not
+    re-embedded. Changed chunks are embedded in batches with at most
+    ``concurrency`` embedding requests in flight and upserted as each batch
+    completes. A source is recorded in the manifest only after all its chunks
+    are stored, so an interrupted run resumes where it stopped.
+
+    File reads, chunking and manifest queries run in worker threads; the event
+    loop only coordinates, so chat traffic keeps flowing during a bulk load.
+    """
+
+    def __init__(self, state_path: str, batch_size: int, concurrency: int, chunk_size: int, chunk_overlap: int):
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+        self._manifest: Optional[IngestionManifest] = None
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._running_job: Optional[str] = None
+
+    @property
+    def manifest(self) -> IngestionManifest:
+        if self._manifest is None:
+            self._manifest = IngestionManifest(self.state_path)
+        return self._manifest
+
+    async def ingest(self, path: str, force: bool = False,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     collection=None) -> Dict[str, Any]:
+        """Ingest into the live collection, or fill a new empty ``collection`` (manifest untouched)"""
+        fresh = collection is not None
+        collection = collection if fresh else rag_service.collection
+        if force and not fresh:
+            await asyncio.to_thread(lambda: self.manifest.clear())
+
+        stats = {
+            "path": path,
+            "sources": 0,
+            "sources_unchanged": 0,
+            "chunks": 0,
+            "chunks_embedded": 0,
+            "chunks_unchanged": 0,
+            "chunks_deleted": 0,
+            "elapsed_seconds": 0.0,
+            "chunks_per_second": 0.0,
+        }
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        window: List[Chunk] = []
+        window_sources: List[Tuple[str, str, int]] = []
+        # Sources with no manifest entry; leftovers from an earlier version are looked up per window
+        unrecorded: Dict[str, int] = {}
+        window_limit = self.batch_size * self.concurrency
+        # Nothing stored yet means nothing can be left over
+        was_empty = fresh or await asyncio.to_thread(collection.count) == 0
+
+        async def flush():
+            if unrecorded:
+                stale_ids = await asyncio.to_thread(self._unrecorded_stale_chunk_ids, collection, dict(unrecorded))
+                await self._delete_stale(collection, stale_ids, stats)
+                unrecorded.clear()
+            changed = await self._filter_unchanged(collection, window, stats, force or fresh)
+            batches = [changed[i:i + self.batch_size] for i in range(0, len(changed), self.batch_size)]
+            await asyncio.gather(*(self._embed_and_upsert(collection, batch, semaphore) for batch in batches))
+            stats["chunks_embedded"] += len(changed)
+            if not fresh:
+                await asyncio.to_thread(self.manifest.mark_done, list(window_sources))
+
+            stats["elapsed_seconds"] = time.perf_counter() - started
+            stats["chunks_per_second"] = stats["chunks"] / stats["elapsed_seconds"] if stats["elapsed_seconds"] else 0.0
+            if progress:
+                progress(stats)
+            window.clear()
+            window_sources.clear()
+
+        documents = iter_documents(path)
+        while True:
+            source = await asyncio.to_thread(self._next_source, documents, fresh, force)
+            if source is None:
+                break
+            source_id, content_hash, chunks, previous = source
+            stats["sources"] += 1
+            if chunks is None:
+                stats["sources_unchanged"] += 1
+                stats["chunks"] += previous[1]
+                stats["chunks_unchanged"] += previous[1]
+                continue
+
+            window.extend(chunks)
+            stats["chunks"] += len(chunks)
+
+            # Chunks left over from a longer previous version of this source
+            if previous is not None:
+                stale_ids = [f"{source_id}#{index}" for index in range(len(chunks), previous[1])]
+                await self._delete_stale(collection, stale_ids, stats)
+            elif not was_empty:
+                unrecorded[source_id] = len(chunks)
+
+            window_sources.append((source_id, content_hash, len(chunks)))
+            if len(window) >= window_limit:
+                await flush()
+
+        await flush()
+
+        if stats["chunks_embedded"] or stats["chunks_deleted"]:
+            await asyncio.to_thread(rag_service.mark_knowledge_changed, collection)
+
+        logger.info(
+            f"📥 Ingested {stats['chunks']} chunks from {stats['sources']} sources "
+            f"({stats['chunks_embedded']} embedded, {stats['chunks_unchanged']} unchanged, "
+            f"{stats['chunks_deleted']} deleted) at {stats['chunks_per_second']:.1f} chunks/s"
+        )
+        return stats
+
+    def _next_source(self, documents: Iterator[Document], fresh: bool, force: bool) \
+            -> Optional[Tuple[str, str, Optional[List[Chunk]], Optional[Tuple[str, int]]]]:
+        """Read the next source and chunk it, in a worker thread
+
+        Returns its id, content hash, chunks (None if the manifest says it is
+        unchanged) and previous manifest entry, or None when the sources run out.
+        """
+        document = next(documents, None)
+        if document is None:
+            return None
+
+        source_id, text, category, title = document
+        content_hash = _hash(category, text)
+        previous = None if fresh else self.manifest.get(source_id)
+        if previous and previous[0] == content_hash and not force:
+            return source_id, content_hash, None, previous
+
+        chunks = [
+            (f"{source_id}#{index}", chunk, {
+                "category": category,
+                "source": source_id,
+                "title": title,
+                "chunk_index": index,
+                "content_hash": _hash(category, chunk),
+            })
+            for index, chunk in enumerate(chunk_text(text, self.chunk_size, self.chunk_overlap))
+        ]
+        return source_id, content_hash, chunks, previous
+
+    @staticmethod
+    def _unrecorded_stale_chunk_ids(collection, chunk_counts: Dict[str, int]) -> List[str]:
+        """Stored chunks past the new end of sources the manifest has no entry for, in one query"""
+        existing = collection.get(where={"source": {"$in": list(chunk_counts)}}, include=["metadatas"])
+        return [
+            chunk_id for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+            if metadata.get("chunk_index", 0) >= chunk_counts.get(metadata.get("source"), 0)
+        ]
+
+    @staticmethod
+    async def _delete_stale(collection, stale_ids: List[str], stats: Dict[str, Any]):
+        if stale_ids:
+            await asyncio.to_thread(collection.delete, ids=stale_ids)
+            stats["chunks_deleted"] += len(stale_ids)
+
+    async def _filter_unchanged(self, collection, chunks: List[Chunk], stats: Dict[str, Any],
+                                force: bool) -> List[Chunk]:
+        if not chunks or force:
+            return list(chunks)
+
+        stored_hashes: Dict[str, str] = {}
+        for i in range(0, len(chunks), self.batch_size):
+            ids = [chunk_id for chunk_id, _, _ in chunks[i:i + self.batch_size]]
+            existing = await asyncio.to_thread(collection.get, ids=ids, include=["metadatas"])
+            for chunk_id, metadata in zip(existing["ids"], existing["metadatas"]):
+                stored_hashes[chunk_id] = (metadata or {}).get("content_hash")
+
+        changed = [chunk for chunk in chunks if stored_hashes.get(chunk[0]) != chunk[2]["content_hash"]]
+        stats["chunks_unchanged"] += len(chunks) - len(changed)
+        return changed
+
+    async def _embed_and_upsert(self, collection, batch: List[Chunk], semaphore: asyncio.Semaphore,
+                                attempts: int = 3):
+        texts = [text for _, text, _ in batch]
+        async with semaphore:
+            for attempt in range(attempts):
+                try:
+                    embeddings = await asyncio.to_thread(rag_service.embedding_function, texts)
+                    break
+                except Exception as e:
+                    if attempt == attempts - 1:
+                        raise
+                    delay = 2 ** attempt
+                    logger.warning(f"⚠️  Embedding batch failed ({e}), retrying in {delay}s")
+                    await asyncio.sleep(delay)
+
+        await asyncio.to_thread(
+            collection.upsert,
+            ids=[chunk_id for chunk_id, _, _ in batch],
+            embeddings=[[float(value) for value in embedding] for embedding in embeddings],
+            documents=texts,
+            metadatas=[metadata for _, _, metadata in batch]
+        )
+
+    async def rebuild(self, path: str, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Blue/green re-index of the seed documents and ``path`` into a new versioned collection.
+
+        Queries keep being served from the live collection while the new one
+        is embedded. It is swapped in only after it passes the size check and
+        the smoke queries; otherwise it is deleted and nothing changes.
+        """
+        name = rag_service.new_collection_name()
+        collection = await asyncio.to_thread(rag_service.open_collection, name)
+        logger.info(f"🏗️  Building knowledge collection {name}")
+        try:
+            await asyncio.to_thread(rag_service.seed_collection, collection)
+            stats = await self.ingest(path, progress=progress, collection=collection)
+            snapshot = await asyncio.to_thread(rag_service.build_snapshot, collection)
+
+            live_chunks = await asyncio.to_thread(rag_service.collection.count)
+            if len(snapshot.documents) < settings.KNOWLEDGE_MIN_SIZE_RATIO * live_chunks:
+                raise RuntimeError(
+                    f"Rebuilt collection has {len(snapshot.documents)} chunks, the live one {live_chunks}"
+                )
+            failures = await rag_service.smoke_test(snapshot)
+            if failures:
+                raise RuntimeError(f"{len(failures)} smoke queries failed: {failures}")
+        except BaseException:
+            await asyncio.to_thread(rag_service.delete_collection, name)
+            raise
+
+        await asyncio.to_thread(rag_service.promote, snapshot)
+        # The manifest described the previous collection; chunk hashes still spare re-embedding next time
+        await asyncio.to_thread(lambda: self.manifest.clear())
+        stats["collection"] = name
+        logger.info(f"✅ Knowledge collection {name} is live ({len(snapshot.documents)} chunks)")
+        return stats
+
+    def start_job(self, path: str, force: bool = False, rebuild: bool = False) -> str:
+        """Run an ingestion or a blue/green rebuild in the background; one job at a time"""
+        if self._running_job:
+            raise RuntimeError(f"Ingestion job {self._running_job} is already running")
+
+        job_id = str(uuid.uuid4())
+        job = {"job_id": job_id, "status": "running", "mode": "rebuild" if rebuild else "ingest", "path": path,
+               "stats": None, "error": None, "started_at": time.time(), "finished_at": None}
+        self.jobs[job_id] = job
+        self._running_job = job_id
+
+        def report(stats: Dict[str, Any]):
+            job.update(stats=dict(stats))
+
+        async def run():
+            try:
+                if rebuild:
+                    job["stats"] = await self.rebuild(path, progress=report)
+                else:
+                    job["stats"] = await self.ingest(path, force=force, progress=report)
+                job["status"] = "completed"
+            except Exception as e:
+                logger.error(f"❌ Ingestion job {job_id} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = time.time()
+                self._running_job = None
+
+        asyncio.get_running_loop().create_task(run())
+        return job_id
+
+
+ingestion_service = KnowledgeIngestionService(
+    state_path=settings.INGESTION_STATE_PATH,
+    batch_size=settings.INGESTION_BATCH_SIZE,
+    concurrency=settings.INGESTION_CONCURRENCY,
+    chunk_size=settings.CHUNK_SIZE_CHARS,
+    chunk_overlap=settings.CHUNK_OVERLAP_CHARS
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Knowledge base ingestion")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subcommands.add_parser("ingest", help="Chunk, embed and upsert files into the knowledge collection")
+    ingest_parser.add_argument("path", nargs="?", default=settings.KNOWLEDGE_SOURCE_DIRECTORY)
+    ingest_parser.add_argument("--batch-size", type=int, default=settings.INGESTION_BATCH_SIZE)
+    ingest_parser.add_argument("--concurrency", type=int, default=settings.INGESTION_CONCURRENCY)
+    ingest_parser.add_argument("--force", action="store_true", help="Re-embed every chunk")
+    rebuild_parser = subcommands.add_parser("rebuild", help="Build, validate and swap in a new knowledge collection")
+    rebuild_parser.add_argument("path", nargs="?", default=settings.KNOWLEDGE_SOURCE_DIRECTORY)
+    subcommands.add_parser("rollback", help="Serve the previous knowledge collection again")
+    subcommands.add_parser("versions", help="Show the active and previous knowledge collections")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "rebuild":
+        print(json.dumps(asyncio.run(ingestion_service.rebuild(args.path)), indent=2))
+    elif args.command == "rollback":
+        print(json.dumps({"active": rag_service.rollback()}))
+    elif args.command == "versions":
+        print(json.dumps(rag_service.knowledge_versions(), indent=2))
+    elif args.command == "ingest":
+        ingestion_service.batch_size = args.batch_size
+        ingestion_service.concurrency = args.concurrency
+        report = asyncio.run(ingestion_service.ingest(
+            args.path,
+            force=args.force,
+            progress=lambda stats: print(f"📥 {stats['chunks']} chunks, {stats['chunks_per_second']:.1f} chunks/s")
+        ))
+        print(json.dumps(report, indent=2))
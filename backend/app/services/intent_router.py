@@ -0,0 +1,300 @@
+import argparse
+import json
+import math
+import os
+import random
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+
+LABELS = ("card_operations", "loan", "support")
+
+# Labelled seed examples (English and Georgian); retraining adds rows mined from chat_messages
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    ("Block my card", "card_operations"),
+    ("I lost my card, please block it", "card_operations"),
+    ("My card was stolen", "card_operations"),
+    ("Unblock my card ending in 1234", "card_operations"),
+    ("What is my card balance?", "card_operations"),
+    ("Show my recent transactions", "card_operations"),
+    ("Show the last transactions on my card", "card_operations"),
+    ("How much money is on my card", "card_operations"),
+    ("There is a payment on my card I don't recognise", "card_operations"),
+    ("Check my card balance", "card_operations"),
+    ("Freeze my debit card", "card_operations"),
+    ("ბარათის დაბლოკვა მინდა", "card_operations"),
+    ("დამიბლოკეთ ბარათი", "card_operations"),
+    ("ბარათი დავკარგე", "card_operations"),
+    ("ბარათი მომპარეს", "card_operations"),
+    ("ბარათის განბლოკვა", "card_operations"),
+    ("რა ბალანსია ჩემს ბარათზე", "card_operations"),
+    ("ბოლო ტრანზაქციები მაჩვენეთ", "card_operations"),
+    ("ბარათის ტრანზაქციების ისტორია", "card_operations"),
+    ("Is my card blocked?", "card_operations"),
+    ("How much is left on my card?", "card_operations"),
+    ("My balance on the card", "card_operations"),
+    ("A card payment went through twice", "card_operations"),
+    ("I want to take a loan", "loan"),
+    ("What loan options do you have?", "loan"),
+    ("What is my loan limit?", "loan"),
+    ("How much can I borrow?", "loan"),
+    ("Calculate monthly payments for a mortgage", "loan"),
+    ("I need a car loan", "loan"),
+    ("What is the interest rate on personal loans", "loan"),
+    ("Mortgage for an apartment", "loan"),
+    ("Check my eligibility for a loan", "loan"),
+    ("What documents do I need for a mortgage?", "loan"),
+    ("სესხის აღება მინდა", "loan"),
+    ("რა სესხის ლიმიტი მაქვს", "loan"),
+    ("იპოთეკური სესხი მაინტერესებს", "loan"),
+    ("ავტო სესხის პირობები", "loan"),
+    ("სამომხმარებლო სესხის საპროცენტო განაკვეთი", "loan"),
+    ("რამდენის სესხება შემიძლია", "loan"),
+    ("ყოველთვიური შენატანი სესხზე", "loan"),
+    # Loan questions that mention cards and balances
+    ("Can I get a loan based on my card balance?", "loan"),
+    ("How big a loan can I get with my salary card?", "loan"),
+    ("Can I repay my loan from my card?", "loan"),
+    ("Credit limit increase on a loan", "loan"),
+    ("ბარათზე სესხის აღება შემიძლია?", "loan"),
+    ("What are your branch hours?", "support"),
+    ("Where is the nearest ATM?", "support"),
+    ("Find nearest branch", "support"),
+    ("What is the customer service phone number?", "support"),
+    ("Mobile banking features", "support"),
+    ("Fee information", "support"),
+    ("How do I open a new account?", "support"),
+    ("What cashback does TBC Concept 360 give?", "support"),
+    ("Tell me about the card security service", "support"),
+    ("Are you open on Sunday?", "support"),
+    ("ფილიალის სამუშაო საათები", "support"),
+    ("სად არის უახლოესი ბანკომატი", "support"),
+    ("ცხელი ხაზის ნომერი", "support"),
+    ("მობაილ ბანკის ფუნქციები", "support"),
+    ("რა საკომისიოა გადარიცხვაზე", "support"),
+    ("ანგარიშის გახსნა მინდა", "support"),
+    ("რა ქეშბექი აქვს TBC Concept 360-ს", "support"),
+    ("კვირას ღიაა ფილიალი?", "support"),
+    # Card questions the knowledge base answers, not card actions
+    ("The ATM swallowed my card", "support"),
+    ("An ATM kept my card, what should I do?", "support"),
+    ("How do I order a new card?", "support"),
+    ("What is the annual fee for a card?", "support"),
+    ("How do I transfer money to another bank?", "support"),
+    ("ბანკომატმა ბარათი არ დამიბრუნა", "support"),
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _features(text: str) -> List[str]:
+    """Word, word-prefix and character trigram features.
+
+    Prefixes and trigrams keep Georgian inflections (ბარათი / ბარათის / ბარათზე)
+    on shared features without a stemmer.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    features = []
+    for word in _WORD_RE.findall(text):
+        features.append(f"w:{word}")
+        if len(word) > 5:
+            features.append(f"p:{word[:5]}")
+        padded = f" {word} "
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+class IntentRouter:
+    """In-process multinomial Naive Bayes intent classifier for the coordinator fast path.
+
+    ``route`` returns a runner name only when the prediction clears the
+    confidence threshold; everything else goes to the coordinator LLM.
+    """
+
+    def __init__(self, confidence_threshold: float, min_known_features: int = 2):
+        self.confidence_threshold = confidence_threshold
+        self.min_known_features = min_known_features
+        self.log_priors: Dict[str, float] = {}
+        self.feature_log_probs: Dict[str, Dict[str, float]] = {}
+        self.unknown_log_probs: Dict[str, float] = {}
+        self.vocabulary: set = set()
+        self.stats = {"predictions": 0, "routed": 0, "ambiguous": 0, "total_latency_ms": 0.0}
+
+    def train(self, examples: Iterable[Tuple[str, str]], alpha: float = 0.5):
+        class_counts = Counter()
+        feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        for text, label in examples:
+            if label not in LABELS:
+                continue
+            class_counts[label] += 1
+            feature_counts[label].update(_features(text))
+
+        total = sum(class_counts.values())
+        self.vocabulary = set().union(*(counts.keys() for counts in feature_counts.values()))
+        vocabulary_size = len(self.vocabulary)
+
+        self.log_priors = {label: math.log(class_counts[label] / total) for label in class_counts}
+        self.feature_log_probs = {}
+        self.unknown_log_probs = {}
+        for label in class_counts:
+            counts = feature_counts[label]
+            denominator = sum(counts.values()) + alpha * vocabulary_size
+            self.feature_log_probs[label] = {
+                feature: math.log((count + alpha) / denominator) for feature, count in counts.items()
+            }
+            self.unknown_log_probs[label] = math.log(alpha / denominator)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (label, confidence); label is None when nothing in the text is known
+
+        The posterior is scaled by the share of the message's features the
+        model has seen. Naive Bayes ignores unseen words, so without this a
+        message about something it was never trained on ("transfer 100 GEL to
+        my friend") is judged on "my" and "to" alone and comes out >0.9 sure.
+        """
+        all_features = _features(text)
+        features = [feature for feature in all_features if feature in self.vocabulary]
+        if len(features) < self.min_known_features or not self.log_priors:
+            return None, 0.0
+
+        scores = {}
+        for label, log_prior in self.log_priors.items():
+            log_probs = self.feature_log_probs[label]
+            unknown = self.unknown_log_probs[label]
+            # Length-normalised so long messages do not become overconfident
+            scores[label] = log_prior + sum(log_probs.get(f, unknown) for f in features) / math.sqrt(len(features))
+
+        best = max(scores, key=scores.get)
+        normaliser = sum(math.exp(score - scores[best]) for score in scores.values())
+        coverage = len(features) / len(all_features)
+        return best, coverage / normaliser
+
+    def route(self, text: str) -> Optional[str]:
+        started = time.perf_counter()
+        label, confidence = self.predict(text)
+        self.stats["predictions"] += 1
+        self.stats["total_latency_ms"] += (time.perf_counter() - started) * 1000
+
+        if label is None or confidence < self.confidence_threshold:
+            self.stats["ambiguous"] += 1
+            return None
+
+        self.stats["routed"] += 1
+        return label
+
+    def metrics(self) -> Dict:
+        predictions = self.stats["predictions"]
+        return {
+            "predictions": predictions,
+            "routed": self.stats["routed"],
+            "ambiguous": self.stats["ambiguous"],
+            "coordinator_skip_ratio": round(self.stats["routed"] / predictions, 4) if predictions else 0.0,
+            "avg_latency_ms": round(self.stats["total_latency_ms"] / predictions, 4) if predictions else 0.0,
+            "confidence_threshold": self.confidence_threshold,
+        }
+
+    def save(self, path: str):
+        model = {
+            "labels": list(self.log_priors),
+            "log_priors": self.log_priors,
+            "feature_log_probs": self.feature_log_probs,
+            "unknown_log_probs": self.unknown_log_probs,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(model, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            model = json.load(f)
+        self.log_priors = model["log_priors"]
+        self.feature_log_probs = model["feature_log_probs"]
+        self.unknown_log_probs = model["unknown_log_probs"]
+        self.vocabulary = set().union(*(probs.keys() for probs in self.feature_log_probs.values()))
+
+
+def load_intent_router() -> IntentRouter:
+    router = IntentRouter(confidence_threshold=settings.INTENT_CONFIDENCE_THRESHOLD)
+    if os.path.exists(settings.INTENT_MODEL_PATH):
+        try:
+            router.load(settings.INTENT_MODEL_PATH)
+            return router
+        except Exception as e:
+            print(f"❌ Error loading intent model {settings.INTENT_MODEL_PATH}: {e}")
+    router.train(SEED_EXAMPLES)
+    return router
+
+
+def labelled_examples_from_chat_messages() -> List[Tuple[str, str]]:
+    """Label each user message with the specialist the coordinator chose for it.
+
+    Only coordinator-routed turns count: intent-routed turns would train the
+    model on its own predictions, and sticky, preferred and hand-back turns
+    were not decided from the message text.
+    """
+    from ..database.connection import SessionLocal
+    from ..database.models import ChatMessage
+    from .routing_service import RUNNER_BY_AGENT_NAME
+
+    examples = []
+    db = SessionLocal()
+    try:
+        rows = db.query(ChatMessage.session_id, ChatMessage.role, ChatMessage.content, ChatMessage.agent_name,
+                        ChatMessage.routing_source) \
+            .order_by(ChatMessage.session_id, ChatMessage.created_at, ChatMessage.id) \
+            .yield_per(5000)
+
+        pending = None
+        for session_id, role, content, agent_name, routing_source in rows:
+            if role == "user":
+                pending = (session_id, content)
+            elif role == "assistant" and pending and pending[0] == session_id:
+                label = RUNNER_BY_AGENT_NAME.get(agent_name)
+                if routing_source == "coordinator" and label in LABELS and pending[1]:
+                    examples.append((pending[1], label))
+                pending = None
+    finally:
+        db.close()
+    return examples
+
+
+def retrain(model_path: str, holdout: float = 0.2, seed: int = 13):
+    mined = labelled_examples_from_chat_messages()
+    print(f"📚 Mined {len(mined)} labelled messages from chat_messages: {dict(Counter(l for _, l in mined))}")
+
+    examples = SEED_EXAMPLES + mined
+    random.Random(seed).shuffle(examples)
+    split = int(len(examples) * (1 - holdout))
+    train_set, test_set = examples[:split], examples[split:]
+
+    router = IntentRouter(confidence_threshold=settings.INTENT_CONFIDENCE_THRESHOLD)
+    router.train(train_set)
+    if test_set:
+        predictions = [(router.predict(text), label) for text, label in test_set]
+        accuracy = sum(predicted == label for (predicted, _), label in predictions) / len(test_set)
+        confident = [(predicted, label) for (predicted, conf), label in predictions
+                     if conf >= router.confidence_threshold]
+        precision = sum(p == l for p, l in confident) / len(confident) if confident else 0.0
+        print(f"🎯 Hold-out accuracy {accuracy:.1%}; "
+              f"{len(confident) / len(test_set):.1%} above threshold with precision {precision:.1%}")
+
+    router.train(examples)
+    router.save(model_path)
+    print(f"✅ Saved intent model trained on {len(examples)} examples to {model_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intent router maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    retrain_parser = subcommands.add_parser("retrain", help="Retrain from seed examples and stored chat_messages")
+    retrain_parser.add_argument("--model-path", default=settings.INTENT_MODEL_PATH)
+    retrain_parser.add_argument("--holdout", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == "retrain":
+        retrain(args.model_path, args.holdout)
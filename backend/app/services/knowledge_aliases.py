@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class KnowledgeAliases:
+    """Which versioned collection serves each knowledge base, in a small JSON file.
+
+    ``{base: {"active": name, "history": [previous names, newest first]}}``.
+    The file is rewritten with os.replace, so a reader in any process sees
+    either the old pointer or the new one, never a partial write. A base
+    without an entry is served from the collection named after the base.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cached: Dict[str, Any] = {}
+        self._cached_mtime: Optional[int] = None
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._cached_mtime:
+            with open(self.path, encoding="utf-8") as f:
+                self._cached = json.load(f)
+            self._cached_mtime = mtime
+        return self._cached
+
+    def _write(self, aliases: Dict[str, Any]):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(aliases, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def active(self, base: str) -> str:
+        return self._read().get(base, {}).get("active", base)
+
+    def history(self, base: str) -> List[str]:
+        return list(self._read().get(base, {}).get("history", []))
+
+    def swap(self, base: str, name: str, keep: int) -> List[str]:
+        """Point base at name; returns the versions that fell out of the rollback history"""
+        with self._lock:
+            aliases = dict(self._read())
+            previous = aliases.get(base, {}).get("active", base)
+            history = [previous] + [old for old in self.history(base) if old not in (previous, name)]
+            aliases[base] = {"active": name, "history": history[:keep]}
+            self._write(aliases)
+            return history[keep:]
+
+    def rollback(self, base: str) -> str:
+        """Re-activate the previous version; the one rolled back from is dropped"""
+        with self._lock:
+            aliases = dict(self._read())
+            history = self.history(base)
+            if not history:
+                raise ValueError(f"No previous knowledge version to roll back to for {base}")
+            aliases[base] = {"active": history[0], "history": history[1:]}
+            self._write(aliases)
+            return history[0]
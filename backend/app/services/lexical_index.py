@@ -0,0 +1,149 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Numbers keep their grouping ("10,000" -> "10000", "0.6" -> "0.6"); everything else is a Unicode word,
+# which covers Georgian (Mkhedruli) as well as Latin script
+_TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*|\w+")
+
+# Georgian case and plural endings, longest first; stems shorter than three letters are left alone
+_GEORGIAN_SUFFIXES = (
+    "ებისთვის", "ისთვის", "ებში", "ებზე", "ებით", "ებმა", "ებს", "ების", "ები",
+    "ით", "ად", "ში", "ზე", "ის", "მა", "ს",
+)
+_ENGLISH_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "the", "to", "what", "when", "where", "which", "with", "you", "your",
+}
+_GEORGIAN_STOPWORDS = {"და", "არის", "რა", "როგორ", "რომ", "თუ", "ან", "ეს", "ის", "მე", "თქვენ"}
+
+
+def _is_georgian(token: str) -> bool:
+    return "Ⴀ" <= token[0] <= "ჿ"
+
+
+def _stem(token: str) -> str:
+    if _is_georgian(token):
+        for suffix in _GEORGIAN_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                return token[:-len(suffix)]
+        return token
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded, lightly stemmed terms for English and Georgian text"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if token[0].isdigit():
+            tokens.append(token.replace(",", ""))
+        elif token not in _ENGLISH_STOPWORDS and token not in _GEORGIAN_STOPWORDS:
+            tokens.append(_stem(token))
+    return tokens
+
+
+class BM25Index:
+    """In-process BM25 inverted index over knowledge chunks, with a category filter.
+
+    Query terms found in more than ``common_term_ratio`` of the documents only
+    add to documents a rarer query term already matched, so a word like "card"
+    does not walk most of the postings. Length norms are computed once per
+    change to the index rather than per posting.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, common_term_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.common_term_ratio = common_term_ratio
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._categories: Dict[str, str] = {}
+        self._total_length = 0
+        self._norms: Optional[Dict[str, float]] = None
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: str, text: str, category: str = ""):
+        if doc_id in self._lengths:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = tuple(terms)
+        self._lengths[doc_id] = length
+        self._categories[doc_id] = category
+        self._total_length += length
+        self._norms = None
+
+    def add_many(self, documents: Iterable[Tuple[str, str, str]]):
+        for doc_id, text, category in documents:
+            self.add(doc_id, text, category)
+
+    def remove(self, doc_id: str):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._categories.pop(doc_id, None)
+        self._total_length -= length
+        self._norms = None
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def _length_norms(self) -> Dict[str, float]:
+        if self._norms is None:
+            average_length = self._total_length / len(self._lengths)
+            self._norms = {
+                doc_id: self.k1 * (1 - self.b + self.b * length / average_length)
+                for doc_id, length in self._lengths.items()
+            }
+        return self._norms
+
+    def search(self, query: str, limit: int, category: Optional[str] = None) -> List[Tuple[str, float, float]]:
+        """Top documents as (doc_id, score, fraction of query terms matched)"""
+        terms = set(tokenize(query))
+        if not terms or not self._lengths:
+            return []
+
+        documents = len(self._lengths)
+        norms = self._length_norms()
+        common_df = max(1, int(documents * self.common_term_ratio))
+        rare, common = [], []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings:
+                (common if len(postings) > common_df else rare).append((term, postings))
+        if not rare:
+            rare, common = common, []
+
+        scores: Dict[str, float] = {}
+        matched: Dict[str, Set[str]] = {}
+        for term, postings in rare:
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                if category and self._categories[doc_id] != category:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norms[doc_id])
+                matched.setdefault(doc_id, set()).add(term)
+
+        for term, postings in common:
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id in scores:
+                tf = postings.get(doc_id)
+                if tf:
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norms[doc_id])
+                    matched[doc_id].add(term)
+
+        ranked = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [(doc_id, score, len(matched[doc_id]) / len(terms)) for doc_id, score in ranked]
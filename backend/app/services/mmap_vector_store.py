@@ -0,0 +1,423 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .vector_index import truncate
+
+logger = logging.getLogger(__name__)
+
+# Rows allocated when the matrix is first created; it then grows by doubling
+_INITIAL_CAPACITY = 1024
+# Compaction is not worth it for a handful of deleted rows
+_MIN_TOMBSTONES_TO_COMPACT = 256
+
+
+class MmapVectorStore:
+    """Knowledge collection on a memory-mapped NumPy matrix, an in-process alternative to Chroma.
+
+    Unit vectors live in ``vectors-<n>.npy`` (capacity x dimension, float32)
+    and each row's category code in ``categories-<n>.npy``, where -1 marks a
+    tombstone. Both are opened with ``mmap_mode``, so every worker maps the
+    same pages from the OS cache instead of loading its own copy. Ids,
+    documents and metadata live in a SQLite sidecar keyed by row.
+
+    Appends fill spare capacity, and the files are regrown by doubling.
+    Deletes only tombstone their rows. Once tombstones exceed
+    ``compaction_ratio`` of the matrix, live rows are copied into new files;
+    the generation number ``n`` is switched in the sidecar in the same
+    transaction, so a crash never leaves rows and records out of step.
+
+    Implements the part of the Chroma collection API that RAGService and the
+    ingestion pipeline use (add/upsert/get/delete/query/count/modify). There
+    is one writer at a time; other processes pick up its writes on refresh().
+    """
+
+    def __init__(self, directory: str, name: str, embedding_function=None, compaction_ratio: float = 0.2):
+        self.directory = directory
+        self.name = name
+        self.embedding_function = embedding_function
+        self.compaction_ratio = compaction_ratio
+
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.ndarray] = None
+        self._categories: Optional[np.ndarray] = None
+        self._category_codes: Dict[str, int] = {}
+        self._files = -1
+        self._rows = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "records.sqlite3"), check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document TEXT, metadata TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS categories (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        self.refresh()
+
+    # --- state -------------------------------------------------------------
+
+    def _meta(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+
+    def _set_meta(self, **values):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in values.items()]
+        )
+
+    def _path(self, kind: str, files: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{files}.npy")
+
+    def refresh(self) -> "MmapVectorStore":
+        """Pick up writes made by other processes; remaps the files only when they were replaced"""
+        with self._lock:
+            meta = self._meta()
+            files = int(meta.get("files", -1))
+            if files != self._files:
+                if files >= 0:
+                    self._vectors = np.load(self._path("vectors", files), mmap_mode="r+")
+                    self._categories = np.load(self._path("categories", files), mmap_mode="r+")
+                else:
+                    self._vectors = self._categories = None
+                self._files = files
+            self._rows = int(meta.get("rows", 0))
+            self._category_codes = {name: code for code, name in self._db.execute("SELECT code, name FROM categories")}
+        return self
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return json.loads(self._meta().get("collection_metadata", "{}"))
+
+    def modify(self, metadata: Optional[Dict[str, Any]] = None):
+        if metadata is not None:
+            self._set_meta(collection_metadata=json.dumps(metadata))
+
+    def count(self) -> int:
+        return int(self._meta().get("live", 0))
+
+    def tombstones(self) -> int:
+        meta = self._meta()
+        return int(meta.get("rows", 0)) - int(meta.get("live", 0))
+
+    def memory_bytes(self) -> int:
+        """Size of the mapped rows (shared through the page cache, not per process)"""
+        if self._vectors is None:
+            return 0
+        return self._rows * (self._vectors.shape[1] * 4 + 4)
+
+    # --- writes ------------------------------------------------------------
+
+    def _write_files(self, files: int, vectors: np.ndarray, categories: np.ndarray, capacity: int):
+        new_vectors = np.lib.format.open_memmap(
+            self._path("vectors", files), mode="w+", dtype=np.float32, shape=(capacity, vectors.shape[1])
+        )
+        new_categories = np.lib.format.open_memmap(
+            self._path("categories", files), mode="w+", dtype=np.int32, shape=(capacity,)
+        )
+        new_vectors[:len(vectors)] = vectors
+        new_categories[:len(categories)] = categories
+        new_categories[len(categories):] = -1
+        new_vectors.flush()
+        new_categories.flush()
+        return new_vectors, new_categories
+
+    def _remove_old_files(self):
+        for path in glob.glob(os.path.join(self.directory, "*-*.npy")):
+            if not path.endswith(f"-{self._files}.npy"):
+                # Other processes keep their mapping of an unlinked file until they refresh
+                os.remove(path)
+
+    def _ensure_capacity(self, rows: int, dimension: int):
+        if self._vectors is not None:
+            if self._vectors.shape[1] != dimension:
+                raise ValueError(f"Embedding dimension {dimension} does not match the index ({self._vectors.shape[1]})")
+            if rows <= len(self._vectors):
+                return
+        capacity = max(rows, _INITIAL_CAPACITY, 2 * len(self._vectors) if self._vectors is not None else 0)
+        files = self._files + 1
+        if self._vectors is not None:
+            vectors, categories = self._vectors[:self._rows], self._categories[:self._rows]
+        else:
+            vectors, categories = np.zeros((0, dimension), np.float32), np.zeros(0, np.int32)
+        self._vectors, self._categories = self._write_files(files, vectors, categories, capacity)
+        self._files = files
+        self._set_meta(files=files, dimension=dimension)
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self._category_codes)
+            self._db.execute("INSERT INTO categories (code, name) VALUES (?, ?)", (code, category))
+            self._category_codes[category] = code
+        return code
+
+    def upsert(self, ids: Sequence[str], embeddings: Optional[Sequence[Sequence[float]]] = None,
+               documents: Optional[Sequence[str]] = None, metadatas: Optional[Sequence[Dict[str, Any]]] = None):
+        if not len(ids):
+            return
+        if embeddings is None:
+            embeddings = self.embedding_function(list(documents))
+        vectors = truncate(np.asarray(embeddings, dtype=np.float32), None)
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = [dict(metadata or {}) for metadata in metadatas] if metadatas is not None else [{}] * len(ids)
+
+        with self._lock:
+            self.refresh()
+            files = self._files
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                placeholders = ",".join("?" * len(ids))
+                rows = dict(self._db.execute(f"SELECT id, row FROM records WHERE id IN ({placeholders})", list(ids)))
+                live_added = 0
+                next_row = self._rows
+                for doc_id in ids:
+                    if doc_id not in rows:
+                        rows[doc_id] = next_row
+                        next_row += 1
+                        live_added += 1
+
+                # Vectors are in place before the records that point at them are committed
+                self._ensure_capacity(next_row, vectors.shape[1])
+                positions = np.array([rows[doc_id] for doc_id in ids])
+                self._vectors[positions] = vectors
+                self._categories[positions] = [self._category_code(m.get("category", "")) for m in metadatas]
+                self._vectors.flush()
+                self._categories.flush()
+
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(rows[doc_id], doc_id, document, json.dumps(metadata))
+                     for doc_id, document, metadata in zip(ids, documents, metadatas)]
+                )
+                live = int(self._meta().get("live", 0)) + live_added
+                self._set_meta(rows=next_row, live=live)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                self._files = -2  # force a remap to the committed files
+                self.refresh()
+                raise
+            self._rows = next_row
+            if self._files != files:
+                self._remove_old_files()
+
+    def add(self, ids: Sequence[str], embeddings: Optional[Sequence[Sequence[float]]] = None,
+            documents: Optional[Sequence[str]] = None, metadatas: Optional[Sequence[Dict[str, Any]]] = None):
+        self.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.refresh()
+            positions = [row for row, *_ in self._select(ids, where)]
+            if not positions:
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._categories[positions] = -1
+                self._categories.flush()
+                self._db.executemany("DELETE FROM records WHERE row = ?", [(row,) for row in positions])
+                self._set_meta(live=int(self._meta().get("live", 0)) - len(positions))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+            tombstones = self.tombstones()
+            if tombstones >= _MIN_TOMBSTONES_TO_COMPACT and tombstones > self.compaction_ratio * self._rows:
+                self.compact()
+
+    def compact(self) -> int:
+        """Rewrite the matrix without tombstoned rows; returns the number of rows reclaimed"""
+        with self._lock:
+            self.refresh()
+            if self._vectors is None:
+                return 0
+            live_rows = np.flatnonzero(self._categories[:self._rows] >= 0)
+            reclaimed = self._rows - len(live_rows)
+            if not reclaimed:
+                return 0
+
+            files = self._files + 1
+            vectors, categories = self._write_files(
+                files, self._vectors[live_rows], self._categories[live_rows], max(len(live_rows), _INITIAL_CAPACITY)
+            )
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Live rows keep their order, so each moves down into an already vacated row
+                self._db.executemany(
+                    "UPDATE records SET row = ? WHERE row = ?",
+                    [(new, int(old)) for new, old in enumerate(live_rows) if new != old]
+                )
+                self._set_meta(files=files, rows=len(live_rows), live=len(live_rows))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                os.remove(self._path("vectors", files))
+                os.remove(self._path("categories", files))
+                raise
+
+            self._vectors, self._categories, self._files, self._rows = vectors, categories, files, len(live_rows)
+            self._remove_old_files()
+            logger.info(f"🗜️  Compacted vector store {self.name}: {reclaimed} tombstones reclaimed")
+            return reclaimed
+
+    # --- reads -------------------------------------------------------------
+
+    def _select(self, ids: Optional[Sequence[str]], where: Optional[Dict[str, Any]],
+                limit: Optional[int] = None, offset: Optional[int] = None) -> List[Tuple[int, str, str, str]]:
+        clauses, params = [], []
+        if ids is not None:
+            if not len(ids):
+                return []
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        for key, value in (where or {}).items():
+            if isinstance(value, dict) and set(value) == {"$in"}:
+                values = list(value["$in"])
+                if not values:
+                    return []
+                clauses.append(f"json_extract(metadata, ?) IN ({','.join('?' * len(values))})")
+                params.extend([f"$.{key}", *values])
+                continue
+            if key.startswith("$") or isinstance(value, dict):
+                raise ValueError(f"Only equality and $in filters on metadata fields are supported, got {where!r}")
+            clauses.append("json_extract(metadata, ?) = ?")
+            params.extend([f"$.{key}", value])
+
+        sql = "SELECT row, id, document, metadata FROM records"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY row"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit if limit is not None else -1, offset or 0])
+        return self._db.execute(sql, params).fetchall()
+
+    def get(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        with self._lock:
+            records = self._select(ids, where, limit, offset)
+            embeddings = None
+            if "embeddings" in include:
+                embeddings = self._vectors[[row for row, *_ in records]] if records else np.zeros((0, 0), np.float32)
+        return {
+            "ids": [doc_id for _, doc_id, _, _ in records],
+            "documents": [document for _, _, document, _ in records] if "documents" in include else None,
+            "metadatas": [json.loads(metadata) for *_, metadata in records] if "metadatas" in include else None,
+            "embeddings": embeddings,
+        }
+
+    def search(self, query_embeddings: np.ndarray, limit: int,
+               category: Optional[str] = None) -> List[List[Tuple[int, float]]]:
+        """Top (row, cosine similarity) per query: one matmul over the mapped rows, then argpartition"""
+        with self._lock:
+            vectors, categories, rows = self._vectors, self._categories, self._rows
+            code = self._category_codes.get(category) if category is not None else None
+        queries = truncate(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)), None)
+        if vectors is None or not rows or (category is not None and code is None):
+            return [[] for _ in queries]
+
+        mask = categories[:rows] >= 0 if code is None else categories[:rows] == code
+        scores = queries @ vectors[:rows].T
+        if not mask.all():
+            scores[:, ~mask] = -np.inf
+        k = min(limit, rows)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            candidates = candidates[np.argsort(-query_scores[candidates])]
+            results.append([(int(row), float(query_scores[row])) for row in candidates
+                            if query_scores[row] != -np.inf])
+        return results
+
+    def query(self, query_embeddings: Optional[Sequence[Sequence[float]]] = None,
+              query_texts: Optional[Sequence[str]] = None, n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, List[List[Any]]]:
+        """Chroma-shaped results; distances are squared L2 between unit vectors (2 - 2·cos)"""
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts))
+        if where and set(where) != {"category"}:
+            raise ValueError(f"Only a category filter is supported, got {where!r}")
+
+        while True:
+            files = self._files
+            hits = self.search(query_embeddings, n_results, (where or {}).get("category"))
+            with self._lock:
+                self._db.execute("BEGIN")
+                try:
+                    current_files = int(self._meta().get("files", -1))
+                    wanted = sorted({row for query_hits in hits for row, _ in query_hits})
+                    records = {
+                        row: (doc_id, document, metadata)
+                        for row, doc_id, document, metadata in self._db.execute(
+                            f"SELECT row, id, document, metadata FROM records WHERE row IN ({','.join('?' * len(wanted))})",
+                            wanted
+                        )
+                    }
+                finally:
+                    self._db.execute("COMMIT")
+            if current_files == files:
+                break
+            # Another process compacted the matrix, so row numbers moved; search again on the new files
+            self.refresh()
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_hits in hits:
+            query_hits = [(row, score) for row, score in query_hits if row in records]
+            results["ids"].append([records[row][0] for row, _ in query_hits])
+            results["documents"].append([records[row][1] for row, _ in query_hits])
+            results["metadatas"].append([json.loads(records[row][2]) for row, _ in query_hits])
+            results["distances"].append([2 - 2 * score for _, score in query_hits])
+        return results
+
+
+def import_collection(collection, store: MmapVectorStore, page_size: int = 5000) -> int:
+    """Copy a Chroma collection, stored vectors included, into a store; no embedding API calls"""
+    copied, offset = 0, 0
+    while True:
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        if not len(page["ids"]):
+            break
+        store.upsert(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                     metadatas=page["metadatas"])
+        copied += len(page["ids"])
+        offset += len(page["ids"])
+    store.modify(metadata=collection.metadata or {})
+    return copied
+
+
+if __name__ == "__main__":
+    import chromadb
+
+    from .embedding_providers import knowledge_collection_name
+
+    parser = argparse.ArgumentParser(description="Memory-mapped NumPy vector store")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("import-chroma", help="Copy the Chroma knowledge collection into the NumPy store")
+    subcommands.add_parser("compact", help="Reclaim tombstoned rows")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    collection_name = knowledge_collection_name(settings.EMBEDDING_PROVIDER)
+    target = MmapVectorStore(os.path.join(settings.NUMPY_INDEX_DIRECTORY, collection_name), collection_name)
+    started = time.perf_counter()
+    if args.command == "import-chroma":
+        source = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY).get_collection(collection_name)
+        result = {"imported": import_collection(source, target)}
+    else:
+        result = {"reclaimed": target.compact()}
+    print(json.dumps({**result, "rows": target.count(), "seconds": round(time.perf_counter() - started, 2)}))
@@ -1,73 +1,389 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+
 import chromadb
-from chromadb.utils.embedding_functions import GoogleGenerativeAiEmbeddingFunction
 
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
+
+from ..config import settings
+from .embedding_cache import EmbeddingCache, Embedding, normalize_query
+from .embedding_providers import create_embedding_function, embedding_model_id, knowledge_collection_name
+from .knowledge_aliases import KnowledgeAliases
+from .lexical_index import BM25Index
+from .mmap_vector_store import MmapVectorStore
+from .retrieval_executor import CoalescingExecutor
+from .seed_knowledge import SEED_KNOWLEDGE, SMOKE_QUERIES
+from .vector_index import CompactVectorIndex, build_from_collection
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeSnapshot:
+    """Everything a query reads about one collection version.
+
+    Built off the request path and installed with a single assignment, so a
+    query never sees a half-built index or indexes from different versions.
+    """
+
+    def __init__(self, collection, version: str, lexical_index: BM25Index,
+                 documents: Dict[str, Tuple[str, Dict[str, Any]]], compact_index: Optional[CompactVectorIndex]):
+        self.collection = collection
+        self.version = version
+        self.lexical_index = lexical_index
+        self.documents = documents
+        self.compact_index = compact_index
+
 
 class RAGService:
     def __init__(self):
-        self.client = chromadb.PersistentClient(path="./chroma_db")
-        self.embedding_function = GoogleGenerativeAiEmbeddingFunction(
-            model_name="gemini-embedding-001",
-            task_type="RETRIEVAL_DOCUMENT"
-        )
-        self.collection = self.client.get_or_create_collection(
-            name="tbc_bank_knowledge",
-            embedding_function=self.embedding_function
+        # Chosen by EMBEDDING_PROVIDER; each vector space has its own collection
+        self.embedding_function = create_embedding_function(settings.EMBEDDING_PROVIDER)
+        self.embedding_cache = EmbeddingCache(
+            path=settings.EMBEDDING_CACHE_PATH,
+            model_name=embedding_model_id(settings.EMBEDDING_PROVIDER),
+            max_memory_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            max_disk_entries=settings.EMBEDDING_CACHE_MAX_DISK_ENTRIES
         )
+        self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY) \
+            if settings.VECTOR_BACKEND != "numpy" else None
+        # Blue/green: the base name is an alias for the versioned collection currently served
+        self.collection_base = knowledge_collection_name(settings.EMBEDDING_PROVIDER)
+        self.aliases = KnowledgeAliases(settings.KNOWLEDGE_ALIAS_PATH)
+        self.collection = self.open_collection(self.aliases.active(self.collection_base))
+
+        # BM25, documents and the compact vector copy of the served collection, swapped together
+        self._snapshot: Optional[KnowledgeSnapshot] = None
+        # The version served before the last swap, kept loaded for instant rollback
+        self._previous_snapshot: Optional[KnowledgeSnapshot] = None
+        self._checked_at = 0.0
+        self._loading = False
+        self._loading_lock = threading.Lock()
+        self.retrieval_stats = Counter()
+        # Embedding calls and vector queries block; they run here, never on the event loop
+        self.executor = CoalescingExecutor(settings.RETRIEVAL_WORKERS, "retrieval")
+
         if self.collection.count() == 0:
-            self._initialize_knowledge()
+            self.seed_collection(self.collection)
 
-    def _initialize_knowledge(self):
-        knowledge_data =  [
-            {
-                "id": "tbc_card_benefits",
-                "content": "TBC Card offers 0.6% cashback on any payment in Georgia, doubled cashback (1.2%) in selected categories like grocery, fuel, and pharmacy. Free cash withdrawal up to 10,000₾ monthly from any ATM in Georgia.",
-                "category": "cards"
-            },
-            {
-                "id": "tbc_concept_360",
-                "content": "TBC Concept Card 360 provides 0.7% cashback on every payment, triple cashback (2.1%) in selected categories, personal banker service, and free cash withdrawal up to 20,000₾ monthly.",
-                "category": "cards"
-            },
-            {
-                "id": "card_blocking",
-                "content": "You can block your TBC card instantly through mobile banking, by calling customer service, or through our chatbot. Blocking is immediate and helps protect against unauthorized transactions.",
-                "category": "card_security"
-            },
-            {
-                "id": "loan_types",
-                "content": "TBC Bank offers personal loans, mortgage loans, car loans, and business loans. Interest rates vary based on loan type, amount, and customer profile. Loan limits are calculated based on income and existing obligations.",
-                "category": "loans"
-            },
-            {
-                "id": "customer_support",
-                "content": "TBC Bank customer support is available 24/7 through phone at (995 32) 2272727, mobile app chat, or online banking. You can also visit any TBC branch during business hours.",
-                "category": "support"
-            },
-            {
-                "id": "card_security_service",
-                "content": "Card Security Service protects against illegal/fraudulent transactions. TBC Card includes 5₾ annual fee, TBC Concept Card includes 10₾ fee, and TBC Concept 360 includes it free. Coverage includes up to 3000₾ for unauthorized transactions.",
-                "category": "card_security"
-            }
-        ]
-        self.collection.add(
+    def open_collection(self, name: str):
+        if self.client is None:
+            return MmapVectorStore(
+                directory=os.path.join(settings.NUMPY_INDEX_DIRECTORY, name),
+                name=name,
+                embedding_function=self.embedding_function,
+                compaction_ratio=settings.VECTOR_COMPACTION_RATIO
+            )
+        return self.client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+
+    def delete_collection(self, name: str):
+        if self.client is None:
+            shutil.rmtree(os.path.join(settings.NUMPY_INDEX_DIRECTORY, name), ignore_errors=True)
+        else:
+            self.client.delete_collection(name)
+        shutil.rmtree(self.compact_index_directory(name), ignore_errors=True)
+
+    def versioned_collections(self) -> List[str]:
+        """Collections built by rebuilds of this knowledge base, oldest first"""
+        if self.client is None:
+            names = os.listdir(settings.NUMPY_INDEX_DIRECTORY) if os.path.isdir(settings.NUMPY_INDEX_DIRECTORY) else []
+        else:
+            names = [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+        return sorted(name for name in names if name.startswith(f"{self.collection_base}_v"))
+
+    def new_collection_name(self) -> str:
+        return f"{self.collection_base}_v{time.strftime('%Y%m%d%H%M%S')}"
+
+    @staticmethod
+    def compact_index_directory(name: str) -> str:
+        return os.path.join(settings.VECTOR_INDEX_DIRECTORY, name)
+
+    def seed_collection(self, collection):
+        knowledge_data = SEED_KNOWLEDGE
+        collection.add(
             ids=[item['id'] for item in knowledge_data],
             documents=[item['content'] for item in knowledge_data],
             metadatas=[{"category": item["category"]} for item in knowledge_data]
         )
+        self.mark_knowledge_changed(collection)
+
+    def mark_knowledge_changed(self, collection=None):
+        """Record a new knowledge version; call after any write to the collection"""
+        collection = collection if collection is not None else self.collection
+        collection.modify(metadata={"knowledge_version": str(uuid.uuid4())})
+        if collection is self.collection:
+            self._checked_at = 0.0
+
+    def knowledge_version(self, collection=None) -> str:
+        """Fingerprint of the collection contents, also reflecting writes by other processes"""
+        collection = collection if collection is not None else self.collection
+        if self.client is None:
+            collection = collection.refresh()
+        else:
+            collection = self.client.get_collection(
+                name=collection.name,
+                embedding_function=self.embedding_function
+            )
+        return f"{collection.name}:{(collection.metadata or {}).get('knowledge_version', '')}:{collection.count()}"
+
+    def embed_query(self, query: str) -> Embedding:
+        """Query embedding, served from the cache when the question was seen before"""
+        return self.embedding_cache.get_or_compute([query], self.embedding_function)[0]
+
+    async def embed_query_async(self, query: str) -> Embedding:
+        return await self.executor.run(("embed", normalize_query(query)), self.embed_query, query)
+
+    async def knowledge_version_async(self) -> str:
+        return await self.executor.run("knowledge_version", self.knowledge_version)
+
+    @staticmethod
+    def compact_storage_enabled() -> bool:
+        return bool(settings.EMBEDDING_STORAGE_DIMENSION) or settings.EMBEDDING_QUANTIZATION != "none"
+
+    def _refresh_indexes(self):
+        """Follow alias swaps and writes; only the very first load happens on the request path"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.LEXICAL_INDEX_REFRESH_SECONDS:
+            return
+        self._checked_at = now
+
+        name = self.aliases.active(self.collection_base)
+        snapshot = self._snapshot
+        if snapshot is not None and (self._loading or (
+                name == snapshot.collection.name and self.knowledge_version(snapshot.collection) == snapshot.version)):
+            return
+
+        collection = snapshot.collection if snapshot is not None and name == snapshot.collection.name \
+            else self.open_collection(name)
+        if snapshot is None:
+            self._install(self.build_snapshot(collection))
+            return
+
+        with self._loading_lock:
+            if self._loading:
+                return
+            self._loading = True
+
+        def load():
+            try:
+                self._install(self.build_snapshot(collection))
+            except Exception as e:
+                logger.error(f"❌ Failed to load knowledge collection {collection.name}: {e}")
+            finally:
+                self._loading = False
+
+        threading.Thread(target=load, name="knowledge-index-loader", daemon=True).start()
+
+    def build_snapshot(self, collection) -> KnowledgeSnapshot:
+        version = self.knowledge_version(collection)
+        index = BM25Index()
+        documents = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=5000, offset=offset)
+            if not page["ids"]:
+                break
+            for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                metadata = metadata or {}
+                documents[doc_id] = (document, metadata)
+                index.add(doc_id, document, metadata.get("category", ""))
+            offset += len(page["ids"])
+
+        compact_index = self._load_compact_index(collection, version) if self.compact_storage_enabled() else None
+        return KnowledgeSnapshot(collection, version, index, documents, compact_index)
+
+    def _load_compact_index(self, collection, version: str) -> CompactVectorIndex:
+        directory = self.compact_index_directory(collection.name)
+        snapshot = self._snapshot
+        compact_index = snapshot.compact_index if snapshot is not None and snapshot.collection.name == collection.name \
+            else None
+        compact_index = compact_index or CompactVectorIndex.load(directory)
+        stale = compact_index is None or compact_index.knowledge_version != version or (
+            compact_index.quantization != settings.EMBEDDING_QUANTIZATION
+            or settings.EMBEDDING_STORAGE_DIMENSION not in (0, compact_index.dimension)
+            or (settings.EMBEDDING_RERANK and compact_index.full is None)
+        )
+        if stale:
+            # Re-project the stored vectors; no embedding API calls
+            compact_index = build_from_collection(
+                collection,
+                version,
+                settings.EMBEDDING_STORAGE_DIMENSION or None,
+                settings.EMBEDDING_QUANTIZATION,
+                keep_full=settings.EMBEDDING_RERANK
+            )
+            compact_index.save(directory)
+        return compact_index
+
+    def _install(self, snapshot: KnowledgeSnapshot):
+        current = self._snapshot
+        if current is not None and current.collection.name != snapshot.collection.name:
+            self._previous_snapshot = current
+            logger.info(f"🔁 Serving knowledge collection {snapshot.collection.name} (was {current.collection.name})")
+        self._snapshot = snapshot
+        self.collection = snapshot.collection
+
+    async def smoke_test(self, snapshot: KnowledgeSnapshot, queries: Optional[List[Dict[str, str]]] = None) -> List[Dict]:
+        """Smoke queries whose expected document is not in the top results of a candidate snapshot"""
+        if queries is None:
+            queries = SMOKE_QUERIES
+            if os.path.exists(settings.KNOWLEDGE_SMOKE_QUERIES_PATH):
+                with open(settings.KNOWLEDGE_SMOKE_QUERIES_PATH, encoding="utf-8") as f:
+                    queries = json.load(f)
+
+        failures = []
+        for smoke in queries:
+            results = await asyncio.to_thread(self._search, snapshot, smoke["query"], settings.SMOKE_QUERY_TOP_K)
+            found = [result["id"] for result in results]
+            if smoke["expected_id"] not in found:
+                failures.append({**smoke, "found": found})
+        return failures
+
+    def promote(self, snapshot: KnowledgeSnapshot):
+        """Atomically serve a validated snapshot; older versions beyond the rollback history are dropped"""
+        dropped = self.aliases.swap(
+            self.collection_base, snapshot.collection.name, keep=settings.KNOWLEDGE_VERSIONS_TO_KEEP
+        )
+        self._install(snapshot)
+        referenced = {snapshot.collection.name, *self.aliases.history(self.collection_base)}
+        for name in set(dropped) | set(self.versioned_collections()):
+            if name not in referenced and name.startswith(f"{self.collection_base}_v"):
+                self.delete_collection(name)
+                logger.info(f"🗑️  Dropped knowledge collection {name}")
+
+    def rollback(self) -> str:
+        """Serve the previous version again; instant when it is still loaded in this process"""
+        name = self.aliases.rollback(self.collection_base)
+        previous = self._previous_snapshot
+        if previous is not None and previous.collection.name == name:
+            self._previous_snapshot = None
+            self._install(previous)
+        else:
+            self._checked_at = 0.0
+        return name
+
+    def knowledge_versions(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "base": self.collection_base,
+            "active": self.aliases.active(self.collection_base),
+            "serving": snapshot.collection.name if snapshot is not None else None,
+            "serving_version": snapshot.version if snapshot is not None else None,
+            "history": self.aliases.history(self.collection_base),
+            "loading": self._loading,
+        }
 
-    async def search_knowledge(self, query: str, limit: int = 3) -> List[Dict]:
-        results = self.collection.query(
-            query_texts=[query],
+    def _is_decisive(self, lexical: List[Tuple[str, float, float]]) -> bool:
+        """The best lexical hit covers the query and no other hit does, or it clearly outscores them"""
+        if not lexical or lexical[0][2] < settings.LEXICAL_DECISIVE_COVERAGE:
+            return False
+        if len(lexical) == 1 or lexical[1][2] < settings.LEXICAL_DECISIVE_COVERAGE:
+            return True
+        return lexical[0][1] >= settings.LEXICAL_DECISIVE_MARGIN * lexical[1][1]
+
+    def _vector_search(self, snapshot: KnowledgeSnapshot, query: str, limit: int,
+                       category_filter: Optional[str]) -> List[Dict]:
+        if snapshot.compact_index is not None:
+            hits = snapshot.compact_index.search(
+                self.embed_query(query),
+                limit,
+                category_filter,
+                rerank_candidates=settings.RERANK_CANDIDATES if settings.EMBEDDING_RERANK else 0
+            )
+            return [
+                {
+                    "id": doc_id,
+                    "content": snapshot.documents[doc_id][0],
+                    "category": snapshot.documents[doc_id][1].get("category", ""),
+                    "similarity_score": score
+                }
+                for doc_id, score in hits
+                if doc_id in snapshot.documents
+            ]
+
+        results = snapshot.collection.query(
+            query_embeddings=[self.embed_query(query)],
             n_results=limit,
+            where={"category": category_filter} if category_filter else None,
         )
         return [
             {
                 "id": results["ids"][0][i],
                 "content": results["documents"][0][i],
-                "category": results["metadatas"][0][i]
+                "category": results["metadatas"][0][i]["category"],
+                # Squared L2 distance between unit vectors: 2 - 2·cos
+                "similarity_score": 1 - results["distances"][0][i] / 2
             }
             for i in range(len(results['documents'][0]))
         ]
 
+    async def search_knowledge(self, query: str, limit: int = 3, category_filter: Optional[str] = None) -> List[Dict]:
+        """Hybrid search: BM25 and vector candidates, pre-filtered by category and fused by reciprocal rank.
+
+        When the lexical match is decisive (e.g. an exact product name) the
+        vector search, and with it the embedding call, is skipped. Runs on the
+        retrieval executor; identical searches already in flight are shared.
+        """
+        key = ("search", normalize_query(query), limit, category_filter)
+        results = await self.executor.run(key, self._search_current, query, limit, category_filter)
+        # Waiters share one result list; each gets its own copies
+        return [dict(result) for result in results]
+
+    def _search_current(self, query: str, limit: int, category_filter: Optional[str]) -> List[Dict]:
+        self._refresh_indexes()
+        return self._search(self._snapshot, query, limit, category_filter)
+
+    def _search(self, snapshot: KnowledgeSnapshot, query: str, limit: int,
+                category_filter: Optional[str] = None) -> List[Dict]:
+        candidates = max(limit, settings.HYBRID_CANDIDATES)
+        lexical = snapshot.lexical_index.search(query, candidates, category_filter)
+        top_lexical_score = lexical[0][1] if lexical else 0.0
+
+        def lexical_result(doc_id: str, score: float) -> Dict:
+            content, metadata = snapshot.documents[doc_id]
+            return {
+                "id": doc_id,
+                "content": content,
+                "category": metadata.get("category", ""),
+                "similarity_score": score / top_lexical_score,
+                "lexical_score": score,
+            }
+
+        if self._is_decisive(lexical):
+            self.retrieval_stats["lexical"] += 1
+            return [lexical_result(doc_id, score) for doc_id, score, _ in lexical[:limit]]
+
+        vector = self._vector_search(snapshot, query, candidates, category_filter)
+        self.retrieval_stats["hybrid" if lexical else "vector"] += 1
+
+        fused: Dict[str, float] = {}
+        results: Dict[str, Dict] = {}
+        for rank, (doc_id, score, _) in enumerate(lexical):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1 / (settings.RRF_K + rank + 1)
+            results[doc_id] = lexical_result(doc_id, score)
+        for rank, result in enumerate(vector):
+            fused[result["id"]] = fused.get(result["id"], 0.0) + 1 / (settings.RRF_K + rank + 1)
+            results[result["id"]] = {**results.get(result["id"], {}), **result}
+
+        ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+        return [{**results[doc_id], "fusion_score": fused[doc_id]} for doc_id in ranked]
+
+    async def get_categories(self) -> List[str]:
+        return list(await self.executor.run("categories", self._current_categories))
+
+    def _current_categories(self) -> List[str]:
+        self._refresh_indexes()
+        return sorted({
+            metadata["category"] for _, metadata in self._snapshot.documents.values() if metadata.get("category")
+        })
+
+    def close(self):
+        self.executor.shutdown()
+
 rag_service = RAGService()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3)
+
+
+class CoalescingExecutor:
+    """Dedicated thread pool for blocking retrieval work that merges identical in-flight calls.
+
+    Embedding requests and vector queries block, so they run here instead of
+    on the event loop or on the default pool shared with everything else. A
+    call whose key matches one already queued or running awaits that call's
+    result instead of submitting its own, so a burst of the same question costs
+    one embedding and one search. Queue depth and the time calls wait for a
+    worker show when ``workers`` is too small.
+    """
+
+    def __init__(self, workers: int, name: str, window: int = 1000):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._wait_ms = deque(maxlen=window)
+        self._run_ms = deque(maxlen=window)
+        self.stats = Counter()
+
+    async def run(self, key: Optional[Hashable], fn: Callable[..., Any], *args) -> Any:
+        """Result of fn(*args) on the pool; callers passing the same key share one call"""
+        loop = asyncio.get_running_loop()
+        if key is not None:
+            key = (id(loop), key)
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return await asyncio.shield(future)
+
+        with self._lock:
+            self._queued += 1
+        self.stats["submitted"] += 1
+        future = loop.run_in_executor(self._executor, self._call, time.perf_counter(), fn, args)
+        if key is not None:
+            self._in_flight[key] = future
+
+            def forget(done: asyncio.Future):
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+
+            future.add_done_callback(forget)
+        # Shielded so a cancelled caller does not cancel the call other waiters share
+        return await asyncio.shield(future)
+
+    def _call(self, submitted: float, fn: Callable[..., Any], args) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_ms.append((started - submitted) * 1000)
+        outcome = "failed"
+        try:
+            result = fn(*args)
+            outcome = "completed"
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_ms.append((time.perf_counter() - started) * 1000)
+                self.stats[outcome] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            wait_ms, run_ms = list(self._wait_ms), list(self._run_ms)
+            queued, running = self._queued, self._running
+        return {
+            "workers": self.workers,
+            "queue_depth": queued,
+            "running": running,
+            **{key: self.stats[key] for key in ("submitted", "coalesced", "completed", "failed")},
+            "wait_ms_p50": _percentile(wait_ms, 0.5),
+            "wait_ms_p95": _percentile(wait_ms, 0.95),
+            "wait_ms_max": round(max(wait_ms), 3) if wait_ms else 0.0,
+            "run_ms_p50": _percentile(run_ms, 0.5),
+            "run_ms_p95": _percentile(run_ms, 0.95),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
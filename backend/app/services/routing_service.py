@@ -0,0 +1,84 @@
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .intent_router import IntentRouter
+
+# Session state keys written by the specialists (see agents/routing_tools.py)
+ACTIVE_AGENT_KEY = "active_agent"
+ACTIVE_AGENT_UPDATED_AT_KEY = "active_agent_updated_at"
+TOPIC_CHANGED_KEY = "topic_changed"
+
+RUNNER_BY_AGENT_NAME = {
+    "coordinator_agent": "coordinator",
+    "card_operations_agent": "card_operations",
+    "loan_agent": "loan",
+    "support_agent": "support",
+}
+
+
+class AgentRouter:
+    """Pick the runner for a chat turn.
+
+    An explicit ``preferred_agent`` wins. Otherwise follow-up turns go straight
+    to the specialist that answered last, until it hands the topic back or the
+    session has been idle for longer than the sticky timeout. New topics are
+    tried against the local intent router, and only ambiguous messages reach
+    the coordinator LLM.
+    """
+
+    def __init__(self, runners: Iterable[str], sticky_timeout_minutes: int,
+                 intent_router: Optional[IntentRouter] = None):
+        self.runners = set(runners)
+        self.sticky_timeout_seconds = sticky_timeout_minutes * 60
+        self.intent_router = intent_router
+        self.decisions = Counter()
+
+    def route(self, preferred_agent: Optional[str], session_state: Dict[str, Any],
+              message: str = "") -> Tuple[str, str]:
+        """The runner for the turn and what decided it: preferred, sticky, intent or coordinator"""
+        if preferred_agent in self.runners:
+            self.decisions["preferred"] += 1
+            return preferred_agent, "preferred"
+
+        sticky = self.sticky_runner(session_state)
+        if sticky:
+            self.decisions["sticky"] += 1
+            return sticky, "sticky"
+
+        if self.intent_router and message:
+            routed = self.intent_router.route(message)
+            if routed in self.runners:
+                self.decisions["intent"] += 1
+                return routed, "intent"
+
+        self.decisions["coordinator"] += 1
+        return "coordinator", "coordinator"
+
+    def sticky_runner(self, session_state: Dict[str, Any]) -> Optional[str]:
+        runner = RUNNER_BY_AGENT_NAME.get(session_state.get(ACTIVE_AGENT_KEY))
+        if not runner or runner == "coordinator" or runner not in self.runners:
+            return None
+
+        if session_state.get(TOPIC_CHANGED_KEY):
+            return None
+
+        updated_at = session_state.get(ACTIVE_AGENT_UPDATED_AT_KEY) or 0
+        if time.time() - updated_at > self.sticky_timeout_seconds:
+            return None
+
+        return runner
+
+    def metrics(self) -> Dict[str, Any]:
+        total = sum(self.decisions.values())
+        skipped = self.decisions["sticky"] + self.decisions["intent"]
+        return {
+            "decisions": dict(self.decisions),
+            "coordinator_skip_ratio": round(skipped / total, 4) if total else 0.0,
+            "intent_router": self.intent_router.metrics() if self.intent_router else None,
+        }
+
+    @staticmethod
+    def is_hand_back(event) -> bool:
+        """Whether the event is a specialist signalling that the topic has changed"""
+        return bool(event.actions and event.actions.state_delta.get(TOPIC_CHANGED_KEY))
@@ -0,0 +1,44 @@
+# Documents loaded into an empty knowledge collection
+SEED_KNOWLEDGE = [
+    {
+        "id": "tbc_card_benefits",
+        "content": "TBC Card offers 0.6% cashback on any payment in Georgia, doubled cashback (1.2%) in selected categories like grocery, fuel, and pharmacy. Free cash withdrawal up to 10,000₾ monthly from any ATM in Georgia.",
+        "category": "cards"
+    },
+    {
+        "id": "tbc_concept_360",
+        "content": "TBC Concept Card 360 provides 0.7% cashback on every payment, triple cashback (2.1%) in selected categories, personal banker service, and free cash withdrawal up to 20,000₾ monthly.",
+        "category": "cards"
+    },
+    {
+        "id": "card_blocking",
+        "content": "You can block your TBC card instantly through mobile banking, by calling customer service, or through our chatbot. Blocking is immediate and helps protect against unauthorized transactions.",
+        "category": "card_security"
+    },
+    {
+        "id": "loan_types",
+        "content": "TBC Bank offers personal loans, mortgage loans, car loans, and business loans. Interest rates vary based on loan type, amount, and customer profile. Loan limits are calculated based on income and existing obligations.",
+        "category": "loans"
+    },
+    {
+        "id": "customer_support",
+        "content": "TBC Bank customer support is available 24/7 through phone at (995 32) 2272727, mobile app chat, or online banking. You can also visit any TBC branch during business hours.",
+        "category": "support"
+    },
+    {
+        "id": "card_security_service",
+        "content": "Card Security Service protects against illegal/fraudulent transactions. TBC Card includes 5₾ annual fee, TBC Concept Card includes 10₾ fee, and TBC Concept 360 includes it free. Coverage includes up to 3000₾ for unauthorized transactions.",
+        "category": "card_security"
+    }
+]
+
+# Checked against every rebuilt knowledge collection before it is served; each
+# expected document has to be among the top SMOKE_QUERY_TOP_K results
+SMOKE_QUERIES = [
+    {"query": "How much cashback does the TBC Card give?", "expected_id": "tbc_card_benefits"},
+    {"query": "Concept 360 personal banker", "expected_id": "tbc_concept_360"},
+    {"query": "How do I block a lost or stolen card?", "expected_id": "card_blocking"},
+    {"query": "What kinds of loans do you offer?", "expected_id": "loan_types"},
+    {"query": "customer service phone number", "expected_id": "customer_support"},
+    {"query": "protection against fraudulent transactions", "expected_id": "card_security_service"},
+]
@@ -3,26 +3,43 @@ from typing import Dict, List, Optional
 
 from google.adk.events import Event, EventActions
 from google.adk.memory import InMemoryMemoryService
-from google.adk.sessions import InMemorySessionService, DatabaseSessionService
+from google.adk.sessions import DatabaseSessionService
 from google.adk.sessions.session import Session
+from sqlalchemy import delete
 
 from ..config import settings
-from ..database.connection import get_db
+from ..database.connection import AsyncSessionLocal
 from ..database.models import ChatSession
+from .session_store import BoundedSessionService, TieredSessionService
 
 
 class TBCSessionService:
 
     def __init__(self):
-        self.memory_service = InMemorySessionService()
+        self.hot_service = BoundedSessionService(
+            idle_ttl_seconds=settings.SESSION_TIMEOUT_HOURS * 3600,
+            max_sessions_per_user=settings.MAX_SESSIONS_PER_USER,
+            max_sessions=settings.MAX_SESSIONS,
+            memory_budget_bytes=settings.SESSION_MEMORY_BUDGET_MB * 1024 * 1024
+        )
 
-        if settings.DATABASE_URL:
+        if settings.DATABASE_URL and settings.ENABLE_MEMORY_PERSISTENCE:
             self.db_service = DatabaseSessionService(db_url=settings.DATABASE_URL)
+            # Runners talk to memory_service: hot reads, DB write-through, hydrate on miss
+            self.memory_service = TieredSessionService(
+                self.hot_service, self.db_service, revalidate=settings.SESSION_REVALIDATE_HOT
+            )
         else:
             self.db_service = None
+            self.memory_service = self.hot_service
 
         self.memory_service_instance = InMemoryMemoryService()
 
+    async def close(self):
+        """Flush pending write-through to the database tier"""
+        if isinstance(self.memory_service, TieredSessionService):
+            await self.memory_service.stop()
+
     async def create_session(self, app_name: str, user_id: str, session_id: str = None,
                              initial_state: Dict = None) -> Session:
 
@@ -46,28 +63,30 @@ class TBCSessionService:
             state=initial_state
         )
 
-        db = next(get_db())
-        try:
-            chat_session = ChatSession(
-                session_id=session.id,
-                customer_id=user_id
-            )
-            db.add(chat_session)
-            db.commit()
+        async with AsyncSessionLocal() as db:
+            try:
+                chat_session = ChatSession(
+                    session_id=session.id,
+                    customer_id=user_id
+                )
+                db.add(chat_session)
+                await db.commit()
 
-            print(f"✅ Created session {session.id} for user {user_id}")
+                print(f"✅ Created session {session.id} for user {user_id}")
 
-        except Exception as e:
-            print(f"❌ Error saving session to database: {e}")
-            db.rollback()
-        finally:
-            db.close()
+            except Exception as e:
+                print(f"❌ Error saving session to database: {e}")
+                await db.rollback()
 
         return session
 
     async def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
         try:
-            return await self.memory_service.get_session(app_name, user_id, session_id)
+            return await self.memory_service.get_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
         except Exception as e:
             print(f"❌ Error getting session {session_id}: {e}")
             return None
@@ -95,27 +114,26 @@ class TBCSessionService:
 
     async def list_sessions(self, app_name: str, user_id: str) -> List[str]:
         try:
-            response = await self.memory_service.list_sessions(app_name, user_id)
-            return response.session_ids
+            response = await self.memory_service.list_sessions(app_name=app_name, user_id=user_id)
+            return [session.id for session in response.sessions]
         except Exception as e:
             print(f"❌ Error listing sessions: {e}")
             return []
 
     async def delete_session(self, app_name: str, user_id: str, session_id: str):
         try:
-            await self.memory_service.delete_session(app_name, user_id, session_id)
+            await self.memory_service.delete_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
 
             # Also delete from database
-            db = next(get_db())
-            try:
-                chat_session = db.query(ChatSession).filter(
-                    ChatSession.session_id == session_id
-                ).first()
-                if chat_session:
-                    db.delete(chat_session)
-                    db.commit()
-            finally:
-                db.close()
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(ChatSession).where(ChatSession.session_id == session_id)
+                )
+                await db.commit()
 
         except Exception as e:
             print(f"❌ Error deleting session: {e}")
@@ -0,0 +1,527 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.database_session_service import StorageSession
+from google.adk.sessions.session import Session
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# Per-object overheads for the memory estimate, calibrated against RSS in benchmarks/session_store_soak.py
+_SESSION_OVERHEAD_BYTES = 3072
+_EVENT_OVERHEAD_BYTES = 2560
+
+SessionKey = Tuple[str, str, str]
+
+
+def _estimate_event_bytes(event: Event) -> int:
+    size = _EVENT_OVERHEAD_BYTES
+    if event.content and event.content.parts:
+        for part in event.content.parts:
+            if part.text:
+                size += len(part.text)
+            if part.function_call:
+                size += len(str(part.function_call.args))
+            if part.function_response:
+                size += len(str(part.function_response.response))
+    if event.actions and event.actions.state_delta:
+        size += len(str(event.actions.state_delta))
+    return size
+
+
+class _Entry:
+    __slots__ = ("session", "last_access", "size_bytes")
+
+    def __init__(self, session: Session, size_bytes: int):
+        self.session = session
+        self.last_access = time.monotonic()
+        self.size_bytes = size_bytes
+
+
+class BoundedSessionService(BaseSessionService):
+    """In-memory ADK session service with idle TTL, per-user caps and LRU eviction.
+
+    Sessions live in one OrderedDict kept in least-recently-used order, so idle
+    expiry and global eviction only ever look at its head. A per-user
+    OrderedDict index gives O(1) per-user cap enforcement and makes
+    ``list_sessions`` proportional to that user's (capped) session count.
+    Memory is bounded by both a session count and an estimated byte budget.
+
+    Unlike ADK's InMemorySessionService, ``app:``/``user:`` prefixed state keys
+    are kept on the session itself rather than shared across sessions.
+
+    Reads are copy-free: ``create_session``/``get_session`` hand out the stored
+    session itself (or a view sharing its events), so a turn no longer pays a
+    deep copy of the whole history. Callers treat it as read-only and change it
+    only through ``append_event``, which applies each event exactly once.
+    """
+
+    def __init__(self, idle_ttl_seconds: float, max_sessions_per_user: int, max_sessions: int,
+                 memory_budget_bytes: int, on_evict: Optional[Callable[[SessionKey], None]] = None):
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_sessions_per_user = max_sessions_per_user
+        self.max_sessions = max_sessions
+        self.memory_budget_bytes = memory_budget_bytes
+        self.on_evict = on_evict
+
+        self._sessions: "OrderedDict[SessionKey, _Entry]" = OrderedDict()
+        self._user_index: Dict[Tuple[str, str], "OrderedDict[str, None]"] = {}
+        self._bytes = 0
+        self.stats = {"created": 0, "evicted_idle": 0, "evicted_user_cap": 0, "evicted_budget": 0}
+
+    async def create_session(
+            self,
+            *,
+            app_name: str,
+            user_id: str,
+            state: Optional[Dict[str, Any]] = None,
+            session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state or {},
+            last_update_time=time.time()
+        )
+
+        key = (app_name, user_id, session_id)
+        self._remove(key)
+        self._insert(key, _Entry(session, _SESSION_OVERHEAD_BYTES + len(str(session.state))))
+        self.stats["created"] += 1
+
+        self._enforce_user_cap(app_name, user_id)
+        self._enforce_limits()
+
+        return session
+
+    def put_session(self, session: Session):
+        """Insert an already-built session (e.g. hydrated from another tier)"""
+        key = (session.app_name, session.user_id, session.id)
+        size_bytes = _SESSION_OVERHEAD_BYTES + len(str(session.state)) + sum(
+            _estimate_event_bytes(event) for event in session.events
+        )
+        self._remove(key)
+        self._insert(key, _Entry(session, size_bytes))
+        self._enforce_user_cap(session.app_name, session.user_id)
+        self._enforce_limits()
+
+    async def get_session(
+            self,
+            *,
+            app_name: str,
+            user_id: str,
+            session_id: str,
+            config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        entry = self._touch((app_name, user_id, session_id))
+        if entry is None:
+            return None
+
+        session = entry.session
+        if config and (config.num_recent_events or config.after_timestamp):
+            events = session.events
+            if config.num_recent_events:
+                events = events[-config.num_recent_events:]
+            if config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+            # Shallow view: state and events are shared with the stored session
+            session = session.model_copy(update={"events": events})
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        self._expire_idle()
+        session_ids = self._user_index.get((app_name, user_id), {})
+        return ListSessionsResponse(sessions=[
+            Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state={},
+                last_update_time=self._sessions[(app_name, user_id, session_id)].session.last_update_time
+            )
+            for session_id in session_ids
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._remove((app_name, user_id, session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        entry = self._touch((session.app_name, session.user_id, session.id))
+        if entry is None:
+            logger.warning(f"Session {session.id} was evicted before event {event.id} could be stored")
+            return event
+
+        if entry.session is not session:
+            # A detached copy (e.g. a filtered view): keep the stored session in step
+            await super().append_event(session=entry.session, event=event)
+            entry.session.last_update_time = event.timestamp
+
+        added_bytes = _estimate_event_bytes(event)
+        entry.size_bytes += added_bytes
+        self._bytes += added_bytes
+        self._enforce_limits()
+
+        return event
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "sessions": len(self._sessions),
+            "users": len(self._user_index),
+            "estimated_bytes": self._bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+        }
+
+    def _touch(self, key: SessionKey) -> Optional[_Entry]:
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+
+        now = time.monotonic()
+        if now - entry.last_access > self.idle_ttl_seconds:
+            self._remove(key)
+            self.stats["evicted_idle"] += 1
+            return None
+
+        entry.last_access = now
+        self._sessions.move_to_end(key)
+        self._user_index[key[:2]].move_to_end(key[2])
+        return entry
+
+    def _insert(self, key: SessionKey, entry: _Entry):
+        self._sessions[key] = entry
+        self._user_index.setdefault(key[:2], OrderedDict())[key[2]] = None
+        self._bytes += entry.size_bytes
+
+    def _remove(self, key: SessionKey) -> Optional[_Entry]:
+        entry = self._sessions.pop(key, None)
+        if entry is None:
+            return None
+
+        self._bytes -= entry.size_bytes
+        user_sessions = self._user_index[key[:2]]
+        del user_sessions[key[2]]
+        if not user_sessions:
+            del self._user_index[key[:2]]
+        if self.on_evict:
+            self.on_evict(key)
+        return entry
+
+    def _enforce_user_cap(self, app_name: str, user_id: str):
+        user_sessions = self._user_index.get((app_name, user_id))
+        while user_sessions and len(user_sessions) > self.max_sessions_per_user:
+            oldest_session_id = next(iter(user_sessions))
+            self._remove((app_name, user_id, oldest_session_id))
+            self.stats["evicted_user_cap"] += 1
+
+    def _expire_idle(self):
+        deadline = time.monotonic() - self.idle_ttl_seconds
+        while self._sessions:
+            key, entry = next(iter(self._sessions.items()))
+            if entry.last_access >= deadline:
+                break
+            self._remove(key)
+            self.stats["evicted_idle"] += 1
+
+    def _enforce_limits(self):
+        self._expire_idle()
+        # Never evict the most recently used session, even if it alone exceeds the budget
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._bytes > self.memory_budget_bytes
+        ):
+            key = next(iter(self._sessions))
+            self._remove(key)
+            self.stats["evicted_budget"] += 1
+
+
+class TieredSessionService(BaseSessionService):
+    """Hot in-process tier (BoundedSessionService) backed by a durable session tier.
+
+    Reads are served from the hot tier; a miss hydrates the session from the
+    cold tier, so any worker can pick up any session. Every appended event
+    (with its state delta) is written through to the cold tier asynchronously.
+
+    Cold-tier calls run on a small thread pool, each thread with its own event
+    loop, because ADK's DatabaseSessionService does blocking I/O inside its
+    async methods. Writes are sharded by session onto ordered queues, so a
+    session's events land in order while shards write in parallel, and a
+    hydration waits behind that session's queued writes.
+
+    With ``revalidate`` (the default) a hot hit on a session with no writes in
+    flight compares the cold tier's update time, read by primary key without
+    waiting on any queue, to the last write this worker saw; if another worker
+    has written the session since, the hot copy is dropped and rehydrated. A
+    session with writes in flight is served hot: should another worker have
+    written it, the next write conflicts, which drops the hot copy, reloads
+    and appends once more. Turn revalidation off only when the load balancer
+    pins each session to one worker (sticky sessions).
+    """
+
+    def __init__(self, hot: BoundedSessionService, cold: BaseSessionService, shards: int = 4,
+                 queue_size: int = 10000, revalidate: bool = True, cold_workers: Optional[int] = None):
+        self.hot = hot
+        self.cold = cold
+        self.hot.on_evict = self._forget_mirror
+        self.shards = shards
+        self.queue_size = queue_size
+        self.revalidate = revalidate
+        # One thread per shard writer, plus room for hydrations and revalidation reads
+        self.cold_workers = cold_workers or shards + 2
+
+        # Lightweight cold-tier session handles (no events) used as append targets
+        self._mirrors: Dict[SessionKey, Session] = {}
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        # Queued or running cold-tier operations per session
+        self._pending: Counter = Counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cold_pool: Optional[ThreadPoolExecutor] = None
+        self._cold_local = threading.local()
+        self.stats = {"hot_hits": 0, "hydrated": 0, "misses": 0, "written": 0, "write_errors": 0, "conflicts": 0,
+                      "stale_hot": 0}
+
+    async def create_session(
+            self,
+            *,
+            app_name: str,
+            user_id: str,
+            state: Optional[Dict[str, Any]] = None,
+            session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self.hot.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        initial_state = dict(session.state)
+        await self._submit(key, lambda: self._create_cold(key, initial_state))
+        return session
+
+    async def get_session(
+            self,
+            *,
+            app_name: str,
+            user_id: str,
+            session_id: str,
+            config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        session = await self.hot.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None and self.revalidate and not self._pending[key] and \
+                await self._in_cold_pool(self._cold_is_newer(key)):
+            # Another worker wrote this session since we cached it
+            self.stats["stale_hot"] += 1
+            self.hot._remove(key)
+            session = None
+        if session is not None:
+            self.stats["hot_hits"] += 1
+            return session
+
+        cold_session = await self._submit(key, lambda: self._load_cold(key), wait=True)
+        if cold_session is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.hot.put_session(cold_session)
+        self.stats["hydrated"] += 1
+        return await self.hot.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        # The cold tier is authoritative across workers
+        return await self._in_cold_pool(self.cold.list_sessions(app_name=app_name, user_id=user_id))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        await self.hot.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        await self._submit(key, lambda: self.cold.delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        ), wait=True)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        await self.hot.append_event(session, event)
+        if not event.partial:
+            key = (session.app_name, session.user_id, session.id)
+            await self._submit(key, lambda: self._write_event(key, event))
+        return event
+
+    async def flush(self):
+        """Wait until every queued cold-tier write has been applied"""
+        for queue in self._queues:
+            await queue.join()
+
+    async def stop(self):
+        await self.flush()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers, self._queues = [], []
+        if self._cold_pool is not None:
+            self._cold_pool.shutdown(wait=True)
+            self._cold_pool = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.hot.metrics(),
+            **self.stats,
+            "write_queue_depth": sum(queue.qsize() for queue in self._queues),
+        }
+
+    # Cold-tier operations; these coroutines run on the cold-tier pool threads
+
+    async def _create_cold(self, key: SessionKey, state: Dict[str, Any]):
+        try:
+            cold_session = await self.cold.create_session(
+                app_name=key[0], user_id=key[1], session_id=key[2], state=state
+            )
+        except IntegrityError:
+            # Two shards created the app/user state row at once; it exists now
+            cold_session = await self.cold.create_session(
+                app_name=key[0], user_id=key[1], session_id=key[2], state=state
+            )
+        self._mirrors[key] = self._mirror_of(cold_session)
+
+    async def _load_cold(self, key: SessionKey) -> Optional[Session]:
+        cold_session = await self.cold.get_session(app_name=key[0], user_id=key[1], session_id=key[2])
+        if cold_session is not None:
+            self._mirrors[key] = self._mirror_of(cold_session)
+        return cold_session
+
+    async def _load_mirror(self, key: SessionKey) -> Optional[Session]:
+        """Fresh append target for the session, or None if the cold tier does not have it"""
+        cold_session = await self.cold.get_session(
+            app_name=key[0], user_id=key[1], session_id=key[2], config=GetSessionConfig(num_recent_events=1)
+        )
+        if cold_session is None:
+            return None
+        mirror = self._mirror_of(cold_session)
+        self._mirrors[key] = mirror
+        return mirror
+
+    async def _cold_update_time(self, key: SessionKey) -> Optional[float]:
+        """The session's last update time in the cold tier, or None if it is not there"""
+        session_factory = getattr(self.cold, "database_session_factory", None)
+        if session_factory is None:
+            cold_session = await self.cold.get_session(
+                app_name=key[0], user_id=key[1], session_id=key[2], config=GetSessionConfig(num_recent_events=1)
+            )
+            return cold_session.last_update_time if cold_session is not None else None
+
+        # One primary-key read of the sessions row; no events or app/user state
+        with session_factory() as sql_session:
+            storage_session = sql_session.get(StorageSession, key)
+            return storage_session.update_timestamp_tz if storage_session is not None else None
+
+    async def _cold_is_newer(self, key: SessionKey) -> bool:
+        """Whether the cold tier has writes this worker has not seen (or lost the session)"""
+        mirror = self._mirrors.get(key)
+        update_time = await self._cold_update_time(key)
+        return update_time is None or mirror is None or update_time > mirror.last_update_time
+
+    async def _write_event(self, key: SessionKey, event: Event):
+        # Hold the mirror locally: the main loop may forget it (hot eviction) at any time
+        mirror = self._mirrors.get(key) or await self._load_mirror(key)
+        if mirror is None:
+            raise ValueError(f"Session {key[2]} does not exist in the cold tier")
+
+        try:
+            await self.cold.append_event(mirror, event)
+        except ValueError:
+            # Another worker wrote this session. Drop our hot copy on the main loop and wait
+            # for it, so its eviction cannot forget the mirror reloaded below; then retry once
+            self.stats["conflicts"] += 1
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._invalidate_hot(key), self._loop))
+            mirror = await self._load_mirror(key)
+            if mirror is None:
+                raise ValueError(f"Session {key[2]} was deleted from the cold tier during a write conflict")
+            await self.cold.append_event(mirror, event)
+
+        mirror.events.clear()
+        self.stats["written"] += 1
+
+    @staticmethod
+    def _mirror_of(session: Session) -> Session:
+        return Session(
+            app_name=session.app_name,
+            user_id=session.user_id,
+            id=session.id,
+            state={},
+            last_update_time=session.last_update_time
+        )
+
+    def _forget_mirror(self, key: SessionKey):
+        self._mirrors.pop(key, None)
+
+    async def _invalidate_hot(self, key: SessionKey):
+        self.hot._remove(key)
+
+    # Plumbing
+
+    async def _submit(self, key: SessionKey, operation: Callable[[], Awaitable[Any]], wait: bool = False):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending[key] += 1
+        await self._queues[hash(key) % self.shards].put((key, operation, future))
+        if future is not None:
+            return await future
+
+    async def _in_cold_pool(self, coroutine: Awaitable[Any]):
+        self._ensure_started()
+        return await self._loop.run_in_executor(self._cold_pool, self._run_cold, coroutine)
+
+    def _run_cold(self, coroutine: Awaitable[Any]):
+        loop = getattr(self._cold_local, "loop", None)
+        if loop is None:
+            loop = self._cold_local.loop = asyncio.new_event_loop()
+        return loop.run_until_complete(coroutine)
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._cold_pool = ThreadPoolExecutor(max_workers=self.cold_workers, thread_name_prefix="session-cold-tier")
+
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.shards)]
+        self._workers = [
+            asyncio.create_task(self._shard_worker(queue), name=f"session-writer-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+
+    async def _shard_worker(self, queue: asyncio.Queue):
+        while True:
+            key, operation, future = await queue.get()
+            try:
+                result = await self._in_cold_pool(operation())
+                if future is not None:
+                    future.set_result(result)
+            except Exception as e:
+                if future is not None:
+                    future.set_exception(e)
+                else:
+                    self.stats["write_errors"] += 1
+                    logger.error(f"❌ Cold-tier session write failed: {e}")
+            finally:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                queue.task_done()
@@ -0,0 +1,31 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict
+
+STATEMENT_FIELDS = ["id", "date", "type", "description", "amount", "status"]
+STATEMENT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+async def statement_chunks(transactions: AsyncIterator[Dict], fmt: str, rows_per_chunk: int = 500) -> AsyncIterator[str]:
+    """Serialize a transaction stream as CSV or NDJSON, a few hundred rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=STATEMENT_FIELDS, extrasaction="ignore", lineterminator="\n")
+    if fmt == "csv":
+        writer.writeheader()
+
+    rows = 0
+    async for transaction in transactions:
+        if fmt == "csv":
+            writer.writerow(transaction)
+        else:
+            buffer.write(json.dumps(transaction, ensure_ascii=False))
+            buffer.write("\n")
+        rows += 1
+        if rows % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from ..config import settings
+from ..database.connection import AsyncSessionLocal
+from ..database.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptWriter:
+    """Write-behind logger that batches ChatMessage rows into bulk inserts.
+
+    Messages are queued on a bounded asyncio.Queue and flushed by a background
+    task once ``batch_size`` rows are waiting or ``flush_interval`` seconds have
+    passed since the first one. A full queue makes ``log_message`` wait, which
+    pushes back on producers instead of growing memory.
+
+    A failed insert is retried with exponential backoff; the batch is dropped,
+    with an error log, only after ``max_attempts``. The queue keeps filling
+    meanwhile, so a database outage longer than that shows up as back-pressure
+    first and lost transcripts last.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue_size: int,
+                 max_attempts: int = 5, retry_backoff: float = 0.2):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # session_id -> messages queued but not yet written or dropped
+        self._pending: Counter = Counter()
+        self._settled: Optional[asyncio.Condition] = None
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0}
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._settled = asyncio.Condition()
+        self._task = asyncio.create_task(self._run(), name="transcript-writer")
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task"""
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def flush(self, session_id: Optional[str] = None):
+        """Wait until the queued messages are written (or dropped)
+
+        With ``session_id`` only that session's messages are waited for, so a
+        reader does not queue behind every other conversation's backlog.
+        """
+        if self._queue is None:
+            return
+        if session_id is None:
+            await self._queue.join()
+            return
+        async with self._settled:
+            await self._settled.wait_for(lambda: not self._pending[session_id])
+
+    async def log_message(self, session_id: str, role: str, content: str, agent_name: Optional[str] = None,
+                          routing_source: Optional[str] = None):
+        if not settings.ENABLE_CHAT_LOGGING:
+            return
+
+        record = {
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "agent_name": agent_name,
+            "routing_source": routing_source,
+            "created_at": datetime.now(timezone.utc)
+        }
+
+        if self._task is None:
+            # Not started (scripts, tests): write through
+            await self._write_batch([record])
+            return
+
+        self._pending[session_id] += 1
+        try:
+            await self._queue.put(record)
+        except BaseException:
+            self._pending[session_id] -= 1
+            raise
+        self.stats["queued"] += 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._write_batch(batch)
+            finally:
+                for record in batch:
+                    self._pending[record["session_id"]] -= 1
+                    if not self._pending[record["session_id"]]:
+                        del self._pending[record["session_id"]]
+                    self._queue.task_done()
+                async with self._settled:
+                    self._settled.notify_all()
+
+    async def _write_batch(self, batch: List[Dict]):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._insert(batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self.stats["dropped"] += len(batch)
+                    logger.error(f"❌ Dropped {len(batch)} chat messages after {attempt} attempts: {e}")
+                    return
+                self.stats["retries"] += 1
+                logger.warning(f"⚠️  Chat message write failed (attempt {attempt}/{self.max_attempts}): {e}")
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    async def _insert(self, batch: List[Dict]):
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(ChatMessage), batch)
+            await db.commit()
+
+
+transcript_writer = TranscriptWriter(
+    batch_size=settings.TRANSCRIPT_BATCH_SIZE,
+    flush_interval=settings.TRANSCRIPT_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=settings.TRANSCRIPT_QUEUE_MAX_SIZE,
+    max_attempts=settings.TRANSCRIPT_WRITE_ATTEMPTS,
+    retry_backoff=settings.TRANSCRIPT_RETRY_BACKOFF_SECONDS
+)
@@ -0,0 +1,110 @@
+"""Event-loop responsiveness under injected DB latency: sync vs async sessions.
+
+Runs N concurrent simulated chat turns (commit user message, wait for the
+model, commit assistant message) against a throwaway SQLite database while a
+probe task measures how late the event loop wakes it up. Every statement pays
+``--latency-ms`` of simulated server latency: a blocking sleep for the sync
+engine (what psycopg2 does on the loop) and an awaited sleep for the async
+engine (what asyncpg does).
+
+    cd backend && python -m benchmarks.async_db_benchmark --chats 50 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_DB_DIR = tempfile.mkdtemp(prefix="tbc_bench_")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.util import await_only  # noqa: E402
+
+from app.database.connection import AsyncSessionLocal, SessionLocal, async_engine, create_tables, engine  # noqa: E402
+from app.database.models import ChatMessage  # noqa: E402
+
+
+def inject_latency(latency: float):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _blocking_wait(*args):
+        time.sleep(latency)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _awaited_wait(*args):
+        await_only(asyncio.sleep(latency))
+
+
+async def sync_chat(index: int, model_wait: float):
+    db = SessionLocal()
+    try:
+        db.add(ChatMessage(session_id=f"sync-{index}", role="user", content="Block my card"))
+        db.commit()
+        await asyncio.sleep(model_wait)
+        db.add(ChatMessage(session_id=f"sync-{index}", role="assistant", content="Done", agent_name="bench"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_chat(index: int, model_wait: float):
+    async with AsyncSessionLocal() as db:
+        db.add(ChatMessage(session_id=f"async-{index}", role="user", content="Block my card"))
+        await db.commit()
+        await asyncio.sleep(model_wait)
+        db.add(ChatMessage(session_id=f"async-{index}", role="assistant", content="Done", agent_name="bench"))
+        await db.commit()
+
+
+async def run_mode(chat, chats: int, model_wait: float, probe_interval: float) -> dict:
+    lags = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(probe_interval)
+            lags.append(time.perf_counter() - started - probe_interval)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(i, model_wait) for i in range(chats)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "chats_per_s": chats / elapsed,
+        "lag_p50_ms": statistics.median(lags) * 1000,
+        "lag_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--model-wait-ms", type=float, default=50.0)
+    parser.add_argument("--probe-interval-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    create_tables()
+    inject_latency(args.latency_ms / 1000)
+
+    print(f"{args.chats} concurrent chats, {args.latency_ms:.0f} ms injected per statement\n")
+    print(f"{'mode':<8}{'wall s':>9}{'chats/s':>10}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for name, chat in (("sync", sync_chat), ("async", async_chat)):
+        result = await run_mode(chat, args.chats, args.model_wait_ms / 1000, args.probe_interval_ms / 1000)
+        print(f"{name:<8}{result['elapsed_s']:>9.2f}{result['chats_per_s']:>10.1f}"
+              f"{result['lag_p50_ms']:>12.1f}{result['lag_p99_ms']:>12.1f}{result['lag_max_ms']:>12.1f}")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
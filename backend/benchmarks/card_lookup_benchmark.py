@@ -0,0 +1,138 @@
+"""Card lookup by last 4 digits: loading every card and scanning vs the indexed last4 query.
+
+Seeds a throwaway SQLite database with customers holding many cards, then
+looks cards up the way block/unblock, transaction history and transfers do,
+each lookup in a fresh session like a tool call outside an agent turn. The
+scan mode is the old path (load the customer with all cards, match the suffix
+in Python); the indexed mode is BankingService.get_customer_card. Every
+statement can pay ``--latency-ms`` of simulated server latency, awaited as
+asyncpg would. Finally last4 is cleared and the migration backfill is timed.
+
+    cd backend && python -m benchmarks.card_lookup_benchmark --customers 200 --cards-per-customer 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_DB_DIR = tempfile.mkdtemp(prefix="tbc_bench_")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import event, insert, select, text, update  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+from sqlalchemy.util import await_only  # noqa: E402
+
+from app.database.connection import AsyncSessionLocal, async_engine, create_tables, engine  # noqa: E402
+from app.database.migrations import add_card_last4  # noqa: E402
+from app.database.models import Card, Customer  # noqa: E402
+from app.services.banking_service import banking_service  # noqa: E402
+
+statements = 0
+
+
+def seed(customers: int, cards_per_customer: int):
+    with engine.begin() as connection:
+        connection.execute(insert(Customer), [
+            {"id": i + 1, "customer_id": f"CUST{i:06d}", "name": f"Customer {i}", "email": f"customer{i}@example.com"}
+            for i in range(customers)
+        ])
+        for i in range(customers):
+            connection.execute(insert(Card), [
+                {"card_number": f"4{i:06d}{j:09d}", "card_type": "TBC Card", "balance": 1000.0, "customer_id": i + 1}
+                for j in range(cards_per_customer)
+            ])
+
+
+def count_statements(latency: float):
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(*args):
+        global statements
+        statements += 1
+        if latency:
+            await_only(asyncio.sleep(latency))
+
+
+async def scan_lookup(customer_id: str, card_number: str):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Customer).options(selectinload(Customer.cards)).where(Customer.customer_id == customer_id)
+        )
+        customer = result.scalars().first()
+        return next((c for c in customer.cards if c.card_number.endswith(card_number[-4:])), None)
+
+
+async def indexed_lookup(customer_id: str, card_number: str):
+    async with AsyncSessionLocal() as db:
+        _, card = await banking_service.get_customer_card(customer_id, card_number, db)
+        return card
+
+
+async def run_mode(lookup, targets) -> dict:
+    global statements
+    statements = 0
+    timings = []
+    for customer_id, card_number in targets:
+        started = time.perf_counter()
+        card = await lookup(customer_id, card_number)
+        timings.append(time.perf_counter() - started)
+        assert card is not None and card.card_number == card_number
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "lookups_per_s": len(timings) / sum(timings),
+        "statements": statements / len(timings),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--cards-per-customer", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    create_tables()
+    started = time.perf_counter()
+    seed(args.customers, args.cards_per_customer)
+    print(f"{args.customers} customers x {args.cards_per_customer} cards seeded in {time.perf_counter() - started:.1f} s, "
+          f"{args.latency_ms:.0f} ms injected per statement\n")
+
+    rng = random.Random(7)
+    targets = []
+    for _ in range(args.lookups):
+        i, j = rng.randrange(args.customers), rng.randrange(args.cards_per_customer)
+        targets.append((f"CUST{i:06d}", f"4{i:06d}{j:09d}"))
+
+    with engine.connect() as connection:
+        plan = connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT customers.id, cards.id FROM customers "
+            "LEFT OUTER JOIN cards ON cards.customer_id = customers.id AND cards.last4 = '0001' "
+            "WHERE customers.customer_id = 'CUST000001'"
+        )).all()
+    print("indexed query plan: " + "; ".join(row[-1] for row in plan) + "\n")
+
+    count_statements(args.latency_ms / 1000)
+    print(f"{'mode':<9}{'p50 ms':>9}{'p95 ms':>9}{'lookups/s':>11}{'stmts/lookup':>14}")
+    for name, lookup in (("scan", scan_lookup), ("indexed", indexed_lookup)):
+        result = await run_mode(lookup, targets)
+        print(f"{name:<9}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+              f"{result['lookups_per_s']:>11.1f}{result['statements']:>14.1f}")
+
+    with engine.begin() as connection:
+        connection.execute(update(Card).values(last4=None))
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        backfilled = add_card_last4(connection)
+    print(f"\nmigration backfill: {backfilled} cards in {time.perf_counter() - started:.2f} s")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""Latency and retrieval quality of the embedding providers on a labelled query set.
+
+Embeds a small knowledge corpus (the seeded documents plus product/service
+pages) with each provider, then runs labelled English and Georgian queries
+against it by cosine similarity. Reports corpus throughput, single-query
+latency percentiles, batched per-query latency, recall@1, recall@3 and MRR.
+Providers that cannot run here (no API key, model not downloadable) are
+reported and skipped.
+
+    cd backend && python -m benchmarks.embedding_providers_benchmark --providers gemini hashing onnx
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.services.embedding_providers import EMBEDDING_PROVIDERS, create_embedding_function
+from app.services.seed_knowledge import SEED_KNOWLEDGE
+
+CORPUS = SEED_KNOWLEDGE + [
+    {"id": "branch_hours", "content": "TBC branches are open Monday to Friday 10:00-18:00 and Saturday 10:00-15:00; closed on Sunday. Hours are reduced on public holidays."},
+    {"id": "mobile_banking", "content": "The TBC mobile banking app offers instant transfers, bill payments, card blocking, PIN change, spending analytics and 24/7 chat support with biometric login."},
+    {"id": "atm_network", "content": "More than 800 TBC ATMs across Georgia support cash withdrawal, balance inquiries, mini statements, bill payments, mobile top-ups and deposits at selected machines."},
+    {"id": "transfer_fees", "content": "Transfers between TBC accounts are free. Interbank transfers cost 1.50₾ and international transfers 0.5% with a 15₾ minimum."},
+    {"id": "mortgage_terms", "content": "TBC mortgage loans finance up to 85% of the property value for terms of up to 25 years, with fixed or floating interest rates."},
+    {"id": "student_offer", "content": "Students get a free TBC card for the first year, discounted fees and special cashback offers at partner stores."},
+]
+
+# (query, id of the relevant document)
+LABELLED_QUERIES = [
+    ("How much cashback does the TBC Card give?", "tbc_card_benefits"),
+    ("free ATM withdrawals with the basic card", "tbc_card_benefits"),
+    ("Concept 360 benefits", "tbc_concept_360"),
+    ("which card has a personal banker", "tbc_concept_360"),
+    ("How do I block a stolen card?", "card_blocking"),
+    ("freeze card immediately", "card_blocking"),
+    ("What kinds of loans do you offer?", "loan_types"),
+    ("car loan interest rate", "loan_types"),
+    ("customer service phone number", "customer_support"),
+    ("is support available at night", "customer_support"),
+    ("protection against fraudulent transactions", "card_security_service"),
+    ("card security service annual fee", "card_security_service"),
+    ("when are branches open on Saturday", "branch_hours"),
+    ("branch opening hours", "branch_hours"),
+    ("can I pay bills from my phone app", "mobile_banking"),
+    ("change PIN in the app", "mobile_banking"),
+    ("how many ATMs do you have", "atm_network"),
+    ("deposit cash at an ATM", "atm_network"),
+    ("international transfer fee", "transfer_fees"),
+    ("cost of sending money to another bank", "transfer_fees"),
+    ("how long can a mortgage be", "mortgage_terms"),
+    ("home loan down payment", "mortgage_terms"),
+    ("student discounts", "student_offer"),
+    ("ბარათის დაბლოკვა", "card_blocking"),
+    ("იპოთეკური სესხი", "mortgage_terms"),
+    ("ფილიალის სამუშაო საათები", "branch_hours"),
+]
+
+
+def normalized(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def evaluate(provider: str, query_repeats: int):
+    embed = create_embedding_function(provider)
+
+    started = time.perf_counter()
+    corpus = normalized(embed([doc["content"] for doc in CORPUS]))
+    corpus_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(query_repeats):
+        for query, _ in LABELLED_QUERIES:
+            started = time.perf_counter()
+            embed([query])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    queries = normalized(embed([query for query, _ in LABELLED_QUERIES]))
+    batched_ms = (time.perf_counter() - started) * 1000 / len(LABELLED_QUERIES)
+
+    ids = [doc["id"] for doc in CORPUS]
+    ranking = np.argsort(-(queries @ corpus.T), axis=1)
+    ranks = [[ids[j] for j in row].index(expected) + 1 for row, (_, expected) in zip(ranking, LABELLED_QUERIES)]
+
+    latencies.sort()
+    return {
+        "dimension": corpus.shape[1],
+        "corpus_docs_per_s": len(CORPUS) / corpus_seconds,
+        "query_p50_ms": statistics.median(latencies),
+        "query_p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "batched_ms_per_query": batched_ms,
+        "recall@1": sum(rank == 1 for rank in ranks) / len(ranks),
+        "recall@3": sum(rank <= 3 for rank in ranks) / len(ranks),
+        "mrr": sum(1 / rank for rank in ranks) / len(ranks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", nargs="+", default=["gemini", "hashing", "onnx"], choices=EMBEDDING_PROVIDERS)
+    parser.add_argument("--query-repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    columns = ["dimension", "corpus_docs_per_s", "query_p50_ms", "query_p95_ms", "batched_ms_per_query",
+               "recall@1", "recall@3", "mrr"]
+    print(f"{'provider':<22}" + "".join(f"{column:>22}" for column in columns))
+    for provider in args.providers:
+        try:
+            result = evaluate(provider, args.query_repeats)
+        except Exception as e:
+            print(f"{provider:<22}skipped: {type(e).__name__}: {str(e)[:80]}")
+            continue
+        print(f"{provider:<22}" + "".join(
+            f"{result[column]:>22}" if column == "dimension" else f"{result[column]:>22.3f}" for column in columns
+        ))
+
+
+if __name__ == "__main__":
+    main()
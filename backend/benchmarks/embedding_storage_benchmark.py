@@ -0,0 +1,72 @@
+"""Memory, latency and recall of truncated / quantized embedding storage.
+
+Builds a CompactVectorIndex over synthetic unit vectors whose variance decays
+across dimensions (as in Matryoshka-trained models such as
+gemini-embedding-001, where the leading dimensions carry most of the signal)
+and queries it with perturbed copies of corpus vectors. Recall@k is measured
+against exact float32 search on the full vectors, for every combination of
+stored dimension, quantization and full-precision re-ranking.
+
+    cd backend && python -m benchmarks.embedding_storage_benchmark --chunks 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.vector_index import QUANTIZATIONS, CompactVectorIndex, truncate
+
+
+def synthetic_corpus(chunks: int, dimension: int, queries: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    spectrum = (np.arange(dimension, dtype=np.float32) + 1) ** -0.5
+    corpus = truncate(rng.standard_normal((chunks, dimension), dtype=np.float32) * spectrum, None)
+    sources = rng.integers(0, chunks, queries)
+    noise = rng.standard_normal((queries, dimension), dtype=np.float32) * spectrum
+    query_vectors = truncate(corpus[sources] + 0.8 * truncate(noise, None), None)
+    return corpus, query_vectors
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-(queries @ corpus.T), k - 1, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[3072, 1024, 768, 512, 256])
+    parser.add_argument("--rerank-candidates", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.chunks, args.dimension, args.queries)
+    truth = [set(row) for row in exact_top_k(corpus, queries, args.k)]
+    ids = [str(i) for i in range(args.chunks)]
+    categories = [""] * args.chunks
+
+    print(f"{args.chunks} chunks x {args.dimension} dims, {args.queries} queries, recall@{args.k} vs exact float32\n")
+    print(f"{'dims':>6}{'storage':>9}{'rerank':>8}{'memory MB':>11}{'p50 ms':>9}{'p95 ms':>9}{'recall':>9}")
+    for dimension in args.dimensions:
+        for quantization in QUANTIZATIONS:
+            index = CompactVectorIndex.build(ids, categories, corpus, dimension, quantization, "bench", keep_full=True)
+            for rerank in (0, args.rerank_candidates):
+                latencies, hits = [], 0
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    results = index.search(query, args.k, rerank_candidates=rerank)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len(expected & {int(doc_id) for doc_id, _ in results})
+
+                latencies.sort()
+                print(
+                    f"{dimension:>6}{'float32' if quantization == 'none' else quantization:>9}"
+                    f"{'yes' if rerank else 'no':>8}{index.memory_bytes() / 2 ** 20:>11.1f}"
+                    f"{latencies[len(latencies) // 2]:>9.2f}{latencies[int(len(latencies) * 0.95) - 1]:>9.2f}"
+                    f"{hits / (args.k * len(queries)):>9.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Event loop stalls and embedding calls under concurrent knowledge searches.
+
+Runs RAGService over the seeded knowledge with the offline hashing embedder,
+wrapped to take --embedding-ms per call like a remote embedding API. A burst
+of concurrent searches (a few distinct questions asked by many chats at
+once) is issued while a ticker measures how late the event loop wakes up.
+The blocking mode calls the search on the loop, as search_knowledge used
+to; the executor modes run it on the retrieval executor, without and with
+merging identical in-flight searches (the latter is search_knowledge).
+Questions differ per mode and round, so the embedding cache does not hide
+the cost.
+
+    cd backend && python -m benchmarks.retrieval_concurrency_benchmark --concurrency 50 --distinct 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_workdir = tempfile.mkdtemp(prefix="retrieval-bench-")
+os.environ.setdefault("EMBEDDING_PROVIDER", "hashing")
+os.environ.setdefault("VECTOR_BACKEND", "numpy")
+os.environ.setdefault("NUMPY_INDEX_DIRECTORY", os.path.join(_workdir, "index"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(_workdir, "embedding_cache.sqlite3"))
+os.environ.setdefault("KNOWLEDGE_ALIAS_PATH", os.path.join(_workdir, "aliases.json"))
+
+from app.services.rag_service import rag_service  # noqa: E402
+
+
+class SlowEmbedding:
+    def __init__(self, embedding_function, delay_seconds: float):
+        self.embedding_function = embedding_function
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        time.sleep(self.delay_seconds)
+        return self.embedding_function(texts)
+
+
+async def measure(mode: str, concurrency: int, distinct: int, rounds: int, embedder: SlowEmbedding):
+    lags, stop = [], False
+
+    async def ticker():
+        while not stop:
+            expected = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+    async def blocking_search(query: str):
+        return rag_service._search_current(query, 3, None)
+
+    async def uncoalesced_search(query: str):
+        return await rag_service.executor.run(None, rag_service._search_current, query, 3, None)
+
+    search = {
+        "blocking": blocking_search,
+        "executor, no coalescing": uncoalesced_search,
+        "executor": rag_service.search_knowledge,
+    }[mode]
+    ticking = asyncio.create_task(ticker())
+    embedder.calls = 0
+    started = time.perf_counter()
+    for round_number in range(rounds):
+        queries = [f"question {mode} {round_number} {i % distinct} about card cashback" for i in range(concurrency)]
+        await asyncio.gather(*(search(query) for query in queries))
+    elapsed = time.perf_counter() - started
+    stop = True
+    await ticking
+
+    lags.sort()
+    return {
+        "searches": concurrency * rounds,
+        "embedding_calls": embedder.calls,
+        "wall_s": elapsed,
+        "loop_lag_p99_ms": lags[int(len(lags) * 0.99) - 1] if lags else 0.0,
+        "loop_lag_max_ms": lags[-1] if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=5, help="Distinct questions per burst")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--embedding-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    embedder = SlowEmbedding(rag_service.embedding_function, args.embedding_ms / 1000)
+    rag_service.embedding_function = embedder
+
+    columns = ["searches", "embedding_calls", "wall_s", "loop_lag_p99_ms", "loop_lag_max_ms"]
+    print(f"{'mode':<25}" + "".join(f"{column:>18}" for column in columns))
+    for mode in ("blocking", "executor, no coalescing", "executor"):
+        result = asyncio.run(measure(mode, args.concurrency, args.distinct, args.rounds, embedder))
+        print(f"{mode:<25}" + "".join(
+            f"{result[column]:>18}" if isinstance(result[column], int) else f"{result[column]:>18.2f}" for column in columns
+        ))
+    print(f"\nexecutor: {rag_service.executor.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
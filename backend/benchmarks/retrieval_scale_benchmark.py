@@ -0,0 +1,291 @@
+"""RAGService retrieval at scale: ingest throughput, latency, memory and recall.
+
+Generates a synthetic knowledge base of N chunks (topic-flavoured text from a
+seeded syllable vocabulary, so every run produces the same corpus), embeds it
+with the offline hashing embedder and loads it through RAGService for each
+configured backend. Each (backend, size) pair runs in its own subprocess so
+memory numbers are not polluted by earlier runs. Reported per pair:
+
+- ingest throughput (embedding + upsert) and the time to build the query
+  indexes (BM25 and, where configured, the compact vector copy)
+- search_knowledge latency p50/p95/p99 and how often the chunk a query was
+  drawn from comes back in the top k
+- vector search latency and recall@k against exact cosine search over the
+  same embeddings, computed while streaming the corpus
+- resident memory of the process and size of the index on disk
+
+Results are printed as a table and written as JSON (--output) for comparing
+versions; --compare old.json prints the change per backend and size.
+
+    cd backend && python -m benchmarks.retrieval_scale_benchmark --sizes 1000 10000 100000 --output results.json
+    cd backend && python -m benchmarks.retrieval_scale_benchmark --sizes 1000000 --backends numpy numpy-int8
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Environment for each named backend; everything else is the service default
+BACKENDS = {
+    "chroma": {"VECTOR_BACKEND": "chroma"},
+    "numpy": {"VECTOR_BACKEND": "numpy"},
+    "numpy-int8": {"VECTOR_BACKEND": "numpy", "EMBEDDING_QUANTIZATION": "int8", "EMBEDDING_RERANK": "true"},
+}
+
+TOPICS = 12
+WORDS_PER_CHUNK = 40
+BATCH_SIZE = 1000
+_SYLLABLES = ["ka", "ri", "to", "ne", "sa", "mi", "lo", "ve", "du", "pa", "shi", "gor", "tan", "bel", "kur",
+              "zi", "mon", "ect", "ad", "ar", "is", "on", "ul", "ba", "te"]
+
+
+def vocabulary(seed: int, size: int = 20000):
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES, rng.integers(2, 5))))
+    return sorted(words)
+
+
+def corpus_batch(seed: int, batch: int, vocab, total: int):
+    """Texts and categories of chunks [batch * BATCH_SIZE, ...); the same for a given seed and batch"""
+    rng = np.random.default_rng([seed, batch])
+    count = min(BATCH_SIZE, total - batch * BATCH_SIZE)
+    topics = rng.integers(0, TOPICS, count)
+    topic_words = len(vocab) // TOPICS
+    # Half of each chunk comes from its topic's slice of the vocabulary, half from a Zipf-like global draw
+    own = rng.integers(0, topic_words, (count, WORDS_PER_CHUNK // 2)) + (topics * topic_words)[:, None]
+    shared = np.minimum(rng.zipf(1.3, (count, WORDS_PER_CHUNK // 2)) - 1, len(vocab) - 1)
+    texts = [" ".join(vocab[i] for i in np.concatenate([a, b])) for a, b in zip(own, shared)]
+    return texts, [f"topic{t}" for t in topics]
+
+
+def query_for(text: str, rng) -> str:
+    words = text.split()
+    picked = rng.choice(len(words), 6, replace=False)
+    return " ".join(words[i] for i in sorted(picked))
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _disk_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 2 ** 20
+
+
+def _percentiles(values_ms):
+    ordered = sorted(values_ms)
+    return {
+        f"p{round(q * 100)}_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3)
+        for q in (0.5, 0.95, 0.99)
+    }
+
+
+def _ratio(new: float, prior: float) -> str:
+    return f"{new / prior:.2f}x" if prior else "n/a"
+
+
+def run_one(backend: str, size: int, queries: int, k: int, dimension: int, seed: int) -> dict:
+    """One (backend, size) measurement; runs in a fresh process"""
+    workdir = tempfile.mkdtemp(prefix="retrieval-scale-")
+    os.environ.update({
+        "EMBEDDING_PROVIDER": "hashing",
+        "HASHING_EMBEDDING_DIMENSION": str(dimension),
+        "NUMPY_INDEX_DIRECTORY": os.path.join(workdir, "numpy"),
+        "VECTOR_INDEX_DIRECTORY": os.path.join(workdir, "compact"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "KNOWLEDGE_ALIAS_PATH": os.path.join(workdir, "aliases.json"),
+        **BACKENDS[backend],
+    })
+    from app.config import settings
+    settings.CHROMA_PERSIST_DIRECTORY = os.path.join(workdir, "chroma")
+    from app.services.rag_service import rag_service
+    from app.services.seed_knowledge import SEED_KNOWLEDGE
+
+    try:
+        baseline_rss = _rss_mb()
+        vocab = vocabulary(seed)
+        batches = (size + BATCH_SIZE - 1) // BATCH_SIZE
+        rng = np.random.default_rng(seed)
+        sources = np.sort(rng.choice(size, min(queries, size), replace=False))
+        query_texts, query_sources = [], []
+        for batch in np.unique(sources // BATCH_SIZE):
+            texts, _ = corpus_batch(seed, int(batch), vocab, size)
+            for source in sources[sources // BATCH_SIZE == batch]:
+                query_texts.append(query_for(texts[source - batch * BATCH_SIZE], rng))
+                query_sources.append(f"chunk-{source}")
+
+        embed = rag_service.embedding_function
+        query_vectors = np.asarray(embed(query_texts), dtype=np.float32)
+        # Exact top-k over the corpus (seed documents included), kept up to date while streaming it
+        seed_vectors = np.asarray(embed([doc["content"] for doc in SEED_KNOWLEDGE]), dtype=np.float32)
+        best_scores = query_vectors @ seed_vectors.T
+        best_ids = np.array([[doc["id"] for doc in SEED_KNOWLEDGE]] * len(query_texts), dtype=object)
+
+        ingest_seconds = 0.0
+        for batch in range(batches):
+            texts, categories = corpus_batch(seed, batch, vocab, size)
+            ids = [f"chunk-{batch * BATCH_SIZE + i}" for i in range(len(texts))]
+            started = time.perf_counter()
+            vectors = embed(texts)
+            rag_service.collection.upsert(
+                ids=ids, embeddings=vectors, documents=texts, metadatas=[{"category": c} for c in categories]
+            )
+            ingest_seconds += time.perf_counter() - started
+
+            scores = np.concatenate([best_scores, query_vectors @ np.asarray(vectors, dtype=np.float32).T], axis=1)
+            candidates = np.concatenate([best_ids, np.array([ids] * len(query_texts), dtype=object)], axis=1)
+            keep = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_ids = np.take_along_axis(candidates, keep, axis=1)
+        rag_service.mark_knowledge_changed()
+
+        started = time.perf_counter()
+        rag_service._refresh_indexes()
+        index_build_seconds = time.perf_counter() - started
+        snapshot = rag_service._snapshot
+
+        async def hybrid():
+            latencies, hits = [], 0
+            for query, source in zip(query_texts, query_sources):
+                started = time.perf_counter()
+                results = await rag_service.search_knowledge(query, limit=k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += source in {result["id"] for result in results}
+            return latencies, hits
+
+        hybrid_latencies, hybrid_hits = asyncio.run(hybrid())
+
+        vector_latencies, overlap = [], 0
+        for query, exact in zip(query_texts, best_ids):
+            started = time.perf_counter()
+            results = rag_service._vector_search(snapshot, query, k, None)
+            vector_latencies.append((time.perf_counter() - started) * 1000)
+            overlap += len(set(exact) & {result["id"] for result in results})
+
+        return {
+            "backend": backend,
+            "chunks": rag_service.collection.count(),
+            "dimension": dimension,
+            "k": k,
+            "queries": len(query_texts),
+            "ingest_chunks_per_s": round(size / ingest_seconds, 1),
+            "index_build_s": round(index_build_seconds, 3),
+            "search": {**_percentiles(hybrid_latencies), f"source_hit@{k}": round(hybrid_hits / len(query_texts), 4)},
+            "vector": {**_percentiles(vector_latencies), f"recall@{k}": round(overlap / (k * len(query_texts)), 4)},
+            "retrieval_paths": dict(rag_service.retrieval_stats),
+            "rss_mb": round(_rss_mb(), 1),
+            "rss_growth_mb": round(_rss_mb() - baseline_rss, 1),
+            "disk_mb": round(_disk_mb(workdir), 1),
+        }
+    finally:
+        rag_service.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(previous: dict, current: dict):
+    before = {(r["backend"], r["chunks"]): r for r in previous["results"]}
+    print(f"\nChange vs {previous['meta'].get('revision') or 'previous run'} (current / previous):", file=sys.stderr)
+    for result in current["results"]:
+        old = before.get((result["backend"], result["chunks"]))
+        if not old:
+            continue
+        recall_key = next(key for key in result["vector"] if key.startswith("recall@"))
+        print(
+            f"  {result['backend']:<12}{result['chunks']:>9}  "
+            f"ingest {_ratio(result['ingest_chunks_per_s'], old['ingest_chunks_per_s'])}  "
+            f"search p95 {_ratio(result['search']['p95_ms'], old['search']['p95_ms'])}  "
+            f"rss {_ratio(result['rss_mb'], old['rss_mb'])}  "
+            f"{recall_key} {result['vector'][recall_key] - old['vector'].get(recall_key, 0):+.4f}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dimension", type=int, default=256, help="Hashing embedder dimension")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        backend, size = args.worker.split(":")
+        print(json.dumps(run_one(backend, int(size), args.queries, args.k, args.dimension, args.seed)))
+        return
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("worker", "output", "compare")},
+        },
+        "results": [],
+    }
+    print(f"{'backend':<12}{'chunks':>9}{'ingest/s':>11}{'build s':>9}{'search p50':>12}{'p95':>8}{'p99':>8}"
+          f"{'hit@k':>8}{'vector p95':>12}{'recall@k':>10}{'rss MB':>9}{'disk MB':>9}", file=sys.stderr)
+    for size in args.sizes:
+        for backend in args.backends:
+            command = [sys.executable, "-m", "benchmarks.retrieval_scale_benchmark", "--worker", f"{backend}:{size}",
+                       "--queries", str(args.queries), "--k", str(args.k), "--dimension", str(args.dimension),
+                       "--seed", str(args.seed)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"{backend:<12}{size:>9}  failed: {completed.stderr.strip().splitlines()[-1:]}", file=sys.stderr)
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            report["results"].append(result)
+            search, vector = result["search"], result["vector"]
+            print(
+                f"{backend:<12}{result['chunks']:>9}{result['ingest_chunks_per_s']:>11.0f}{result['index_build_s']:>9.2f}"
+                f"{search['p50_ms']:>12.2f}{search['p95_ms']:>8.2f}{search['p99_ms']:>8.2f}"
+                f"{search[f'source_hit@{args.k}']:>8.3f}{vector['p95_ms']:>12.2f}{vector[f'recall@{args.k}']:>10.3f}"
+                f"{result['rss_mb']:>9.0f}{result['disk_mb']:>9.0f}",
+                file=sys.stderr
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
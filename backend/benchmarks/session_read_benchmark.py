@@ -0,0 +1,90 @@
+"""Per-turn session overhead vs conversation length: deep-copied vs copy-free reads.
+
+A chat turn touches the session service like ``/api/chat`` does: the endpoint
+reads the session, the runner reads it again, four events are appended (user
+message, tool call, tool result, answer) and the endpoint reads it once more
+for the response state. Sessions are pre-filled with ``--turns`` turns of
+history and the session-service time of the following turns is measured.
+ADK's InMemorySessionService deep-copies on every read, so its cost grows
+with the history; BoundedSessionService hands out the stored session.
+
+    cd backend && python -m benchmarks.session_read_benchmark --turns 10 50 100 250 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, FunctionCall, FunctionResponse, Part
+
+from app.services.session_store import BoundedSessionService
+
+APP_NAME = "tbc_bank_chatbot"
+USER_ID = "CUST001"
+
+
+def turn_events(turn: int):
+    return [
+        Event(invocation_id=f"t{turn}", author="user",
+              content=Content(role="user", parts=[Part(text="What is my loan limit and can I borrow 5000 GEL?")])),
+        Event(invocation_id=f"t{turn}", author="loan_agent",
+              content=Content(role="model", parts=[Part(function_call=FunctionCall(
+                  name="get_loan_limits", args={"customer_id": USER_ID}))])),
+        Event(invocation_id=f"t{turn}", author="loan_agent",
+              content=Content(role="user", parts=[Part(function_response=FunctionResponse(
+                  name="get_loan_limits", response={"max_loan_amount": 25000, "available_credit": 18000,
+                                                    "active_loans": [{"loan_type": "personal", "amount": 7000}]}))])),
+        Event(invocation_id=f"t{turn}", author="loan_agent",
+              content=Content(role="model", parts=[Part(text="Your available credit is 18,000 GEL. " * 8)]),
+              actions=EventActions(state_delta={"active_agent": "loan_agent", "last_turn": turn})),
+    ]
+
+
+async def run_turn(store, session_id: str, turn: int):
+    session = await store.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    session = await store.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    for event in turn_events(turn):
+        await store.append_event(session, event)
+    session = await store.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    return session.state
+
+
+async def measure(store, history_turns: int, samples: int) -> float:
+    session = await store.create_session(app_name=APP_NAME, user_id=USER_ID, state={"customer_id": USER_ID})
+    for turn in range(history_turns):
+        for event in turn_events(turn):
+            await store.append_event(session, event)
+
+    timings = []
+    for turn in range(history_turns, history_turns + samples):
+        started = time.perf_counter()
+        await run_turn(store, session.id, turn)
+        timings.append(time.perf_counter() - started)
+
+    await store.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    return statistics.median(timings) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    stores = {
+        "deepcopy (InMemorySessionService)": InMemorySessionService(),
+        "copy-free (BoundedSessionService)": BoundedSessionService(
+            idle_ttl_seconds=3600, max_sessions_per_user=10, max_sessions=1000, memory_budget_bytes=2 ** 30
+        ),
+    }
+
+    print(f"{'history turns':>14}" + "".join(f"{name:>38}" for name in stores))
+    for history_turns in args.turns:
+        row = [await measure(store, history_turns, args.samples) for store in stores.values()]
+        print(f"{history_turns:>14}" + "".join(f"{ms:>35.3f} ms" for ms in row))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
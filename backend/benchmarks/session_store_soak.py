@@ -0,0 +1,91 @@
+"""Soak test for BoundedSessionService: RSS stays flat under unbounded session churn.
+
+Creates ``--sessions`` synthetic sessions spread across ``--users`` customers,
+appending a couple of chat events to each, and samples resident memory as it
+goes. With the store's caps in force RSS levels off once the session and byte
+budgets are reached; ``--unbounded`` runs ADK's InMemorySessionService for
+comparison (use a smaller ``--sessions`` for that).
+
+    cd backend && python -m benchmarks.session_store_soak --sessions 1000000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import resource
+import time
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from app.services.session_store import BoundedSessionService
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # Peak RSS only (KiB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def chat_event(author: str, text: str) -> Event:
+    return Event(
+        invocation_id="soak",
+        author=author,
+        content=Content(role="user" if author == "user" else "model", parts=[Part(text=text)])
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--events", type=int, default=2)
+    parser.add_argument("--max-sessions", type=int, default=50_000)
+    parser.add_argument("--per-user", type=int, default=10)
+    parser.add_argument("--budget-mb", type=int, default=256)
+    parser.add_argument("--sample-every", type=int, default=100_000)
+    parser.add_argument("--unbounded", action="store_true")
+    args = parser.parse_args()
+
+    if args.unbounded:
+        store = InMemorySessionService()
+    else:
+        store = BoundedSessionService(
+            idle_ttl_seconds=24 * 3600,
+            max_sessions_per_user=args.per_user,
+            max_sessions=args.max_sessions,
+            memory_budget_bytes=args.budget_mb * 2 ** 20
+        )
+
+    rng = random.Random(7)
+    message = "Please block my card ending in 1234, I think it was stolen. " * 2
+    baseline = rss_mb()
+    started = time.perf_counter()
+    print(f"{'sessions':>10}{'rss MB':>10}{'live':>10}{'elapsed s':>11}")
+
+    for i in range(1, args.sessions + 1):
+        session = await store.create_session(
+            app_name="tbc_bank_chatbot",
+            user_id=f"CUST{rng.randrange(args.users):06d}",
+            state={"customer_id": "soak", "active_operations": []}
+        )
+        for turn in range(args.events):
+            await store.append_event(session, chat_event("user" if turn % 2 == 0 else "support_agent", message))
+
+        if i % args.sample_every == 0:
+            gc.collect()
+            live = store.metrics()["sessions"] if not args.unbounded else i
+            print(f"{i:>10}{rss_mb():>10.1f}{live:>10}{time.perf_counter() - started:>11.1f}")
+
+    print(f"\nRSS growth over baseline: {rss_mb() - baseline:.1f} MB")
+    if not args.unbounded:
+        print(store.metrics())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
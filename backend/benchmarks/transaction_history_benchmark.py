@@ -0,0 +1,156 @@
+"""Transaction history on one card with a million rows: OFFSET vs keyset pages, buffered vs streamed export.
+
+Seeds a throwaway SQLite database with one customer whose card holds
+``--transactions`` transactions spread over two years. Paging reads
+``--page-size`` rows at increasing depths, once with LIMIT/OFFSET and once
+through BankingService.get_card_transactions_page with its keyset cursor.
+Export reads a year of the statement, once with fetchall (what a single
+query returning every row does) and once through stream_card_statement
+serialized by statement_chunks; peak traced Python memory is reported for
+each.
+
+    cd backend && python -m benchmarks.transaction_history_benchmark --transactions 1000000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+_DB_DIR = tempfile.mkdtemp(prefix="tbc_bench_")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.database.connection import AsyncSessionLocal, async_engine, create_tables, engine  # noqa: E402
+from app.database.models import Card, Customer, Transaction  # noqa: E402
+from app.services.banking_service import banking_service, encode_cursor  # noqa: E402
+from app.services.statement_export import statement_chunks  # noqa: E402
+
+START = datetime(2024, 1, 1)
+CARD_NUMBER = "4000000000001234"
+
+
+def seed(transactions: int, batch_size: int = 50000):
+    step = timedelta(days=730) / transactions
+    with engine.begin() as connection:
+        connection.execute(insert(Customer).values(id=1, customer_id="CUST001", name="Bench", email="bench@example.com"))
+        connection.execute(insert(Card).values(id=1, card_number=CARD_NUMBER, balance=1000.0, customer_id=1))
+        for offset in range(0, transactions, batch_size):
+            connection.execute(insert(Transaction), [
+                {
+                    "transaction_id": f"TXN{i:09d}",
+                    "amount": -12.5 if i % 3 else 250.0,
+                    "transaction_type": "debit" if i % 3 else "credit",
+                    "description": f"Merchant {i % 97}",
+                    "status": "completed",
+                    "card_id": 1,
+                    "customer_id": 1,
+                    "created_at": START + step * i,
+                }
+                for i in range(offset, min(offset + batch_size, transactions))
+            ])
+
+
+async def offset_page(depth: int, page_size: int):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Transaction)
+            .where(Transaction.card_id == 1)
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+            .offset(depth)
+            .limit(page_size)
+        )
+        return len(result.scalars().all())
+
+
+async def keyset_cursor(depth: int):
+    """Cursor pointing just past ``depth`` rows, as a client paging there would hold"""
+    if depth == 0:
+        return None
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(Transaction.created_at, Transaction.id)
+            .where(Transaction.card_id == 1)
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+            .offset(depth - 1)
+            .limit(1)
+        )).one()
+    return encode_cursor(row.created_at, row.id)
+
+
+async def keyset_page(cursor, page_size: int):
+    async with AsyncSessionLocal() as db:
+        page = await banking_service.get_card_transactions_page("CUST001", CARD_NUMBER, db, limit=page_size, cursor=cursor)
+        return len(page["transactions"])
+
+
+async def timed(fn, *args, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await fn(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def buffered_export(since: datetime, until: datetime) -> int:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Transaction).where(
+                Transaction.card_id == 1, Transaction.created_at >= since, Transaction.created_at < until
+            ).order_by(Transaction.created_at)
+        )).scalars().all()
+        return sum(len(f"{t.transaction_id},{t.created_at.isoformat()},{t.amount}\n") for t in rows)
+
+
+async def streamed_export(since: datetime, until: datetime) -> int:
+    async with AsyncSessionLocal() as db:
+        transactions = banking_service.stream_card_statement(1, db, since, until)
+        return sum([len(chunk) async for chunk in statement_chunks(transactions, "csv")])
+
+
+async def measure_export(fn, since: datetime, until: datetime):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await fn(since, until)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, size / 2 ** 20
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    create_tables()
+    started = time.perf_counter()
+    seed(args.transactions)
+    print(f"{args.transactions} transactions seeded in {time.perf_counter() - started:.1f} s\n")
+
+    print(f"{'page at row':<14}{'offset ms':>12}{'keyset ms':>12}")
+    depths = [depth for depth in (0, 1000, 10000, 100000) if depth < args.transactions]
+    for depth in depths + [args.transactions - args.page_size]:
+        cursor = await keyset_cursor(depth)
+        offset_ms = await timed(offset_page, depth, args.page_size)
+        keyset_ms = await timed(keyset_page, cursor, args.page_size)
+        print(f"{depth:<14}{offset_ms:>12.2f}{keyset_ms:>12.2f}")
+
+    since, until = START + timedelta(days=365), START + timedelta(days=730)
+    print(f"\n{'export (last year)':<20}{'wall s':>9}{'peak MB':>10}{'output MB':>11}")
+    for name, fn in (("fetchall", buffered_export), ("stream", streamed_export)):
+        elapsed, peak_mb, output_mb = await measure_export(fn, since, until)
+        print(f"{name:<20}{elapsed:>9.2f}{peak_mb:>10.1f}{output_mb:>11.1f}")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""Parallel transfer stress test: balances are conserved and retries never move money twice.
+
+Fires ``--transfers`` random transfers from ``--cards`` cards at a throwaway
+SQLite database, ``--concurrency`` at a time, each in its own session like
+separate chats. A ``--retry-ratio`` share are sent twice at once with the same
+idempotency key, as a client retrying after a timeout would. Every statement
+can pay ``--latency-ms`` of awaited latency to widen the race windows.
+
+Afterwards every card must satisfy: initial balance - final balance == the
+sum of its recorded debits, final balance >= 0, and each idempotency key
+produced at most one transaction. The legacy mode runs the old
+read-check-decrement with six-digit random IDs for comparison.
+
+    cd backend && python -m benchmarks.transfer_stress_test --transfers 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+_DB_DIR = tempfile.mkdtemp(prefix="tbc_bench_")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import delete, event, func, insert, select, update  # noqa: E402
+from sqlalchemy.util import await_only  # noqa: E402
+
+from app.database.connection import AsyncSessionLocal, async_engine, create_tables, engine  # noqa: E402
+from app.database.models import Card, Customer, IdempotencyKey, Transaction  # noqa: E402
+from app.services.banking_service import banking_service  # noqa: E402
+
+INITIAL_BALANCE = 500.0
+
+
+def card_number(index: int) -> str:
+    return f"4000{index:012d}"
+
+
+def reset(cards: int):
+    with engine.begin() as connection:
+        connection.execute(delete(Transaction))
+        connection.execute(delete(IdempotencyKey))
+        connection.execute(delete(Card))
+        connection.execute(delete(Customer))
+        connection.execute(insert(Customer), [
+            {"id": i + 1, "customer_id": f"CUST{i:04d}", "name": f"Customer {i}", "email": f"c{i}@example.com"}
+            for i in range(cards)
+        ])
+        connection.execute(insert(Card), [
+            {"id": i + 1, "card_number": card_number(i), "balance": INITIAL_BALANCE, "is_blocked": False, "customer_id": i + 1}
+            for i in range(cards)
+        ])
+
+
+def inject_latency(latency: float):
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _awaited_wait(*args):
+        await_only(asyncio.sleep(latency))
+
+
+async def legacy_transfer(customer_id: str, from_card: str, to_account: str, amount: float, idempotency_key: str):
+    async with AsyncSessionLocal() as db:
+        card = (await db.execute(
+            select(Card).join(Customer).where(Customer.customer_id == customer_id, Card.last4 == from_card[-4:])
+        )).scalars().first()
+        if card.is_blocked or card.balance < amount:
+            return {"success": False, "message": "Insufficient funds"}
+        card.balance -= amount
+        db.add(Transaction(
+            transaction_id=f"TXN{random.randint(100000, 999999)}", amount=-amount, transaction_type="transfer_out",
+            description=f"Transfer to {to_account}", status="completed", card_id=card.id, customer_id=card.customer_id
+        ))
+        await db.commit()
+        return {"success": True, "transaction_id": None}
+
+
+async def engine_transfer(customer_id: str, from_card: str, to_account: str, amount: float, idempotency_key: str):
+    async with AsyncSessionLocal() as db:
+        return await banking_service.transfer_funds(customer_id, from_card, to_account, amount, db, idempotency_key)
+
+
+async def run(transfer, args) -> dict:
+    rng = random.Random(11)
+    requests = []
+    for n in range(args.transfers):
+        i = rng.randrange(args.cards)
+        request = (f"CUST{i:04d}", card_number(i), f"GE{n:020d}", float(rng.randint(1, 50)), f"key-{n}")
+        requests.append(request)
+        if rng.random() < args.retry_ratio:
+            requests.append(request)
+    rng.shuffle(requests)
+
+    outcomes = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def submit(request):
+        async with semaphore:
+            try:
+                result = await transfer(*request)
+            except Exception as e:
+                outcomes[f"error: {str(e).splitlines()[0][:80]}"] += 1
+                return
+            if result.get("replayed"):
+                outcomes["replayed"] += 1
+            else:
+                outcomes["completed" if result["success"] else result["message"]] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(request) for request in requests))
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as connection:
+        balances = dict(connection.execute(select(Card.id, Card.balance)).all())
+        debits = dict(connection.execute(
+            select(Transaction.card_id, func.sum(Transaction.amount)).group_by(Transaction.card_id)
+        ).all())
+        rows = connection.execute(select(func.count(Transaction.id))).scalar()
+        duplicated = connection.execute(
+            select(func.count()).select_from(
+                select(Transaction.description).group_by(Transaction.description)
+                .having(func.count() > 1).subquery()
+            )
+        ).scalar()
+
+    unbalanced = sum(1 for card_id, balance in balances.items()
+                     if abs(INITIAL_BALANCE - balance + debits.get(card_id, 0.0)) > 1e-6)
+    return {
+        "requests": len(requests),
+        "transfers_per_s": len(requests) / elapsed,
+        "outcomes": dict(outcomes),
+        "transactions": rows,
+        "unbalanced_cards": unbalanced,
+        "overdrawn_cards": sum(1 for balance in balances.values() if balance < 0),
+        "double_spent_keys": duplicated,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=20)
+    parser.add_argument("--transfers", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--retry-ratio", type=float, default=0.2)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    create_tables()
+    inject_latency(args.latency_ms / 1000)
+
+    failed = False
+    for name, transfer in (("legacy", legacy_transfer), ("engine", engine_transfer)):
+        reset(args.cards)
+        result = await run(transfer, args)
+        conserved = not (result["unbalanced_cards"] or result["overdrawn_cards"] or result["double_spent_keys"])
+        print(f"{name}: {result['requests']} requests, {result['transfers_per_s']:.0f}/s, "
+              f"{result['transactions']} transactions recorded")
+        print(f"  outcomes: {result['outcomes']}")
+        print(f"  unbalanced cards: {result['unbalanced_cards']}, overdrawn cards: {result['overdrawn_cards']}, "
+              f"keys with two transfers: {result['double_spent_keys']} -> {'OK' if conserved else 'VIOLATED'}\n")
+        failed = failed or (name == "engine" and not conserved)
+
+    await async_engine.dispose()
+    if failed:
+        raise SystemExit("Transfer engine violated balance conservation")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
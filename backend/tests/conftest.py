@@ -0,0 +1,45 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# app.config reads these at import time; tests never reach Google, Postgres or the working directory
+_DATA_DIR = tempfile.mkdtemp(prefix="tbc_tests_")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DATA_DIR}/test.db"
+os.environ["EMBEDDING_PROVIDER"] = "hashing"
+os.environ["VECTOR_BACKEND"] = "numpy"
+for name, filename in (
+        ("NUMPY_INDEX_DIRECTORY", "numpy_index"),
+        ("VECTOR_INDEX_DIRECTORY", "vector_index"),
+        ("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3"),
+        ("INGESTION_STATE_PATH", "ingestion_state.sqlite3"),
+        ("KNOWLEDGE_ALIAS_PATH", "knowledge_aliases.json"),
+        ("INTENT_MODEL_PATH", "intent_model.json"),
+):
+    os.environ[name] = os.path.join(_DATA_DIR, filename)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Fresh tables and customer cache; returns a runner for async test bodies"""
+    from app.database.connection import Base, async_engine, engine
+    from app.database import models  # noqa: F401  (registers the tables)
+    from app.services.banking_service import banking_service
+    from app.services.customer_cache import CustomerChangeFeed, CustomerSnapshotCache
+
+    Base.metadata.create_all(engine)
+    cache = CustomerSnapshotCache(ttl_seconds=30, max_entries=100)
+    monkeypatch.setattr(banking_service, "customer_cache", cache)
+    monkeypatch.setattr(banking_service, "change_feed", CustomerChangeFeed(cache, poll_interval=60, retained=100))
+
+    async def run_and_dispose(coroutine):
+        try:
+            return await coroutine
+        finally:
+            # Pooled aiosqlite connections belong to this test's event loop
+            await async_engine.dispose()
+
+    yield lambda coroutine: asyncio.run(run_and_dispose(coroutine))
+    Base.metadata.drop_all(engine)
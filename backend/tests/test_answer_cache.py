@@ -0,0 +1,122 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from google.adk.events import Event
+from google.genai.types import Content, Part
+
+from app.agents.support_agent import callbacks
+from app.services.answer_cache import SemanticAnswerCache, is_cacheable_question
+from app.services.rag_service import rag_service
+
+
+def embedding(*values):
+    return [float(v) for v in values] + [0.0] * (8 - len(values))
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticAnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=3)
+    yield cache
+    cache.invalidate()
+
+
+@pytest.mark.parametrize("question", [
+    "What are your branch hours?",
+    "How do I open an account?",
+    "What documents do I need for a mortgage?",
+    "What cashback do I get with Concept 360?",
+    "Where can I find an ATM?",
+    "როგორ გავხსნა ანგარიში",
+])
+def test_general_questions_are_cacheable_even_in_first_person(question):
+    assert is_cacheable_question(question, "CUST001")
+
+
+@pytest.mark.parametrize("question", [
+    "What is my card balance?",
+    "Is my card blocked?",
+    "Show my transactions",
+    "How much can I borrow?",
+    "Am I eligible for a loan?",
+    "რა სესხის ლიმიტი მაქვს",
+    "ჩემი ბარათის ბალანსი",
+    "Why was card 4000 1234 5678 9010 declined?",
+    "Tell me about CUST001",
+    "And what about that one?",
+])
+def test_account_specific_and_follow_up_questions_are_not(question):
+    assert not is_cacheable_question(question, "CUST001")
+
+
+def test_similar_question_hits_and_unrelated_one_misses(cache):
+    cache.store("What are your branch hours?", embedding(1, 0.1), "9:00-18:00", "v1")
+
+    assert cache.lookup(embedding(1, 0.12), "v1") == "9:00-18:00"
+    assert cache.lookup(embedding(0, 1), "v1") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_knowledge_version_bump_drops_every_answer(cache):
+    cache.store("What are your branch hours?", embedding(1), "9:00-18:00", "v1")
+
+    assert cache.lookup(embedding(1), "v2") is None
+    assert cache.stats["invalidations"] == 1
+    assert cache.metrics()["entries"] == 0
+
+
+def test_entries_expire_and_are_bounded(cache, monkeypatch):
+    for index in range(4):
+        cache.store(f"question {index}", embedding(0, 0, 0, 0, 1, index), f"answer {index}", "v1")
+    assert cache.metrics()["entries"] == 3
+    assert cache.lookup(embedding(0, 0, 0, 0, 1, 0), "v1") != "answer 0"
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.lookup(embedding(0, 0, 0, 0, 1, 3), "v1") is None
+    assert cache.stats["expired"] == 3
+
+
+def callback_context(question: str, invocation_id: str, answer: str = None):
+    events = [Event(author="support_agent", invocation_id=invocation_id,
+                    content=Content(role="model", parts=[Part(text=answer)]))] if answer else []
+    return SimpleNamespace(
+        user_content=Content(role="user", parts=[Part(text=question)]),
+        state={"customer_id": "CUST001"},
+        agent_name="support_agent",
+        invocation_id=invocation_id,
+        _invocation_context=SimpleNamespace(invocation_id=invocation_id, session=SimpleNamespace(events=events)),
+    )
+
+
+def test_turn_reads_the_knowledge_version_once(cache, monkeypatch):
+    reads = []
+
+    async def knowledge_version_async():
+        reads.append(1)
+        return "v1"
+
+    async def embed_query_async(question):
+        return embedding(1)
+
+    async def run(key, fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(callbacks, "answer_cache", cache)
+    monkeypatch.setattr(rag_service, "knowledge_version_async", knowledge_version_async)
+    monkeypatch.setattr(rag_service, "embed_query_async", embed_query_async)
+    monkeypatch.setattr(rag_service, "executor", SimpleNamespace(run=run))
+
+    async def two_turns():
+        question = "What are your branch hours?"
+        missed = await callbacks.serve_cached_answer(callback_context(question, "turn-1"))
+        await callbacks.cache_answer(callback_context(question, "turn-1", answer="9:00-18:00"))
+        served = await callbacks.serve_cached_answer(callback_context(question, "turn-2"))
+        return missed, served
+
+    missed, served = asyncio.run(two_turns())
+
+    assert missed is None
+    assert served.parts[0].text == "9:00-18:00"
+    assert len(reads) == 2  # one per turn
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+from sqlalchemy import event, insert, update
+
+from app.database.connection import AsyncSessionLocal, async_engine, engine
+from app.database.models import Card, Customer
+from app.services.banking_service import banking_service
+from app.services.customer_cache import CustomerChangeFeed, CustomerSnapshotCache
+
+
+@pytest.fixture
+def customer(database):
+    with engine.begin() as connection:
+        connection.execute(insert(Customer).values(id=1, customer_id="CUST001", name="Test", email="t@example.com"))
+        connection.execute(insert(Card).values(id=1, card_number="4000000000001234", balance=100.0, customer_id=1))
+    return database
+
+
+async def snapshot():
+    async with AsyncSessionLocal() as db:
+        return await banking_service.get_customer_snapshot("CUST001", db)
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(connection, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_hits_expiry_and_lru_eviction(monkeypatch):
+    cache = CustomerSnapshotCache(ttl_seconds=10, max_entries=2)
+    for customer_id in ("a", "b"):
+        cache.put(customer_id, {"customer_id": customer_id}, cache.begin_load())
+    assert cache.get("a") == {"customer_id": "a"}
+
+    cache.put("c", {"customer_id": "c"}, cache.begin_load())
+    assert cache.get("b") is None  # least recently used
+    assert cache.get("a") is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats["expired"] == 1 and cache.stats["evictions"] == 1
+
+
+def test_snapshot_loaded_across_a_write_is_refused():
+    cache = CustomerSnapshotCache(ttl_seconds=10, max_entries=10)
+    token = cache.begin_load()
+    cache.invalidate("a")  # a write commits while the read is in flight
+    cache.put("a", {"balance": "before the write"}, token)
+
+    assert cache.get("a") is None
+    assert cache.stats["refused"] == 1
+
+    cache.put("a", {"balance": "after the write"}, cache.begin_load())
+    assert cache.get("a") == {"balance": "after the write"}
+
+
+def test_cache_hit_does_not_touch_the_database(customer, statements):
+    async def scenario():
+        await snapshot()
+        before = len(statements)
+        cached = await snapshot()
+        return cached, statements[before:]
+
+    cached, hit_statements = customer(scenario())
+
+    assert cached["cards"][0]["balance"] == 100.0
+    assert hit_statements == []
+
+
+def test_own_write_is_visible_on_the_next_read(customer):
+    async def scenario():
+        await snapshot()
+        async with AsyncSessionLocal() as db:
+            await banking_service.block_card("CUST001", "4000000000001234", db)
+        return await snapshot()
+
+    assert customer(scenario())["cards"][0]["is_blocked"] is True
+
+
+def test_change_feed_invalidates_writes_from_other_processes(customer):
+    feed = banking_service.change_feed
+
+    async def scenario():
+        await feed.poll()
+        await snapshot()
+        # Another worker debits the card and records the change in the same transaction
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Card).where(Card.id == 1).values(balance=40.0))
+            CustomerChangeFeed.record(db, "CUST001")
+            await db.commit()
+        stale = await snapshot()
+        await feed.poll()
+        await feed.poll()  # a change is applied once
+        return stale, await snapshot()
+
+    stale, fresh = customer(scenario())
+
+    assert stale["cards"][0]["balance"] == 100.0
+    assert fresh["cards"][0]["balance"] == 40.0
+    assert feed.stats["changes"] == 1
+
+
+def test_change_feed_prunes_old_rows(customer):
+    feed = CustomerChangeFeed(banking_service.customer_cache, poll_interval=60, retained=2)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            for _ in range(5):
+                CustomerChangeFeed.record(db, "CUST001")
+            await db.commit()
+        await feed.poll()
+        await feed.prune()
+
+    customer(scenario())
+
+    assert feed.stats["pruned"] == 3
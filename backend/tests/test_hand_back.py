@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.genai.types import Content, Part
+
+from app import main
+from app.services.routing_service import TOPIC_CHANGED_KEY
+
+
+def answer(author: str, text: str) -> Event:
+    return Event(author=author, content=Content(role="model", parts=[Part(text=text)]))
+
+
+def hand_back(author: str) -> Event:
+    return Event(author=author, actions=EventActions(state_delta={TOPIC_CHANGED_KEY: True}))
+
+
+class ScriptedRunner:
+    """Stands in for an ADK Runner: each run_async call replays the next scripted list of events"""
+
+    def __init__(self, *runs):
+        self.runs = list(runs)
+        self.messages = []
+
+    async def run_async(self, user_id, session_id, new_message, run_config):
+        self.messages.append(new_message)
+        for event in self.runs.pop(0):
+            yield event
+
+
+def run_turn(monkeypatch, current_agent: str, **runners):
+    monkeypatch.setattr(main, "agents", runners)
+    request = main.ChatRequest(message="what about a mortgage?", customer_id="CUST001")
+    routing = {"source": "test"}
+
+    async def collect():
+        return [event async for event in main._run_turn(current_agent, request, "session-1", routing=routing)]
+
+    return asyncio.run(collect()), routing
+
+
+def test_specialist_hand_back_replays_the_turn_through_the_coordinator(monkeypatch):
+    card = ScriptedRunner([hand_back("card_operations_agent")])
+    coordinator = ScriptedRunner([answer("loan_agent", "Mortgage rates start at 9%.")])
+
+    events, routing = run_turn(monkeypatch, "card_operations", card_operations=card, coordinator=coordinator)
+
+    assert [main._event_text(event) for event in events] == ["Mortgage rates start at 9%."]
+    assert routing["source"] == "hand_back"
+    assert coordinator.messages == [None]  # the user message is already in the session
+
+
+def test_hand_back_inside_a_coordinator_run_is_rerouted(monkeypatch):
+    # The coordinator routes to its card specialist clone, which hands the topic back
+    coordinator = ScriptedRunner(
+        [hand_back("card_operations_agent")],
+        [answer("loan_agent", "Mortgage rates start at 9%.")],
+    )
+
+    events, routing = run_turn(monkeypatch, "coordinator", coordinator=coordinator)
+
+    assert [main._event_text(event) for event in events] == ["Mortgage rates start at 9%."]
+    assert routing["source"] == "hand_back"
+    assert coordinator.messages[0] is not None and coordinator.messages[1] is None
+
+
+def test_hand_backs_per_turn_are_bounded(monkeypatch):
+    runs = [[hand_back("support_agent")] for _ in range(main.MAX_HAND_BACKS_PER_TURN + 2)]
+    coordinator = ScriptedRunner(*runs)
+
+    events, _ = run_turn(monkeypatch, "coordinator", coordinator=coordinator)
+
+    assert events == []
+    assert len(coordinator.messages) == main.MAX_HAND_BACKS_PER_TURN + 1
+
+
+@pytest.mark.parametrize("current_agent", ["coordinator", "loan"])
+def test_turn_without_hand_back_runs_once(monkeypatch, current_agent):
+    runner = ScriptedRunner([answer("loan_agent", "Here are your loan options.")])
+
+    events, routing = run_turn(monkeypatch, current_agent, **{current_agent: runner})
+
+    assert len(events) == 1 and routing["source"] == "test"
+    assert len(runner.messages) == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.services.embedding_providers import HashingEmbeddingFunction
+from app.services.ingestion_service import KnowledgeIngestionService, chunk_text
+from app.services.mmap_vector_store import MmapVectorStore
+from app.services.rag_service import rag_service
+
+PARAGRAPHS = [
+    "TBC Concept 360 cards earn cashback on every purchase. The rate depends on the monthly spend.",
+    "Lost or stolen cards can be blocked in the app at any time. A new card is issued within five days.",
+    "Loans are offered in lari and dollars. Early repayment carries no fee after the first year.",
+]
+
+
+def test_short_text_is_one_normalized_chunk():
+    assert chunk_text("  Branch   hours\nare 9 to 18.  ", 400, 50) == ["Branch hours are 9 to 18."]
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text(" \n\n  \n", 400, 50) == []
+
+
+def test_chunks_respect_the_size_and_cover_the_text():
+    text = "\n\n".join(PARAGRAPHS * 4)
+    chunks = chunk_text(text, 120, 30)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    words = set(" ".join(chunks).split())
+    assert words == set(text.split())
+
+
+def test_chunks_prefer_paragraph_and_sentence_breaks():
+    chunks = chunk_text("\n\n".join(PARAGRAPHS), 120, 0)
+
+    assert chunks[0] == PARAGRAPHS[0]
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_consecutive_chunks_overlap_on_whole_words():
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = chunk_text(text, 100, 30)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        first_word = current.split()[0]
+        assert first_word in previous.split()
+
+
+@pytest.fixture
+def live_store(tmp_path, monkeypatch):
+    """An empty live collection and manifest, with lookups by source counted"""
+    store = MmapVectorStore(str(tmp_path / "store"), "knowledge")
+    source_queries = []
+    get = store.get
+
+    def counting_get(ids=None, where=None, **kwargs):
+        if where and "source" in where:
+            source_queries.append(where["source"])
+        return get(ids=ids, where=where, **kwargs)
+
+    monkeypatch.setattr(store, "get", counting_get)
+    monkeypatch.setattr(rag_service, "collection", store)
+    monkeypatch.setattr(rag_service, "embedding_function", HashingEmbeddingFunction(dimension=64))
+    monkeypatch.setattr(rag_service, "mark_knowledge_changed", lambda collection: None)
+    service = KnowledgeIngestionService(str(tmp_path / "state.sqlite3"), batch_size=8, concurrency=2,
+                                        chunk_size=120, chunk_overlap=0)
+    return store, service, source_queries
+
+
+def write_sources(directory, count: int, paragraphs: int):
+    directory.mkdir(exist_ok=True)
+    for index in range(count):
+        (directory / f"doc{index}.md").write_text("\n\n".join(PARAGRAPHS[:paragraphs]) + f" Doc {index}.")
+
+
+def test_first_ingest_into_an_empty_store_skips_leftover_lookups(live_store, tmp_path):
+    store, service, source_queries = live_store
+    write_sources(tmp_path / "docs", 20, 3)
+
+    stats = asyncio.run(service.ingest(str(tmp_path / "docs")))
+
+    assert stats["chunks_embedded"] == store.count() > 0
+    assert source_queries == []
+
+
+def test_leftovers_of_unrecorded_sources_are_found_in_one_query_per_window(live_store, tmp_path):
+    store, service, source_queries = live_store
+    write_sources(tmp_path / "docs", 6, 3)
+    asyncio.run(service.ingest(str(tmp_path / "docs")))
+    service.manifest.clear()  # e.g. the manifest file was lost
+    before = store.count()
+
+    write_sources(tmp_path / "docs", 6, 1)
+    stats = asyncio.run(service.ingest(str(tmp_path / "docs")))
+
+    assert stats["chunks_deleted"] == before - store.count() > 0
+    assert store.count() == stats["chunks"]
+    assert len(source_queries) == 1 and len(source_queries[0]["$in"]) == 6
@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.intent_router import SEED_EXAMPLES, IntentRouter
+from app.services.routing_service import AgentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    router = IntentRouter(confidence_threshold=0.9)
+    router.train(SEED_EXAMPLES)
+    return router
+
+
+@pytest.mark.parametrize("message, runner", [
+    ("Block my card", "card_operations"),
+    ("my card is stolen please block it", "card_operations"),
+    ("ბარათი დამიბლოკეთ", "card_operations"),
+    ("I want to take a loan", "loan"),
+    ("what loans can I get", "loan"),
+    ("Where is the nearest ATM?", "support"),
+])
+def test_clear_messages_skip_the_coordinator(router, message, runner):
+    assert router.route(message) == runner
+
+
+@pytest.mark.parametrize("message", [
+    "how much loan can I get with my card balance",
+    "transfer 100 GEL to my friend",
+    "my card got eaten by the ATM",
+])
+def test_ambiguous_or_unfamiliar_messages_go_to_the_coordinator(router, message):
+    label, _ = router.predict(message)
+
+    assert label != "card_operations"
+    assert router.route(message) is None
+
+
+def test_confidence_drops_with_unrecognised_words(router):
+    _, familiar = router.predict("Block my card")
+    _, unfamiliar = router.predict("Block my card zxqv wvut plmk")
+
+    assert unfamiliar < familiar
+
+
+def test_saved_model_routes_the_same(router, tmp_path):
+    path = str(tmp_path / "intent_model.json")
+    router.save(path)
+    loaded = IntentRouter(confidence_threshold=0.9)
+    loaded.load(path)
+
+    for message in ("Block my card", "transfer 100 GEL to my friend"):
+        assert loaded.predict(message) == pytest.approx(router.predict(message))
+
+
+def test_agent_router_falls_back_to_the_coordinator(router):
+    agent_router = AgentRouter(["coordinator", "card_operations", "loan", "support"], 30, router)
+
+    assert agent_router.route(None, {}, "Block my card") == ("card_operations", "intent")
+    assert agent_router.route(None, {}, "transfer 100 GEL to my friend") == ("coordinator", "coordinator")
+    assert agent_router.route("loan", {}, "Block my card") == ("loan", "preferred")
@@ -0,0 +1,63 @@
+from app.services.lexical_index import BM25Index, tokenize
+
+
+def test_tokenize_folds_case_drops_stopwords_and_stems():
+    assert tokenize("How do I block my Cards?") == ["i", "block", "my", "card"]
+
+
+def test_tokenize_keeps_number_grouping():
+    assert tokenize("Limit 10,000 GEL at 0.6%") == ["limit", "10000", "gel", "0.6"]
+
+
+def test_tokenize_stems_georgian_case_endings():
+    assert tokenize("ბარათების დაბლოკვა ბანკში") == ["ბარათ", "დაბლოკვა", "ბანკ"]
+
+
+def build_index(**options) -> BM25Index:
+    index = BM25Index(**options)
+    index.add_many([
+        ("concept", "TBC Concept 360 card with cashback on purchases", "cards"),
+        ("blocking", "Block a lost card in the mobile app", "cards"),
+        ("mortgage", "Mortgage loan rates and card payment holidays", "loans"),
+        ("branches", "Branch opening hours and card pickup", "general"),
+    ])
+    return index
+
+
+def test_search_returns_matching_documents_with_coverage():
+    results = build_index().search("concept cashback", 3)
+
+    assert [(doc_id, coverage) for doc_id, _, coverage in results] == [("concept", 1.0)]
+
+
+def test_search_filters_by_category_and_limits_results():
+    index = build_index()
+
+    assert {doc_id for doc_id, _, _ in index.search("card", 10, "cards")} == {"concept", "blocking"}
+    assert len(index.search("card", 2)) == 2
+
+
+def test_common_terms_only_score_documents_a_rarer_term_matched():
+    index = build_index(common_term_ratio=0.5)
+    results = index.search("card mortgage", 10)
+
+    # "card" is in every document, so only the mortgage document is scored, on both terms
+    assert [(doc_id, coverage) for doc_id, _, coverage in results] == [("mortgage", 1.0)]
+    # With only common terms in the query they are scored everywhere
+    assert len(index.search("card", 10)) == 4
+
+
+def test_removed_and_replaced_documents_leave_the_index():
+    index = build_index()
+    index.remove("mortgage")
+    index.add("blocking", "Freeze a stolen card", "cards")
+
+    assert index.search("mortgage", 5) == []
+    assert index.search("lost", 5) == []
+    assert index.search("freeze", 5)[0][0] == "blocking"
+    assert len(index) == 3
+
+
+def test_empty_queries_and_indexes_return_nothing():
+    assert BM25Index().search("card", 5) == []
+    assert build_index().search("the and of", 5) == []
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from app.services.mmap_vector_store import MmapVectorStore
+
+CATEGORIES = ("cards", "loans", "support")
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(7).normal(size=(300, 32)).astype(np.float32)
+
+
+@pytest.fixture
+def store(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path / "store"), "knowledge")
+    store.upsert(
+        ids=[f"doc{i}" for i in range(len(vectors))],
+        embeddings=vectors,
+        documents=[f"document {i}" for i in range(len(vectors))],
+        metadatas=[{"category": CATEGORIES[i % 3], "source": f"source{i // 10}", "chunk_index": i % 10}
+                   for i in range(len(vectors))],
+    )
+    return store
+
+
+def exact_ranking(vectors: np.ndarray, query: np.ndarray, rows=None) -> list:
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    return [f"doc{row}" for row in rows[np.argsort(-scores[rows], kind="stable")]]
+
+
+def test_top_k_matches_an_exact_cosine_ranking(store, vectors):
+    queries = np.random.default_rng(11).normal(size=(5, 32)).astype(np.float32)
+
+    results = store.query(query_embeddings=queries, n_results=10)
+
+    for query, ids, distances in zip(queries, results["ids"], results["distances"]):
+        assert ids == exact_ranking(vectors, query)[:10]
+        assert distances == sorted(distances)
+
+
+def test_category_filter_ranks_only_that_category(store, vectors):
+    query = vectors[4] + 0.1
+
+    results = store.query(query_embeddings=[query], n_results=5, where={"category": "loans"})
+
+    loans = [row for row in range(len(vectors)) if CATEGORIES[row % 3] == "loans"]
+    assert results["ids"][0] == exact_ranking(vectors, query, loans)[:5]
+    assert all(metadata["category"] == "loans" for metadata in results["metadatas"][0])
+    assert store.query(query_embeddings=[query], n_results=5, where={"category": "unknown"})["ids"] == [[]]
+
+
+def test_get_filters_on_metadata_equality_and_in(store):
+    one_source = store.get(where={"source": "source3"}, include=["metadatas"])
+    two_sources = store.get(where={"source": {"$in": ["source3", "source7"]}}, include=["metadatas"])
+
+    assert one_source["ids"] == [f"doc{i}" for i in range(30, 40)]
+    assert {metadata["source"] for metadata in two_sources["metadatas"]} == {"source3", "source7"}
+    assert len(two_sources["ids"]) == 20
+    assert store.get(where={"source": {"$in": []}})["ids"] == []
+    with pytest.raises(ValueError):
+        store.get(where={"$or": [{"source": "source3"}]})
+
+
+def test_deleted_rows_leave_search_and_compaction_keeps_the_ranking(store, vectors):
+    query = vectors[0]
+    store.delete(ids=["doc0"])
+    after_delete = store.query(query_embeddings=[query], n_results=10)["ids"][0]
+
+    assert "doc0" not in after_delete
+    assert after_delete == exact_ranking(vectors, query, range(1, len(vectors)))[:10]
+    assert store.count() == len(vectors) - 1
+
+    assert store.compact() == 1
+    assert store.query(query_embeddings=[query], n_results=10)["ids"][0] == after_delete
+
+
+def test_upsert_replaces_a_vector_and_other_instances_see_it(store, tmp_path):
+    target = np.zeros(32, np.float32)
+    target[0] = 1.0
+    store.upsert(ids=["doc5"], embeddings=[target], documents=["moved"], metadatas=[{"category": "cards"}])
+
+    reader = MmapVectorStore(str(tmp_path / "store"), "knowledge")
+    results = reader.query(query_embeddings=[target], n_results=1)
+
+    assert results["ids"] == [["doc5"]] and results["documents"] == [["moved"]]
+    assert results["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+    assert reader.count() == store.count() == 300
@@ -0,0 +1,268 @@
+import asyncio
+import time
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from app.services import session_store
+from app.services.session_store import BoundedSessionService, TieredSessionService
+
+
+def make_service(**overrides) -> BoundedSessionService:
+    options = dict(idle_ttl_seconds=3600, max_sessions_per_user=10, max_sessions=100, memory_budget_bytes=1 << 30)
+    options.update(overrides)
+    return BoundedSessionService(**options)
+
+
+def text_event(text: str, **state_delta) -> Event:
+    return Event(
+        author="user",
+        invocation_id="turn",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta)
+    )
+
+
+def create(service: BoundedSessionService, user_id: str, session_id: str):
+    return asyncio.run(service.create_session(app_name="bank", user_id=user_id, session_id=session_id))
+
+
+def get(service: BoundedSessionService, user_id: str, session_id: str):
+    return asyncio.run(service.get_session(app_name="bank", user_id=user_id, session_id=session_id))
+
+
+def test_least_recently_used_session_is_evicted_over_the_session_limit():
+    service = make_service(max_sessions=2)
+    create(service, "u1", "a")
+    create(service, "u2", "b")
+    get(service, "u1", "a")
+    create(service, "u3", "c")
+
+    assert get(service, "u2", "b") is None
+    assert get(service, "u1", "a") is not None
+    assert service.stats["evicted_budget"] == 1
+
+
+def test_per_user_cap_drops_that_users_oldest_session():
+    service = make_service(max_sessions_per_user=2)
+    for session_id in ("a", "b", "c"):
+        create(service, "u1", session_id)
+    create(service, "u2", "d")
+
+    listed = asyncio.run(service.list_sessions(app_name="bank", user_id="u1"))
+    assert [session.id for session in listed.sessions] == ["b", "c"]
+    assert get(service, "u2", "d") is not None
+    assert service.stats["evicted_user_cap"] == 1
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    service = make_service(idle_ttl_seconds=60)
+    create(service, "u1", "a")
+    create(service, "u1", "b")
+
+    now[0] += 30
+    assert get(service, "u1", "a") is not None
+    now[0] += 45
+    assert get(service, "u1", "b") is None
+    assert get(service, "u1", "a") is not None
+    assert service.stats["evicted_idle"] == 1
+
+
+def test_byte_budget_evicts_but_keeps_the_most_recent_session():
+    service = make_service(memory_budget_bytes=4 * session_store._SESSION_OVERHEAD_BYTES)
+    session = create(service, "u1", "a")
+    asyncio.run(service.append_event(session, text_event("x" * 20000)))
+
+    assert get(service, "u1", "a") is not None
+    assert service.metrics()["estimated_bytes"] > service.memory_budget_bytes
+
+    create(service, "u2", "b")
+    assert get(service, "u1", "a") is None
+    assert get(service, "u2", "b") is not None
+    assert service.metrics()["estimated_bytes"] <= service.memory_budget_bytes
+
+
+def test_appended_events_are_stored_once_and_counted():
+    service = make_service()
+    session = create(service, "u1", "a")
+    view = asyncio.run(service.get_session(app_name="bank", user_id="u1", session_id="a"))
+    asyncio.run(service.append_event(view, text_event("hello")))
+
+    stored = get(service, "u1", "a")
+    assert [event.content.parts[0].text for event in stored.events] == ["hello"]
+    assert stored is session
+    assert service.metrics()["estimated_bytes"] > session_store._SESSION_OVERHEAD_BYTES
+
+
+def test_reads_share_the_stored_session_instead_of_copying():
+    service = make_service()
+    session = create(service, "u1", "a")
+
+    assert get(service, "u1", "a") is session
+    assert get(service, "u1", "a") is get(service, "u1", "a")
+
+
+def test_filtered_view_shares_state_and_leaves_the_stored_events_alone():
+    service = make_service()
+    session = create(service, "u1", "a")
+    for index in range(5):
+        event = text_event(f"m{index}", step=index)
+        event.timestamp = 1000.0 + index
+        asyncio.run(service.append_event(session, event))
+    cutoff = session.events[3].timestamp
+
+    recent = asyncio.run(service.get_session(app_name="bank", user_id="u1", session_id="a",
+                                             config=GetSessionConfig(num_recent_events=2)))
+    since = asyncio.run(service.get_session(app_name="bank", user_id="u1", session_id="a",
+                                            config=GetSessionConfig(after_timestamp=cutoff)))
+
+    assert [event.content.parts[0].text for event in recent.events] == ["m3", "m4"]
+    assert [event.content.parts[0].text for event in since.events] == ["m3", "m4"]
+    assert recent is not session and recent.state is session.state
+    assert recent.events[0] is session.events[3]
+    assert len(session.events) == 5
+
+
+def test_event_appended_to_a_filtered_view_reaches_the_stored_session_once():
+    service = make_service()
+    session = create(service, "u1", "a")
+    asyncio.run(service.append_event(session, text_event("first")))
+    view = asyncio.run(service.get_session(app_name="bank", user_id="u1", session_id="a",
+                                           config=GetSessionConfig(num_recent_events=1)))
+    event = text_event("second", topic="loans")
+    asyncio.run(service.append_event(view, event))
+
+    assert [e.content.parts[0].text for e in session.events] == ["first", "second"]
+    assert [e.content.parts[0].text for e in view.events] == ["first", "second"]
+    assert session.events[-1] is event
+    assert session.state["topic"] == "loans"
+    assert session.last_update_time == event.timestamp
+
+
+# TieredSessionService over ADK's DatabaseSessionService on SQLite; each worker is one TieredSessionService
+
+@pytest.fixture
+def cold(tmp_path):
+    return DatabaseSessionService(db_url=f"sqlite:///{tmp_path}/sessions.db")
+
+
+def tiered(cold, **options) -> TieredSessionService:
+    return TieredSessionService(make_service(), cold, **options)
+
+
+def texts(session) -> list:
+    return [event.content.parts[0].text for event in session.events if event.content]
+
+
+def test_miss_hydrates_from_the_cold_tier(cold):
+    async def scenario():
+        first, second = tiered(cold), tiered(cold)
+        session = await first.create_session(app_name="bank", user_id="u1", state={"customer_id": "u1"})
+        await first.append_event(session, text_event("hello", step=1))
+        await first.flush()
+
+        hydrated = await second.get_session(app_name="bank", user_id="u1", session_id=session.id)
+        missing = await second.get_session(app_name="bank", user_id="u1", session_id="nope")
+        await first.stop()
+        await second.stop()
+        return hydrated, missing, second.stats
+
+    hydrated, missing, stats = asyncio.run(scenario())
+    assert texts(hydrated) == ["hello"]
+    assert hydrated.state == {"customer_id": "u1", "step": 1}
+    assert missing is None
+    assert stats["hydrated"] == 1 and stats["misses"] == 1
+
+
+def test_write_through_keeps_event_order(cold):
+    async def scenario():
+        service = tiered(cold, shards=2)
+        sessions = [await service.create_session(app_name="bank", user_id=f"u{i}") for i in range(3)]
+        for n in range(10):
+            for session in sessions:
+                await service.append_event(session, text_event(f"m{n}", n=n))
+        await service.stop()
+        return [await cold.get_session(app_name="bank", user_id=s.user_id, session_id=s.id) for s in sessions]
+
+    for stored in asyncio.run(scenario()):
+        assert texts(stored) == [f"m{n}" for n in range(10)]
+        assert stored.state["n"] == 9
+
+
+def test_hot_reads_do_not_wait_for_queued_writes(cold, monkeypatch):
+    append_event = cold.append_event
+
+    async def slow_append_event(session, event):
+        time.sleep(0.5)
+        return await append_event(session, event)
+
+    async def scenario():
+        service = tiered(cold)
+        session = await service.create_session(app_name="bank", user_id="u1")
+        await service.flush()
+        monkeypatch.setattr(cold, "append_event", slow_append_event)
+        await service.append_event(session, text_event("hello"))
+
+        started = time.perf_counter()
+        hot = await service.get_session(app_name="bank", user_id="u1", session_id=session.id)
+        elapsed = time.perf_counter() - started
+        await service.stop()
+        return hot, elapsed, service.stats
+
+    hot, elapsed, stats = asyncio.run(scenario())
+    assert texts(hot) == ["hello"]
+    assert elapsed < 0.25
+    assert stats["hot_hits"] == 1 and stats["written"] == 1
+
+
+@pytest.mark.parametrize("revalidate", [True, False])
+def test_a_session_written_by_another_worker_is_recovered(cold, revalidate):
+    async def scenario():
+        first, second = tiered(cold, revalidate=revalidate), tiered(cold, revalidate=revalidate)
+        session = await first.create_session(app_name="bank", user_id="u1")
+        await first.append_event(session, text_event("one", n=1))
+        await first.flush()
+
+        # SQLite stores update times to the second
+        await asyncio.sleep(1.1)
+        other = await second.get_session(app_name="bank", user_id="u1", session_id=session.id)
+        await second.append_event(other, text_event("two", n=2))
+        await second.flush()
+        await asyncio.sleep(1.1)
+
+        mine = await first.get_session(app_name="bank", user_id="u1", session_id=session.id)
+        await first.append_event(mine, text_event("three", n=3))
+        await first.stop()
+        await second.stop()
+        stored = await cold.get_session(app_name="bank", user_id="u1", session_id=session.id)
+        return stored, first.stats
+
+    stored, stats = asyncio.run(scenario())
+    assert texts(stored) == ["one", "two", "three"]
+    assert stored.state["n"] == 3
+    assert stats["write_errors"] == 0
+    if revalidate:
+        # The stale hot copy is never served; the read rehydrates it
+        assert stats["stale_hot"] == 1 and stats["conflicts"] == 0
+    else:
+        # The write conflicts, drops the hot copy, reloads and appends again
+        assert stats["conflicts"] == 1
+
+
+def test_stop_flushes_queued_writes(cold):
+    async def scenario():
+        service = tiered(cold, shards=1)
+        session = await service.create_session(app_name="bank", user_id="u1")
+        for n in range(20):
+            await service.append_event(session, text_event(f"m{n}"))
+        await service.stop()
+        return await cold.get_session(app_name="bank", user_id="u1", session_id=session.id), service.stats
+
+    stored, stats = asyncio.run(scenario())
+    assert len(stored.events) == 20
+    assert stats["written"] == 20
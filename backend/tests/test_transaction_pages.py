@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from app.database.connection import AsyncSessionLocal, engine
+from app.database.models import Card, Customer, Transaction
+from app.services.banking_service import banking_service, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2025, 3, 1, 12, 30, 15, 123456),
+    datetime(2025, 3, 1, 12, 30, tzinfo=timezone(timedelta(hours=4))),
+])
+def test_cursor_round_trips(created_at):
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor) == (created_at, 42)
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"2025-03-01T12:30:00").decode(),
+    base64.urlsafe_b64encode(b"yesterday|42").decode(),
+    base64.urlsafe_b64encode(b"2025-03-01T12:30:00|forty-two").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid page token"):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_transaction_once_newest_first(database):
+    start = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(Customer).values(id=1, customer_id="CUST001", name="Test", email="t@example.com"))
+        connection.execute(insert(Card).values(id=1, card_number="4000000000001234", balance=100.0, customer_id=1))
+        # Pairs of rows share a timestamp, so the id must break ties
+        connection.execute(insert(Transaction), [
+            {"transaction_id": f"TXN{i:04d}", "amount": -1.0, "transaction_type": "debit", "description": "Shop",
+             "status": "completed", "card_id": 1, "customer_id": 1, "created_at": start + timedelta(minutes=i // 2)}
+            for i in range(25)
+        ])
+
+    async def read_all_pages():
+        ids, cursor = [], None
+        while True:
+            async with AsyncSessionLocal() as db:
+                page = await banking_service.get_card_transactions_page(
+                    "CUST001", "1234", db, limit=4, cursor=cursor
+                )
+            ids.extend(transaction["id"] for transaction in page["transactions"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+
+    ids = database(read_all_pages())
+    assert ids == [f"TXN{i:04d}" for i in reversed(range(25))]
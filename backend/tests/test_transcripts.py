@@ -0,0 +1,93 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.database.connection import engine
+from app.database.models import ChatMessage
+from app.services.transcript_service import TranscriptWriter
+
+
+def writer(**options) -> TranscriptWriter:
+    return TranscriptWriter(**{"batch_size": 1, "flush_interval": 0.01, "max_queue_size": 100,
+                               "max_attempts": 3, "retry_backoff": 0.01, **options})
+
+
+def stored_contents():
+    with engine.connect() as connection:
+        return connection.execute(select(ChatMessage.content).order_by(ChatMessage.id)).scalars().all()
+
+
+def failing(times: int, real_insert):
+    calls = {"count": 0}
+
+    async def insert(batch):
+        calls["count"] += 1
+        if calls["count"] <= times:
+            raise ConnectionError("database went away")
+        await real_insert(batch)
+
+    return insert
+
+
+def test_failed_batch_is_retried_until_written(database):
+    transcripts = writer()
+    transcripts._insert = failing(2, transcripts._insert)
+
+    async def scenario():
+        await transcripts.start()
+        await transcripts.log_message("s1", "user", "hello")
+        await transcripts.stop()
+
+    database(scenario())
+
+    assert stored_contents() == ["hello"]
+    assert transcripts.stats["retries"] == 2 and transcripts.stats["dropped"] == 0
+
+
+def test_batch_is_dropped_after_the_attempt_limit(database):
+    transcripts = writer()
+    transcripts._insert = failing(3, transcripts._insert)
+
+    async def scenario():
+        await transcripts.start()
+        await transcripts.log_message("s1", "user", "lost")
+        await transcripts.log_message("s1", "assistant", "kept")
+        await transcripts.stop()
+
+    database(scenario())
+
+    assert stored_contents() == ["kept"]
+    assert transcripts.stats["dropped"] == 1 and transcripts.stats["written"] == 1
+
+
+def test_session_flush_waits_only_for_its_own_messages(database):
+    transcripts = writer()
+    real_insert = transcripts._insert
+    release = asyncio.Event()
+
+    async def insert(batch):
+        if batch[0]["session_id"] == "slow":
+            await release.wait()
+        await real_insert(batch)
+
+    transcripts._insert = insert
+
+    async def scenario():
+        await transcripts.start()
+        await transcripts.log_message("fast", "user", "first")
+        await transcripts.log_message("slow", "user", "stuck")
+        await asyncio.wait_for(transcripts.flush("fast"), timeout=1)
+        flushed_before_release = stored_contents()
+        slow_flush = asyncio.create_task(transcripts.flush("slow"))
+        await asyncio.sleep(0.05)
+        still_waiting = not slow_flush.done()
+        release.set()
+        await asyncio.wait_for(slow_flush, timeout=1)
+        await transcripts.stop()
+        return flushed_before_release, still_waiting
+
+    flushed_before_release, still_waiting = database(scenario())
+
+    assert flushed_before_release == ["first"]
+    assert still_waiting
+    assert stored_contents() == ["first", "stuck"]
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.database.connection import AsyncSessionLocal, engine
+from app.database.models import Card, Customer, Transaction
+from app.services.banking_service import banking_service
+
+
+@pytest.fixture
+def card(database):
+    with engine.begin() as connection:
+        connection.execute(insert(Customer).values(id=1, customer_id="CUST001", name="Test", email="t@example.com"))
+        connection.execute(insert(Card).values(id=1, card_number="4000000000001234", balance=100.0, customer_id=1))
+    return database
+
+
+async def transfer(amount: float, idempotency_key: str, to_account: str = "GE29TB0000000000000001"):
+    async with AsyncSessionLocal() as db:
+        return await banking_service.transfer_funds("CUST001", "1234", to_account, amount, db, idempotency_key)
+
+
+def balance_and_transactions():
+    with engine.connect() as connection:
+        balance = connection.execute(select(Card.balance).where(Card.id == 1)).scalar()
+        transactions = connection.execute(select(func.count(Transaction.id))).scalar()
+    return balance, transactions
+
+
+def test_retry_with_the_same_key_replays_the_first_outcome(card):
+    first = card(transfer(30.0, "key-1"))
+    retry = card(transfer(30.0, "key-1"))
+
+    assert first["success"] and "replayed" not in first
+    assert retry == {**first, "replayed": True}
+    assert balance_and_transactions() == (70.0, 1)
+
+
+def test_concurrent_retries_move_the_money_once(card):
+    async def burst():
+        return await asyncio.gather(*(transfer(30.0, "key-1") for _ in range(5)))
+
+    results = card(burst())
+
+    assert all(result["success"] for result in results)
+    assert len({result["transaction_id"] for result in results}) == 1
+    assert sum(not result.get("replayed") for result in results) == 1
+    assert balance_and_transactions() == (70.0, 1)
+
+
+def test_reusing_a_key_for_a_different_transfer_is_refused(card):
+    card(transfer(30.0, "key-1"))
+    reused = card(transfer(45.0, "key-1"))
+
+    assert reused["success"] is False
+    assert "different transfer" in reused["message"]
+    assert balance_and_transactions() == (70.0, 1)
+
+
+def test_a_refused_transfer_does_not_use_up_its_key(card):
+    refused = card(transfer(500.0, "key-1"))
+    corrected = card(transfer(50.0, "key-1"))
+
+    assert refused == {"success": False, "message": "Insufficient funds"}
+    assert corrected["success"] and "replayed" not in corrected
+    assert balance_and_transactions() == (50.0, 1)
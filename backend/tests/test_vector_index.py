@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.services.vector_index import CompactVectorIndex, truncate
+
+K = 10
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """Embedding-like vectors whose leading dimensions carry most of the variance"""
+    rng = np.random.default_rng(3)
+    decay = np.exp(-np.arange(256) / 48.0).astype(np.float32)
+    vectors = rng.normal(size=(2000, 256)).astype(np.float32) * decay
+    queries = vectors[rng.choice(len(vectors), 50, replace=False)] + rng.normal(size=(50, 256)).astype(np.float32) * decay * 0.5
+    categories = [("cards", "loans", "support")[i % 3] for i in range(len(vectors))]
+    return vectors, queries, categories
+
+
+def exact_top(vectors, query, k=K, rows=None):
+    scores = truncate(vectors, None) @ truncate(query, None)
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    return [f"c{row}" for row in rows[np.argsort(-scores[rows])[:k]]]
+
+
+def build(corpus, dimension, quantization, keep_full=True):
+    vectors, _, categories = corpus
+    return CompactVectorIndex.build([f"c{i}" for i in range(len(vectors))], categories, vectors,
+                                    dimension, quantization, "v1", keep_full)
+
+
+def recall(index, corpus, rerank_candidates):
+    vectors, queries, _ = corpus
+    found = 0
+    for query in queries:
+        hits = [doc_id for doc_id, _ in index.search(query, K, rerank_candidates=rerank_candidates)]
+        found += len(set(hits) & set(exact_top(vectors, query)))
+    return found / (K * len(queries))
+
+
+def test_uncompressed_index_is_exact(corpus):
+    vectors, queries, _ = corpus
+    index = build(corpus, None, "none", keep_full=False)
+
+    for query in queries[:10]:
+        assert [doc_id for doc_id, _ in index.search(query, K)] == exact_top(vectors, query)
+
+
+@pytest.mark.parametrize("dimension, quantization", [(64, "int8"), (64, "float16"), (96, "int8")])
+def test_rerank_recovers_the_float_index_recall(corpus, dimension, quantization):
+    index = build(corpus, dimension, quantization)
+
+    reranked = recall(index, corpus, rerank_candidates=100)
+
+    assert reranked >= 0.95
+    assert reranked >= recall(index, corpus, rerank_candidates=0)
+
+
+def test_reranked_scores_are_exact_cosines_in_order(corpus):
+    vectors, queries, _ = corpus
+    index = build(corpus, 64, "int8")
+    full = truncate(vectors, None)
+
+    hits = index.search(queries[0], K, rerank_candidates=100)
+
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+    for doc_id, score in hits:
+        assert score == pytest.approx(float(full[int(doc_id[1:])] @ truncate(queries[0], None)), abs=1e-5)
+
+
+def test_category_filter_and_saved_index(corpus, tmp_path):
+    vectors, queries, categories = corpus
+    index = build(corpus, 64, "int8")
+    index.save(str(tmp_path / "index"))
+    loaded = CompactVectorIndex.load(str(tmp_path / "index"))
+
+    loans = [row for row, category in enumerate(categories) if category == "loans"]
+    hits = loaded.search(queries[1], K, category="loans", rerank_candidates=100)
+
+    assert {int(doc_id[1:]) for doc_id, _ in hits} <= set(loans)
+    assert [doc_id for doc_id, _ in hits] == [doc_id for doc_id, _ in
+                                              index.search(queries[1], K, category="loans", rerank_candidates=100)]
+    assert len(set(doc_id for doc_id, _ in hits) & set(exact_top(vectors, queries[1], rows=loans))) >= 9
+    assert loaded.search(queries[1], K, category="unknown") == []
+    assert loaded.memory_bytes() < vectors.nbytes / 10